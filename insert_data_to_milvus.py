@@ -1,28 +1,20 @@
-import uuid
+from typing import List
 
-from pymilvus import MilvusClient
+from milvus.bm25 import get_lexical_index
+from milvus.connection import get_client
+from milvus.embedding_provider import get_embedding_provider
+from milvus.ingest import content_id, ingest_files, sync_files
 
-from milvus.ollama_embedding import get_embeddings
+client = get_client("./data/milvus_demo.db")
 
-client = MilvusClient("./data/milvus_demo.db")
 
-
-def generate_unique_id():
-    """生成唯一ID的几种方式"""
-    # 方式1：使用时间戳（毫秒）
-    # timestamp_id = int(time.time() * 1000)
-
-    # 方式2：使用UUID的整数表示
-    uuid_int = uuid.uuid4().int & (1 << 63) - 1  # 确保ID在64位范围内
-
-    # 方式3：使用递增ID（需要自己维护计数器，比如使用Redis或数据库）
-    # counter = get_next_counter()  # 实现获取下一个计数器的逻辑
-
-    return uuid_int  # 这里使用时间戳方式
+def generate_unique_id(content: str, source: str = ''):
+    """根据内容哈希生成ID：同样的内容得到同样的ID，重复导入会覆盖而不会产生重复数据"""
+    return content_id(content, source)
 
 
 def insert_data(id: int, data: str, collection_name: str):
-    vector = get_embeddings(data)
+    vector = get_embedding_provider().embed_query(data)
     data = [
         {
             'my_id': id,
@@ -30,13 +22,27 @@ def insert_data(id: int, data: str, collection_name: str):
             'my_content': data
         }
     ]
-    res = client.insert(
+    # upsert：同一个ID重复写入时覆盖而不是新增一行
+    res = client.upsert(
         collection_name=collection_name,
         data=data
     )
+    get_lexical_index(collection_name).add([(id, data[0]['my_content'])])
     print(res)
 
 
+def bulk_insert(file_paths: List[str], collection_name: str,
+                checkpoint_path: str = './data/ingest.checkpoint.json'):
+    """分批读取、切分、向量化并批量写入，可从检查点续传；返回写入的片段数"""
+    return ingest_files(file_paths, collection_name, client, checkpoint_path=checkpoint_path)
+
+
+def sync_insert(file_paths: List[str], collection_name: str,
+                manifest_path: str = './data/ingest.manifest.json'):
+    """增量导入：只向量化新增/修改的片段并 upsert，删除已不存在的片段；返回 SyncReport"""
+    return sync_files(file_paths, collection_name, client, manifest_path=manifest_path)
+
+
 def read_file_content(file_path: str) -> str:
     """读取整个文件内容"""
     with open(file_path, 'r', encoding='utf-8') as f:
@@ -44,14 +50,15 @@ def read_file_content(file_path: str) -> str:
 
 
 if __name__ == "__main__":
-    # print(generate_unique_id())
     collection_name = 'collection_test'
     file_path = './data/example.txt'
     # content = read_file_content(file_path)
     # print(content)
-    # insert_data(generate_unique_id(), content, collection_name)
+    # insert_data(generate_unique_id(content, file_path), content, collection_name)
+    # print(bulk_insert([file_path], collection_name))
+    # print(sync_insert([file_path], collection_name).to_dict())
 
-    query_vector = get_embeddings("what's the Oscar Zoom?")
+    query_vector = get_embedding_provider().embed_query("what's the Oscar Zoom?")
     res = client.search(
         collection_name=collection_name,
         data=[query_vector],
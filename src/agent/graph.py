@@ -1,21 +1,24 @@
 import os
+import sys
 
 from typing import TypedDict
 
 from langchain_community.tools import TavilySearchResults
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage
-from langchain_deepseek import ChatDeepSeek
 from langgraph.prebuilt import create_react_agent
 from typing_extensions import Literal
 
-from langchain_community.chat_models import ChatTongyi
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph, MessagesState
 from langgraph.types import Command
 
 from agent.tools import scrape_webpages, write_document, edit_document, read_document, create_outline, python_repl_tool
 
+# The shared LLM layer lives in src/llm, next to this package.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm.router import get_chat_model
+
 """
 https://langchain-ai.github.io/langgraph/tutorials/multi_agent/hierarchical_agent_teams/
 """
@@ -63,7 +66,7 @@ def make_supervisor_node(llm: BaseChatModel, members: list[str]) -> str:
     return supervisor_node
 
 
-search_llm = ChatTongyi(model="qwen-plus")
+search_llm = get_chat_model("qwen:qwen-plus")
 search_agent = create_react_agent(search_llm, tools=[tavily_tool])
 
 """
@@ -116,7 +119,7 @@ research_graph = research_builder.compile()
 
 Define Document Writing Team
 """
-doc_llm = ChatTongyi(model="qwen-plus")
+doc_llm = get_chat_model("qwen:qwen-plus")
 doc_writer_agent = create_react_agent(
     doc_llm,
     tools=[write_document, edit_document, read_document],
@@ -201,14 +204,10 @@ paper_writing_graph = paper_writing_builder.compile()
 ----------------------------------------------------------------------------
 """
 
-supervisor_llm = ChatDeepSeek(
-    model="deepseek-chat",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=1,
-)
-# supervisor_llm = ChatTongyi(model="qwen-plus")
+# temperature=0: the supervisors' Router decisions for a repeated conversation
+# state are served from the shared response cache.
+supervisor_llm = get_chat_model("deepseek-chat", temperature=0)
+# supervisor_llm = get_chat_model("qwen:qwen-plus")
 teams_supervisor_node = make_supervisor_node(supervisor_llm, ["research_team", "writing_team"])
 
 
@@ -0,0 +1,708 @@
+"""Durable LangGraph checkpointer for agent threads, backed by SQLite in WAL mode.
+
+``MemorySaver`` lost every thread on restart (react_agent had it disabled
+altogether). ``SQLiteCheckpointSaver`` keeps them on disk and is built for
+chat threads that grow by a few messages per step:
+
+- channel values are stored per ``(channel, version)``, so a step only writes
+  the channels it changed;
+- a channel holding a list of messages is stored as a list of message digests;
+  each message is serialized into the ``messages`` table once per thread, so a
+  step adds its new messages instead of a full copy of the conversation.
+  Serialized messages and their digests are remembered per message, so a step
+  only serializes and hashes the messages it added or replaced;
+- ``put`` and ``put_writes`` only queue rows; a writer thread commits them in
+  one transaction every ``flush_interval`` seconds (or once ``batch_size`` rows
+  are queued). Reads flush first, so the process always sees its own writes;
+- resuming a thread reads its latest checkpoint by primary key, then that
+  checkpoint's channel blobs, messages and pending writes, each with one
+  indexed query. Nothing is replayed;
+- each thread keeps its ``keep_last`` newest checkpoints, and threads idle for
+  longer than ``max_age`` seconds are deleted. Blobs and messages no longer
+  referenced are removed with them. Threads written since the last pass are
+  pruned every ``_PRUNE_EVERY`` seconds and on close, not on every flush, and
+  only threads holding more than ``keep_last`` checkpoints are rewritten.
+
+Pruning keeps no history for ``DeltaChannel`` reconstruction: do not use it
+with graphs that declare delta channels.
+"""
+
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "./data/checkpoints.db")
+DEFAULT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+DEFAULT_MAX_AGE = float(os.getenv("CHECKPOINT_MAX_AGE", str(30 * 24 * 3600)))
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("CHECKPOINT_FLUSH_INTERVAL", "0.2"))
+DEFAULT_BATCH_SIZE = int(os.getenv("CHECKPOINT_BATCH_SIZE", "256"))
+
+# Type tag of a channel blob holding a JSON list of message digests.
+_MESSAGE_REFS = "message_refs"
+# Idle-thread expiry runs at most this often.
+_EXPIRE_EVERY = 3600.0
+# Threads touched by flushes are pruned at most this often.
+_PRUNE_EVERY = 60.0
+# Message lists whose serialized messages are remembered between puts.
+_MESSAGE_MEMO_LISTS = 256
+# Keeps IN (...) lists under SQLite's bound-parameter limit.
+_CHUNK = 400
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    " thread_id TEXT NOT NULL,"
+    " checkpoint_ns TEXT NOT NULL DEFAULT '',"
+    " checkpoint_id TEXT NOT NULL,"
+    " parent_checkpoint_id TEXT,"
+    " type TEXT NOT NULL,"
+    " checkpoint BLOB NOT NULL,"
+    " metadata_type TEXT NOT NULL,"
+    " metadata BLOB NOT NULL,"
+    " created_at REAL NOT NULL,"
+    " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+    "CREATE TABLE IF NOT EXISTS blobs ("
+    " thread_id TEXT NOT NULL,"
+    " checkpoint_ns TEXT NOT NULL DEFAULT '',"
+    " channel TEXT NOT NULL,"
+    " version TEXT NOT NULL,"
+    " type TEXT NOT NULL,"
+    " blob BLOB,"
+    " PRIMARY KEY (thread_id, checkpoint_ns, channel, version))",
+    "CREATE TABLE IF NOT EXISTS messages ("
+    " thread_id TEXT NOT NULL,"
+    " checkpoint_ns TEXT NOT NULL DEFAULT '',"
+    " digest TEXT NOT NULL,"
+    " type TEXT NOT NULL,"
+    " blob BLOB NOT NULL,"
+    " PRIMARY KEY (thread_id, checkpoint_ns, digest))",
+    "CREATE TABLE IF NOT EXISTS writes ("
+    " thread_id TEXT NOT NULL,"
+    " checkpoint_ns TEXT NOT NULL DEFAULT '',"
+    " checkpoint_id TEXT NOT NULL,"
+    " task_id TEXT NOT NULL,"
+    " idx INTEGER NOT NULL,"
+    " channel TEXT NOT NULL,"
+    " type TEXT NOT NULL,"
+    " blob BLOB NOT NULL,"
+    " task_path TEXT NOT NULL DEFAULT '',"
+    " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))",
+)
+
+
+def _chunks(items: Sequence[Any], size: int = _CHUNK) -> Iterator[Sequence[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _is_message_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(m, BaseMessage) for m in value)
+
+
+def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class _Batch:
+    """Rows queued by ``put`` / ``put_writes`` and not yet committed."""
+
+    def __init__(self):
+        self.checkpoints: List[Tuple] = []
+        self.blobs: List[Tuple] = []
+        self.messages: Dict[Tuple[str, str, str], Tuple] = {}
+        self.writes: List[Tuple] = []
+        self.replace_writes: List[Tuple] = []
+        self.threads: Set[Tuple[str, str]] = set()
+
+    def __len__(self) -> int:
+        return (len(self.checkpoints) + len(self.blobs) + len(self.messages)
+                + len(self.writes) + len(self.replace_writes))
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpointer storing threads in a SQLite database; see the module docstring."""
+
+    def __init__(
+            self,
+            path: str = DEFAULT_CHECKPOINT_PATH,
+            *,
+            keep_last: int = DEFAULT_KEEP_LAST,
+            max_age: float = DEFAULT_MAX_AGE,
+            flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            serde: Optional[SerializerProtocol] = None,
+    ):
+        """Open (or create) the database at ``path`` and start the writer thread."""
+        super().__init__(serde=serde)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.keep_last = keep_last
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self._batch = _Batch()
+        self._pending = threading.Condition()
+        self._closed = False
+        self._last_expire = 0.0
+        self._last_prune = time.time()
+        self._prune_due: Set[Tuple[str, str]] = set()
+        # (thread, namespace, channel) -> message id -> (message, type, blob, digest) of the last put.
+        self._message_memo: OrderedDict[Tuple[str, str, str], Dict[str, Tuple]] = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+
+    # -- writing -----------------------------------------------------------
+
+    def _enqueue(self, fill) -> None:
+        with self._pending:
+            if self._closed:
+                raise RuntimeError("checkpointer is closed")
+            was_empty = not len(self._batch)
+            fill(self._batch)
+            if was_empty or len(self._batch) >= self.batch_size:
+                self._pending.notify()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._pending:
+                while not len(self._batch) and not self._closed:
+                    self._pending.wait()
+                if self._closed and not len(self._batch):
+                    return
+                if len(self._batch) < self.batch_size and not self._closed:
+                    # Let the rest of the step's writes join this transaction.
+                    self._pending.wait(self.flush_interval)
+            try:
+                self.flush()
+                if self.max_age and time.time() - self._last_expire >= _EXPIRE_EVERY:
+                    self.expire()
+            except Exception as e:
+                logger.warning("Checkpoint flush failed: %r", e)
+                time.sleep(self.flush_interval or 0.1)
+
+    def flush(self) -> None:
+        """Commit every queued row in one transaction; prune touched threads every ``_PRUNE_EVERY`` seconds."""
+        with self._lock:
+            self._flush_locked()
+            if time.time() - self._last_prune >= _PRUNE_EVERY:
+                self._prune_due_locked()
+
+    def _flush_locked(self) -> None:
+        with self._pending:
+            batch, self._batch = self._batch, _Batch()
+        if not len(batch):
+            return
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO messages (thread_id, checkpoint_ns, digest, type, blob)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    list(batch.messages.values()),
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, type, blob)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    batch.blobs,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id,"
+                    " parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch.checkpoints,
+                )
+                columns = "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, blob, task_path)"
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO writes {columns} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch.writes
+                )
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO writes {columns} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch.replace_writes,
+                )
+        except Exception:
+            # Put the rows back so the next flush retries them; newer rows win on conflict.
+            with self._pending:
+                pending, self._batch = self._batch, batch
+                self._batch.checkpoints += pending.checkpoints
+                self._batch.blobs += pending.blobs
+                self._batch.messages.update(pending.messages)
+                self._batch.writes += pending.writes
+                self._batch.replace_writes += pending.replace_writes
+                self._batch.threads |= pending.threads
+            raise
+        self._prune_due |= batch.threads
+
+    def _dump_value(self, thread_id: str, checkpoint_ns: str, channel: str, value: Any,
+                    messages: Dict) -> Tuple[str, bytes]:
+        if not _is_message_list(value):
+            return self.serde.dumps_typed(value)
+        key = (thread_id, checkpoint_ns, channel)
+        with self._memo_lock:
+            previous = self._message_memo.pop(key, {})
+        memo: Dict[str, Tuple] = {}
+        digests = []
+        for message in value:
+            entry = previous.get(message.id) if message.id else None
+            # Same message as last step (possibly reloaded as a new object): reuse its
+            # serialization. One replaced under the same id (e.g. a collapsed tool
+            # result) compares unequal; a field comparison is far cheaper than a dump.
+            if entry is None or (entry[0] is not message and entry[0] != message):
+                type_, blob = self.serde.dumps_typed(message)
+                digest = hashlib.blake2b(type_.encode() + b"\0" + blob, digest_size=16).hexdigest()
+                entry = (message, type_, blob, digest)
+            _, type_, blob, digest = entry
+            if message.id:
+                memo[message.id] = entry
+            messages[(thread_id, checkpoint_ns, digest)] = (thread_id, checkpoint_ns, digest, type_, blob)
+            digests.append(digest)
+        with self._memo_lock:
+            self._message_memo[key] = memo
+            while len(self._message_memo) > _MESSAGE_MEMO_LISTS:
+                self._message_memo.popitem(last=False)
+        return _MESSAGE_REFS, json.dumps(digests).encode()
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Queue a checkpoint and the channel values that changed in it."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        type_, serialized = self.serde.dumps_typed(c)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        messages: Dict[Tuple[str, str, str], Tuple] = {}
+        blobs = []
+        for channel, version in new_versions.items():
+            if channel in values:
+                value_type, blob = self._dump_value(thread_id, checkpoint_ns, channel, values[channel], messages)
+            else:
+                value_type, blob = "empty", None
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), value_type, blob))
+        row = (
+            thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+            type_, serialized, metadata_type, serialized_metadata, time.time(),
+        )
+
+        def fill(batch: _Batch) -> None:
+            batch.messages.update(messages)
+            batch.blobs += blobs
+            batch.checkpoints.append(row)
+            batch.threads.add((thread_id, checkpoint_ns))
+
+        self._enqueue(fill)
+        return _config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        """Queue the writes of one task for the checkpoint in ``config``."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id,
+                         WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path))
+
+        def fill(batch: _Batch) -> None:
+            for row in rows:
+                # Special writes (errors, interrupts) replace earlier ones; regular writes are kept once.
+                (batch.replace_writes if row[4] < 0 else batch.writes).append(row)
+
+        self._enqueue(fill)
+
+    # -- reading -----------------------------------------------------------
+
+    def _load_channel_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        if not versions:
+            return {}
+        pairs = [(channel, str(version)) for channel, version in versions.items()]
+        rows = []
+        for chunk in _chunks(pairs):
+            placeholders = ", ".join("(?, ?)" for _ in chunk)
+            rows += self._conn.execute(
+                "SELECT channel, type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?"
+                f" AND (channel, version) IN (VALUES {placeholders})",
+                (thread_id, checkpoint_ns, *(value for pair in chunk for value in pair)),
+            ).fetchall()
+        values: Dict[str, Any] = {}
+        refs: Dict[str, List[str]] = {}
+        for channel, type_, blob in rows:
+            if type_ == "empty":
+                continue
+            if type_ == _MESSAGE_REFS:
+                refs[channel] = json.loads(blob)
+            else:
+                values[channel] = self.serde.loads_typed((type_, blob))
+        if refs:
+            digests = list({d for ds in refs.values() for d in ds})
+            messages: Dict[str, Any] = {}
+            for chunk in _chunks(digests):
+                for digest, type_, blob in self._conn.execute(
+                    "SELECT digest, type, blob FROM messages WHERE thread_id = ? AND checkpoint_ns = ?"
+                    f" AND digest IN ({', '.join('?' for _ in chunk)})",
+                    (thread_id, checkpoint_ns, *chunk),
+                ):
+                    messages[digest] = self.serde.loads_typed((type_, blob))
+            for channel, ds in refs.items():
+                missing = [d for d in ds if d not in messages]
+                if missing:
+                    raise RuntimeError(
+                        f"Checkpoint of thread {thread_id!r} references {len(missing)} missing messages"
+                        f" in channel {channel!r}"
+                    )
+                values[channel] = [messages[d] for d in ds]
+        return values
+
+    def _tuple_locked(self, thread_id: str, checkpoint_ns: str, row: Tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, serialized, metadata_type, metadata = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, serialized))
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, blob FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            " ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config=_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(
+                    thread_id, checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                _config(thread_id, checkpoint_ns, parent_checkpoint_id) if parent_checkpoint_id else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, blob)))
+                for task_id, channel, value_type, blob in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Load the checkpoint in ``config``, or the thread's latest one."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            self._flush_locked()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._tuple_locked(thread_id, checkpoint_ns, row)
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first, optionally filtered by thread, metadata and ``before``."""
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint,"
+            " metadata_type, metadata FROM checkpoints"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY checkpoint_id DESC"
+        )
+        if limit is not None and not filter:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            with self._lock:
+                item = self._tuple_locked(thread_id, checkpoint_ns, tuple(row))
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    # -- retention ---------------------------------------------------------
+
+    def _prune_due_locked(self) -> None:
+        """Prune the threads flushed since the last pass down to ``keep_last`` checkpoints."""
+        self._last_prune = time.time()
+        due, self._prune_due = self._prune_due, set()
+        if self.keep_last <= 0 or not due:
+            return
+        try:
+            with self._conn:
+                for thread_id, checkpoint_ns in due:
+                    self._prune_locked(thread_id, checkpoint_ns, self.keep_last)
+        except Exception:
+            self._prune_due |= due
+            raise
+
+    def _prune_locked(self, thread_id: str, checkpoint_ns: str, keep: int) -> None:
+        """Keep the ``keep`` newest checkpoints of a thread and what they reference."""
+        stale = [r[0] for r in self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            " ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, keep),
+        )]
+        if not stale:
+            return
+        key = (thread_id, checkpoint_ns)
+        for chunk in _chunks(stale):
+            marks = ", ".join("?" for _ in chunk)
+            self._conn.execute(
+                f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({marks})",
+                (*key, *chunk),
+            )
+            self._conn.execute(
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({marks})",
+                (*key, *chunk),
+            )
+        # Blobs and messages still referenced by a kept checkpoint survive.
+        referenced: Set[Tuple[str, str]] = set()
+        for type_, serialized in self._conn.execute(
+                "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?", key):
+            versions = self.serde.loads_typed((type_, serialized))["channel_versions"]
+            referenced.update((channel, str(version)) for channel, version in versions.items())
+        blobs = self._conn.execute(
+            "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?", key
+        ).fetchall()
+        self._conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            [(*key, channel, version) for channel, version in blobs if (channel, version) not in referenced],
+        )
+        # Only message lists need their payload read, and only the kept ones are left now.
+        digests: Set[str] = set()
+        for (blob,) in self._conn.execute(
+                "SELECT blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND type = ?", (*key, _MESSAGE_REFS)):
+            digests.update(json.loads(blob))
+        stored = self._conn.execute(
+            "SELECT digest FROM messages WHERE thread_id = ? AND checkpoint_ns = ?", key
+        ).fetchall()
+        self._conn.executemany(
+            "DELETE FROM messages WHERE thread_id = ? AND checkpoint_ns = ? AND digest = ?",
+            [(*key, d) for (d,) in stored if d not in digests],
+        )
+
+    def _delete_thread_locked(self, thread_id: str) -> None:
+        for table in ("checkpoints", "blobs", "messages", "writes"):
+            self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint, blob, message and write of a thread."""
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                self._delete_thread_locked(thread_id)
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """Prune threads: ``"keep_latest"`` keeps each namespace's newest checkpoint, ``"delete"`` drops them."""
+        if strategy not in ("keep_latest", "delete"):
+            raise ValueError(f"Unknown prune strategy: {strategy}")
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                for thread_id in thread_ids:
+                    if strategy == "delete":
+                        self._delete_thread_locked(thread_id)
+                        continue
+                    namespaces = self._conn.execute(
+                        "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+                    ).fetchall()
+                    for (checkpoint_ns,) in namespaces:
+                        self._prune_locked(thread_id, checkpoint_ns, 1)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Delete threads whose newest checkpoint is older than ``max_age``; return how many."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_expire = now
+            if not self.max_age:
+                return 0
+            self._flush_locked()
+            with self._conn:
+                threads = [r[0] for r in self._conn.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                    (now - self.max_age,),
+                )]
+                for thread_id in threads:
+                    self._delete_thread_locked(thread_id)
+        if threads:
+            logger.info("Expired %d idle checkpoint threads", len(threads))
+        return len(threads)
+
+    def close(self) -> None:
+        """Flush queued rows, stop the writer and close the database."""
+        with self._pending:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending.notify()
+        self._writer.join()
+        with self._lock:
+            self._flush_locked()
+            self._prune_due_locked()
+            self._conn.close()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Return the version following ``current``."""
+        # Same scheme as InMemorySaver: increasing counter plus a random suffix, so
+        # versions written on forked branches of a thread do not collide.
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # -- async -------------------------------------------------------------
+    # Puts only queue rows and are safe to call on the event loop; anything that
+    # touches the database runs in a worker thread.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async :meth:`get_tuple`."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async :meth:`list`."""
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async :meth:`put`."""
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        """Async :meth:`put_writes`."""
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async :meth:`delete_thread`."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """Async :meth:`prune`."""
+        await asyncio.to_thread(self.prune, thread_ids, strategy=strategy)
+
+
+_checkpointer: Optional[SQLiteCheckpointSaver] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> SQLiteCheckpointSaver:
+    """Return the process-wide checkpointer, opening it on first use.
+
+    Configured by ``CHECKPOINT_PATH``, ``CHECKPOINT_KEEP_LAST`` (0 keeps every
+    checkpoint), ``CHECKPOINT_MAX_AGE`` in seconds (0 keeps idle threads
+    forever), ``CHECKPOINT_FLUSH_INTERVAL`` and ``CHECKPOINT_BATCH_SIZE``.
+    Queued rows are flushed at interpreter exit.
+    """
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = SQLiteCheckpointSaver()
+            atexit.register(_checkpointer.close)
+        return _checkpointer
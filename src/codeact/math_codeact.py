@@ -4,10 +4,10 @@ import contextlib
 import io
 from typing import Any
 
-from langchain.chat_models import init_chat_model
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph_codeact import create_codeact
 
+from checkpointer.sqlite_saver import get_checkpointer
+from llm.router import get_chat_model
 from codeact.math_tools import multiply, add, divide, subtract, sin, cos, radians, exponentiation, sqrt, ceil
 
 """
@@ -50,10 +50,10 @@ def eval(code: str, _locals: dict[str, Any]) -> tuple[str, dict[str, Any]]:
     return result, new_vars
 
 
-model = init_chat_model("deepseek-chat", model_provider="deepseek")
+model = get_chat_model("deepseek-chat")
 
 code_act = create_codeact(model, tools, eval)
-agent = code_act.compile(checkpointer=MemorySaver())
+agent = code_act.compile(checkpointer=get_checkpointer())
 
 if __name__ == "__main__":
 
@@ -0,0 +1,439 @@
+"""Response cache for deterministic (``temperature=0``) chat model calls.
+
+Graders, query rewriters, SQL checkers and supervisor routers are called at
+``temperature=0`` with prompts that repeat a lot, so the same answer was paid
+for again and again. ``ResponseCache`` is a LangChain ``BaseCache``: pass it
+as ``cache=`` to a chat model and LangChain consults it before every call,
+with a key built from
+
+- the model and its parameters, including bound tool / structured-output
+  schemas (LangChain's ``llm_string``), and
+- the prompt, normalized: message ids dropped and whitespace collapsed.
+
+Lookups go through an in-memory LRU (hits in microseconds, no
+deserialization), then the backend (SQLite by default, or any
+``ResponseCacheBackend``), then optionally a semantic lookup: with
+``similarity`` set, the prompt is embedded and the closest cached prompt for
+the same model and parameters is reused if its cosine similarity reaches the
+threshold. Entries expire after ``ttl`` seconds and the least recently used are
+evicted beyond ``max_entries``.
+
+Only attach it to models that run at ``temperature=0``; ``get_chat_model``
+does so automatically.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import warnings
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./data/llm_response_cache.db")
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def _strip(value: Any) -> Any:
+    """Drop per-call noise (ids, response metadata) from a serialized prompt."""
+    if isinstance(value, dict):
+        # LangChain's class paths are also called "id" but are lists, and are kept.
+        return {
+            k: _strip(v) for k, v in value.items()
+            if k not in ("id", "tool_call_id", "response_metadata", "usage_metadata")
+            or not isinstance(v, (str, dict, type(None)))
+        }
+    if isinstance(value, list):
+        return [_strip(v) for v in value]
+    if isinstance(value, str):
+        return _normalize_text(value)
+    return value
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a chat prompt as serialized by LangChain."""
+    try:
+        return json.dumps(_strip(json.loads(prompt)), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        return _normalize_text(prompt)
+
+
+def _prompt_text(prompt: str) -> str:
+    """Return the message contents of a serialized prompt, for embedding."""
+    try:
+        messages = json.loads(prompt)
+        return "\n".join(str(m.get("kwargs", {}).get("content", "")) for m in messages)
+    except (ValueError, AttributeError):
+        return prompt
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ResponseCacheStats:
+    """Hit and miss counters of a :class:`ResponseCache`."""
+    memory_hits: int = 0
+    backend_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from any tier."""
+        hits = self.memory_hits + self.backend_hits + self.semantic_hits
+        return hits / (hits + self.misses) if hits + self.misses else 0.0
+
+
+class ResponseCacheBackend(ABC):
+    """Where cached responses live; values are serialized generations."""
+
+    @abstractmethod
+    def get(self, key: str, now: float) -> Optional[str]:
+        """Return the value stored under ``key`` unless it expired, marking it recently used."""
+
+    @abstractmethod
+    def put(self, key: str, model: str, value: str, vector: Optional[bytes], expires_at: float) -> None:
+        """Store a value, with the prompt embedding when semantic lookup is on."""
+
+    @abstractmethod
+    def vectors(self, model: str, now: float) -> List[Tuple[str, bytes]]:
+        """Return ``(key, float32 vector)`` of the live entries of ``model``."""
+
+    @abstractmethod
+    def evict(self, max_entries: int, now: float) -> int:
+        """Drop expired entries, then least recently used ones beyond ``max_entries``."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+
+class SQLiteResponseBackend(ResponseCacheBackend):
+    """Backend persisting responses in a SQLite table, shared across processes."""
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        """Open (or create) the database at ``path``."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " vector BLOB,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_model ON responses(model)")
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        """Return the live value under ``key`` and bump its ``last_access``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, model: str, value: str, vector: Optional[bytes], expires_at: float) -> None:
+        """Insert or replace the entry under ``key``."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, vector, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, value, vector, expires_at, time.time()),
+            )
+            self._conn.commit()
+
+    def vectors(self, model: str, now: float) -> List[Tuple[str, bytes]]:
+        """Return ``(key, vector)`` of the live entries of ``model`` that have one."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, vector FROM responses WHERE model = ? AND vector IS NOT NULL AND expires_at > ?",
+                (model, now),
+            ).fetchall()
+
+    def evict(self, max_entries: int, now: float) -> int:
+        """Drop expired rows, then the least recently used down to 90% of ``max_entries``."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > max_entries:
+                # Evict down to 90% so we do not evict on every insert.
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE key IN"
+                    " (SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                    (count - int(max_entries * 0.9),),
+                ).rowcount
+            self._conn.commit()
+            return removed
+
+    def clear(self) -> None:
+        """Delete every row."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryResponseBackend(ResponseCacheBackend):
+    """Process-local backend, e.g. for tests or when no disk is available."""
+
+    def __init__(self):
+        """Create an empty backend."""
+        self._entries: OrderedDict[str, Tuple[str, str, Optional[bytes], float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        """Return the live value under ``key`` and mark it most recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[3] <= now:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, model: str, value: str, vector: Optional[bytes], expires_at: float) -> None:
+        """Store ``value`` as the most recently used entry."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (model, value, vector, expires_at)
+
+    def vectors(self, model: str, now: float) -> List[Tuple[str, bytes]]:
+        """Return ``(key, vector)`` of the live entries of ``model`` that have one."""
+        with self._lock:
+            return [(k, e[2]) for k, e in self._entries.items() if e[0] == model and e[2] is not None and e[3] > now]
+
+    def evict(self, max_entries: int, now: float) -> int:
+        """Drop expired entries, then the least recently used beyond ``max_entries``."""
+        with self._lock:
+            expired = [k for k, e in self._entries.items() if e[3] <= now]
+            for key in expired:
+                del self._entries[key]
+            removed = len(expired)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+                removed += 1
+            return removed
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache(BaseCache):
+    """Exact and, optionally, semantic cache of chat model responses."""
+
+    def __init__(
+            self,
+            backend: Optional[ResponseCacheBackend] = None,
+            ttl: float = DEFAULT_TTL,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+            memory_items: int = 1024,
+            embedding=None,
+            similarity: Optional[float] = None,
+    ):
+        """Create a cache over ``backend`` (SQLite at the default path if omitted).
+
+        Semantic lookup is on when both ``embedding`` and ``similarity`` (the
+        minimum cosine similarity of a hit) are given.
+        """
+        self.backend = backend if backend is not None else SQLiteResponseBackend()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_items = memory_items
+        self.embedding = embedding if similarity else None
+        self.similarity = similarity
+        self.stats = ResponseCacheStats()
+        self._memory: OrderedDict[str, Tuple[RETURN_VAL_TYPE, float]] = OrderedDict()
+        # model hash -> (keys, normalized vectors) for semantic lookup, loaded on first use.
+        self._vectors: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _keys(self, prompt: str, llm_string: str) -> Tuple[str, str]:
+        model = _hash(llm_string)
+        return model, _hash(model, normalize_prompt(prompt))
+
+    @staticmethod
+    def _fresh(generations: RETURN_VAL_TYPE) -> RETURN_VAL_TYPE:
+        """Copy cached generations so callers never share (or mutate) the stored objects.
+
+        The message id is cleared: LangChain then assigns the id of the current
+        run, instead of every hit repeating the id of the call that was cached.
+        """
+        fresh = []
+        for generation in generations:
+            generation = generation.model_copy(deep=True)
+            message = getattr(generation, "message", None)
+            if message is not None:
+                message.id = None
+            fresh.append(generation)
+        return fresh
+
+    def _remember(self, key: str, value: RETURN_VAL_TYPE, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str, now: float) -> Optional[RETURN_VAL_TYPE]:
+        value = self.backend.get(key, now)
+        if value is None:
+            return None
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            generations = loads(value)
+        with self._lock:
+            self._remember(key, generations, now + self.ttl)
+        return generations
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        vector = np.asarray(self.embedding.embed_query(_prompt_text(prompt)), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _index(self, model: str, now: float) -> Tuple[List[str], np.ndarray]:
+        with self._lock:
+            index = self._vectors.get(model)
+            if index is None:
+                rows = self.backend.vectors(model, now)
+                keys = [key for key, _ in rows]
+                matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]) if rows else None
+                index = self._vectors[model] = (keys, matrix)
+            return index
+
+    def _lookup_memory(self, key: str, now: float) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return self._fresh(entry[0])
+        return None
+
+    def _lookup_backend(self, prompt: str, model: str, key: str, now: float) -> Optional[RETURN_VAL_TYPE]:
+        generations = self._load(key, now)
+        if generations is not None:
+            self.stats.backend_hits += 1
+            return self._fresh(generations)
+        if self.embedding is not None:
+            keys, matrix = self._index(model, now)
+            if matrix is not None:
+                similarities = matrix @ self._embed(prompt)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity:
+                    generations = self._load(keys[best], now)
+                    if generations is not None:
+                        self.stats.semantic_hits += 1
+                        return self._fresh(generations)
+        self.stats.misses += 1
+        return None
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Return cached generations for the prompt, trying memory, the backend, then similar prompts."""
+        now = time.time()
+        model, key = self._keys(prompt, llm_string)
+        generations = self._lookup_memory(key, now)
+        if generations is not None:
+            return generations
+        return self._lookup_backend(prompt, model, key, now)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations of a prompt in memory and in the backend."""
+        now = time.time()
+        model, key = self._keys(prompt, llm_string)
+        vector = self._embed(prompt) if self.embedding is not None else None
+        self.backend.put(
+            key, model, dumps(list(return_val)), vector.tobytes() if vector is not None else None, now + self.ttl
+        )
+        with self._lock:
+            self._remember(key, self._fresh(return_val), now + self.ttl)
+            if vector is not None and model in self._vectors:
+                keys, matrix = self._vectors[model]
+                self._vectors[model] = (
+                    keys + [key], vector[None, :] if matrix is None else np.vstack([matrix, vector])
+                )
+            self._writes += 1
+            evict = self._writes % 256 == 0
+        if evict:
+            self.backend.evict(self.max_entries, now)
+            # Rebuilt from the backend on next use, without the evicted rows.
+            self._vectors.clear()
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Async :meth:`lookup`; only the backend and embedding run in a worker thread."""
+        now = time.time()
+        model, key = self._keys(prompt, llm_string)
+        # A memory hit is cheaper than a thread hop; SQLite and embeddings are not.
+        generations = self._lookup_memory(key, now)
+        if generations is not None:
+            return generations
+        return await asyncio.to_thread(self._lookup_backend, prompt, model, key, now)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Async :meth:`update`."""
+        await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        """Drop every cached response from memory and the backend."""
+        with self._lock:
+            self._memory.clear()
+            self._vectors.clear()
+        self.backend.clear()
+
+    def info(self) -> dict:
+        """Return counters and the memory tier size, handy for logging."""
+        return {**asdict(self.stats), "hit_rate": self.stats.hit_rate, "memory_items": len(self._memory)}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, opening it on first use.
+
+    Semantic lookup is enabled by ``LLM_CACHE_SIMILARITY`` (e.g. ``0.97``) and
+    embeds prompts with the shared local Ollama embedding provider.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            similarity = float(os.getenv("LLM_CACHE_SIMILARITY", "0")) or None
+            embedding = None
+            if similarity:
+                from milvus.embedding_provider import get_embedding_provider
+
+                embedding = get_embedding_provider()
+            _cache = ResponseCache(embedding=embedding, similarity=similarity)
+        return _cache
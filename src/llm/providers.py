@@ -0,0 +1,193 @@
+"""Chat model providers and a registry of constructed, tool-bound models.
+
+Graphs used to build their chat model inline, several of them on every step
+(``ChatTongyi().bind_tools(TOOLS)`` in react_agent's ``call_model``), which
+re-converts the tool schemas and creates a new client, losing connection
+reuse. ``ModelRegistry`` builds each model once per
+(provider, model, tools, params) and hands out the cached runnable; DeepSeek
+models share one pooled httpx client per provider. Models created with
+``temperature=0`` get the shared ``llm.cache`` response cache (``LLM_CACHE=0``
+turns it off).
+
+Model names resolve to providers by prefix (``deepseek-chat`` -> deepseek,
+``qwen-plus`` / ``qwq-32b`` -> qwen) or explicitly as ``provider:model``.
+Per-provider limits come from the environment, e.g.
+``LLM_DEEPSEEK_MAX_CONCURRENCY``, ``LLM_DEEPSEEK_RPS``, ``LLM_DEEPSEEK_TIMEOUT``.
+
+pip install -qU langchain-deepseek dashscope langchain-community
+"""
+
+import os
+import threading
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import httpx
+
+# Model name prefix -> provider.
+MODEL_PREFIXES = (
+    ("deepseek", "deepseek"),
+    ("qwen", "qwen"),
+    ("qwq", "qwen"),
+)
+
+# Defaults per provider, overridable with LLM_<PROVIDER>_<SETTING>.
+PROVIDER_DEFAULTS: Dict[str, Dict[str, float]] = {
+    "deepseek": {"max_concurrency": 8, "rps": 10.0, "timeout": 30.0, "hedge_delay": 8.0},
+    "qwen": {"max_concurrency": 8, "rps": 10.0, "timeout": 30.0, "hedge_delay": 8.0},
+}
+
+
+@dataclass(frozen=True)
+class ProviderSettings:
+    """Concurrency, rate, timeout and circuit-breaker settings of one provider."""
+    name: str
+    max_concurrency: int = 8
+    rps: float = 10.0
+    """Average requests per second; ``0`` disables rate limiting."""
+    timeout: float = 30.0
+    """Seconds before a call (or a stream's first chunk) counts as failed and falls back."""
+    hedge_delay: float = 8.0
+    """Hedging delay used until enough latencies are recorded for a p95."""
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls, name: str) -> "ProviderSettings":
+        """Build the settings of ``name`` from its defaults and ``LLM_<NAME>_*`` variables."""
+        values: Dict[str, Any] = dict(PROVIDER_DEFAULTS.get(name, {}))
+        for f in fields(cls):
+            env = os.getenv(f"LLM_{name.upper()}_{f.name.upper()}")
+            if env and f.name != "name":
+                values[f.name] = env
+        # Cast to each field's type, taken from its default.
+        return cls(name=name, **{k: type(getattr(cls, k))(v) for k, v in values.items()})
+
+
+def resolve(model: str) -> Tuple[str, str]:
+    """Split ``model`` into ``(provider, model name)``."""
+    if ":" in model:
+        provider, name = model.split(":", 1)
+        return provider.lower(), name
+    for prefix, provider in MODEL_PREFIXES:
+        if model.lower().startswith(prefix):
+            return provider, model
+    raise ValueError(f"Cannot tell the provider of model {model!r}; use 'provider:model'")
+
+
+_http_clients: Dict[str, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_http_lock = threading.Lock()
+
+
+def http_clients(provider: str) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Return the pooled sync and async httpx clients shared by every model of ``provider``."""
+    with _http_lock:
+        if provider not in _http_clients:
+            settings = ProviderSettings.from_env(provider)
+            limits = httpx.Limits(
+                max_connections=settings.max_concurrency * 2,
+                max_keepalive_connections=settings.max_concurrency,
+                keepalive_expiry=60.0,
+            )
+            timeout = httpx.Timeout(settings.timeout * 4, connect=10.0)
+            _http_clients[provider] = (
+                httpx.Client(limits=limits, timeout=timeout),
+                httpx.AsyncClient(limits=limits, timeout=timeout),
+            )
+        return _http_clients[provider]
+
+
+def create_model(provider: str, model: str, params: Optional[Dict[str, Any]] = None):
+    """Construct the LangChain chat model for ``provider``."""
+    params = dict(params or {})
+    # The router falls back to another provider, so retry little in the client itself.
+    params.setdefault("max_retries", 1)
+    if params.get("temperature") == 0 and os.getenv("LLM_CACHE", "1").lower() not in ("0", "false", "no"):
+        # Deterministic calls: repeated prompts are answered from the response cache.
+        from .cache import get_response_cache
+
+        params.setdefault("cache", get_response_cache())
+    if provider == "deepseek":
+        from langchain_deepseek import ChatDeepSeek
+
+        http_client, http_async_client = http_clients(provider)
+        return ChatDeepSeek(model=model, http_client=http_client, http_async_client=http_async_client, **params)
+    if provider == "qwen":
+        from langchain_community.chat_models import ChatTongyi
+
+        known = set(ChatTongyi.model_fields) | {"model"}
+        model_kwargs = dict(params.pop("model_kwargs", {}))
+        model_kwargs.update({k: params.pop(k) for k in list(params) if k not in known})
+        return ChatTongyi(model=model, model_kwargs=model_kwargs, **params)
+    raise ValueError(f"Unknown provider {provider!r}, expected 'deepseek' or 'qwen'")
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def tools_key(tools: Optional[Sequence[Any]]) -> Tuple:
+    """Identify a tool set by name and object, so a redefined tool rebinds."""
+    return tuple(
+        (getattr(t, "name", None) or getattr(t, "__name__", None) or repr(t), id(t)) for t in tools or ()
+    )
+
+
+class ModelRegistry:
+    """Constructed models and their tool / structured-output bindings, built once per key."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._runnables: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(
+            self,
+            provider: str,
+            model: str,
+            tools: Optional[Sequence[Any]] = None,
+            params: Optional[Dict[str, Any]] = None,
+            tool_kwargs: Optional[Dict[str, Any]] = None,
+            structured: Optional[Tuple[Any, Dict[str, Any]]] = None,
+    ):
+        """Return the model of ``provider`` with the given bindings, constructing it on first use."""
+        base_key = (provider, model, _freeze(params or {}))
+        key = base_key + (
+            tools_key(tools),
+            _freeze(tool_kwargs or {}),
+            (id(structured[0]), _freeze(structured[1])) if structured else None,
+        )
+        runnable = self._runnables.get(key)
+        if runnable is not None:
+            return runnable
+        with self._lock:
+            runnable = self._runnables.get(key)
+            if runnable is None:
+                base = self._runnables.get(base_key + ((), (), None))
+                if base is None:
+                    base = create_model(provider, model, params)
+                    self._runnables[base_key + ((), (), None)] = base
+                runnable = base
+                if tools:
+                    runnable = runnable.bind_tools(list(tools), **(tool_kwargs or {}))
+                if structured:
+                    runnable = runnable.with_structured_output(structured[0], **structured[1])
+                self._runnables[key] = runnable
+            return runnable
+
+    def __len__(self) -> int:
+        """Return the number of cached runnables."""
+        return len(self._runnables)
+
+    def clear(self) -> None:
+        """Forget every cached runnable."""
+        with self._lock:
+            self._runnables.clear()
@@ -0,0 +1,137 @@
+"""Rate limiting, circuit breaking and latency tracking for LLM providers.
+
+Each provider gets one of each, shared by every graph in the process:
+
+- ``TokenBucket`` caps the request rate while allowing short bursts;
+- ``CircuitBreaker`` stops sending requests to a provider after consecutive
+  failures and lets a single trial request through once ``reset_timeout`` has
+  passed;
+- ``LatencyWindow`` keeps recent call latencies so the router can hedge after
+  the provider's observed p95.
+
+All three are thread-safe and usable from sync and async code.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class TokenBucket:
+    """``rate`` requests per second on average, at most ``burst`` at once."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """Create a full bucket; ``burst`` defaults to one second's worth of requests."""
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly borrowed from the future; return the wait in seconds."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        """Wait, without blocking the event loop, until a request may be sent."""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures -> half-open after ``reset_timeout``."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """Create a closed breaker."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """``"closed"``, ``"open"`` or ``"half_open"``."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state only one at a time."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        """Close the circuit and reset the failure count."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def release(self) -> None:
+        """Give back a half-open trial that was abandoned without an outcome."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self) -> None:
+        """Count a failure; open the circuit at the threshold or when a trial fails."""
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class LatencyWindow:
+    """The last ``size`` successful call latencies, in seconds."""
+
+    def __init__(self, size: int = 200):
+        """Create an empty window holding at most ``size`` samples."""
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of recorded samples."""
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """Add the latency of a successful call."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, default: Optional[float] = None, min_samples: int = 20) -> Optional[float]:
+        """Return the ``q``-th percentile, or ``default`` with fewer than ``min_samples`` samples."""
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return default
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
@@ -0,0 +1,395 @@
+"""One place to call chat models: limits, circuit breakers, fallbacks and hedging.
+
+``get_chat_model(configuration.model, tools=TOOLS)`` returns a cached
+``RoutedChatModel``, a runnable that can be used wherever a chat model was
+(``ainvoke``, ``invoke``, ``astream``, ``stream``, ``bind_tools``,
+``with_structured_output``). Each call goes to the first healthy provider in
+``[model, *fallbacks]``:
+
+- every provider has an async semaphore (``max_concurrency``), a token bucket
+  (``rps``) and a circuit breaker shared by all graphs in the process;
+- a call that times out (``timeout``) or fails is retried on the next
+  provider, by default DeepSeek -> ``qwen:qwen-plus``; an open circuit skips
+  the provider without waiting;
+- with ``hedge=True`` (or ``LLM_HEDGE=1``) a second provider is started if the
+  first has not answered after its observed p95 latency, and whichever
+  succeeds first wins. Hedged calls are not token-streamed, since both
+  providers would stream into the same message.
+
+Streams fall back only before their first chunk arrives; a stream that fails
+after that still counts as a failure for the provider's circuit breaker.
+
+``invoke`` and ``stream`` enforce the same ``timeout`` by waiting on the call
+(or the first chunk) from a worker thread. A sync call that times out cannot be
+interrupted: it keeps running in its thread until the HTTP client's own, longer
+timeout ends it, but the caller has already moved on to the fallback.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langgraph.constants import TAG_NOSTREAM
+
+from .providers import ModelRegistry, ProviderSettings, _freeze, resolve, tools_key
+from .resilience import CircuitBreaker, CircuitOpenError, LatencyWindow, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Provider -> models tried, in order, when it times out or fails.
+DEFAULT_FALLBACKS: Dict[str, List[str]] = {
+    "deepseek": ["qwen:qwen-plus"],
+}
+
+
+def _env_fallbacks(provider: str) -> Optional[List[str]]:
+    value = os.getenv(f"LLM_{provider.upper()}_FALLBACKS")
+    if value is None:
+        return None
+    return [m.strip() for m in value.split(",") if m.strip()]
+
+
+_END = object()
+
+
+def _call_with_timeout(fn, timeout: float):
+    """Run ``fn`` in a daemon thread and wait at most ``timeout`` seconds for it."""
+    future: concurrent.futures.Future = concurrent.futures.Future()
+    context = contextvars.copy_context()
+
+    def run() -> None:
+        try:
+            future.set_result(context.run(fn))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="llm-sync-call", daemon=True).start()
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        raise TimeoutError(f"no response within {timeout}s") from None
+
+
+class ProviderState:
+    """Limits and health of one provider, shared across models and graphs."""
+
+    def __init__(self, settings: ProviderSettings):
+        """Create the limiter, breaker and latency window described by ``settings``."""
+        self.settings = settings
+        self.bucket = TokenBucket(settings.rps)
+        self.breaker = CircuitBreaker(settings.failure_threshold, settings.reset_timeout)
+        # Full-completion latencies of invoke calls only: time to a stream's first
+        # chunk is much shorter and would make hedges fire too early.
+        self.latency = LatencyWindow()
+        self.sync_slots = threading.BoundedSemaphore(settings.max_concurrency)
+        # asyncio primitives belong to one event loop; keep a semaphore per loop.
+        self._async_slots: weakref.WeakKeyDictionary[Any, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+    def async_slots(self) -> asyncio.Semaphore:
+        """Return the concurrency semaphore of the running event loop."""
+        loop = asyncio.get_running_loop()
+        slots = self._async_slots.get(loop)
+        if slots is None:
+            slots = self._async_slots[loop] = asyncio.Semaphore(self.settings.max_concurrency)
+        return slots
+
+    def hedge_delay(self) -> float:
+        """Return the observed p95 latency, or the configured delay until there are enough samples."""
+        return self.latency.percentile(95, default=self.settings.hedge_delay)
+
+
+class ProviderRouter:
+    """Provider states, the model registry and the routed models built from them."""
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        """Create a router building models through ``registry``."""
+        self.registry = registry or ModelRegistry()
+        self._states: Dict[str, ProviderState] = {}
+        self._models: Dict[Tuple, RoutedChatModel] = {}
+        self._lock = threading.Lock()
+
+    def state(self, provider: str) -> ProviderState:
+        """Return the shared state of ``provider``, creating it on first use."""
+        with self._lock:
+            if provider not in self._states:
+                self._states[provider] = ProviderState(ProviderSettings.from_env(provider))
+            return self._states[provider]
+
+    def chat_model(
+            self,
+            model: str,
+            tools: Optional[Sequence[Any]] = None,
+            *,
+            fallbacks: Optional[Sequence[str]] = None,
+            hedge: Optional[bool] = None,
+            tool_kwargs: Optional[Dict[str, Any]] = None,
+            structured: Optional[Tuple[Any, Dict[str, Any]]] = None,
+            **params: Any,
+    ) -> "RoutedChatModel":
+        """Return the cached routed model for these arguments, building it on first use."""
+        provider, _ = resolve(model)
+        if fallbacks is None:
+            fallbacks = _env_fallbacks(provider)
+        if fallbacks is None:
+            fallbacks = DEFAULT_FALLBACKS.get(provider, [])
+        if hedge is None:
+            hedge = os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+        key = (
+            model, tuple(fallbacks), hedge, tools_key(tools), _freeze(tool_kwargs or {}), _freeze(params),
+            (id(structured[0]), _freeze(structured[1])) if structured else None,
+        )
+        with self._lock:
+            routed = self._models.get(key)
+            if routed is None:
+                routed = self._models[key] = RoutedChatModel(
+                    self, model, list(fallbacks), hedge, list(tools or []), tool_kwargs or {}, structured, params
+                )
+            return routed
+
+
+class RoutedChatModel(Runnable):
+    """A chat model call spread over a primary model and its fallbacks."""
+
+    def __init__(self, router: ProviderRouter, model: str, fallbacks: List[str], hedge: bool,
+                 tools: List[Any], tool_kwargs: Dict[str, Any], structured, params: Dict[str, Any]):
+        """Create a routed model; use :meth:`ProviderRouter.chat_model` instead."""
+        self.router = router
+        self.model = model
+        self.fallbacks = fallbacks
+        self.hedge = hedge
+        self.tools = tools
+        self.tool_kwargs = tool_kwargs
+        self.structured = structured
+        self.params = params
+        self.targets = [resolve(m) for m in [model, *fallbacks]]
+
+    def _derive(self, **changes) -> "RoutedChatModel":
+        kwargs = dict(
+            fallbacks=self.fallbacks, hedge=self.hedge, tools=self.tools,
+            tool_kwargs=self.tool_kwargs, structured=self.structured,
+        )
+        kwargs.update(changes)
+        return self.router.chat_model(self.model, **kwargs, **self.params)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "RoutedChatModel":
+        """Return the routed model with ``tools`` bound on every target."""
+        return self._derive(tools=list(tools), tool_kwargs=kwargs)
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> "RoutedChatModel":
+        """Return the routed model producing ``schema`` on every target."""
+        return self._derive(structured=(schema, kwargs))
+
+    def _runnable(self, target: Tuple[str, str]):
+        provider, model = target
+        return self.router.registry.get(
+            provider, model, self.tools, self.params, self.tool_kwargs, self.structured
+        )
+
+    # -- async -------------------------------------------------------------
+
+    async def _acall(self, target: Tuple[str, str], input: Any, config: Optional[RunnableConfig]):
+        state = self.router.state(target[0])
+        if not state.breaker.allow():
+            raise CircuitOpenError(f"circuit for {target[0]} is open")
+        runnable = self._runnable(target)
+        try:
+            async with state.async_slots():
+                await state.bucket.aacquire()
+                started = time.monotonic()
+                result = await asyncio.wait_for(runnable.ainvoke(input, config), state.settings.timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not the provider's fault.
+            state.breaker.release()
+            raise
+        except Exception:
+            state.breaker.record_failure()
+            raise
+        state.breaker.record_success()
+        state.latency.record(time.monotonic() - started)
+        return result
+
+    async def _asequential(self, targets, input, config):
+        error: Optional[BaseException] = None
+        for target in targets:
+            try:
+                return await self._acall(target, input, config)
+            except Exception as e:
+                error = e
+                logger.warning("LLM call to %s:%s failed (%s: %s), falling back", *target, type(e).__name__, e)
+        raise error
+
+    async def _ahedged(self, targets, input, config):
+        primary, secondary, rest = targets[0], targets[1], targets[2:]
+        # Both attempts may end up running: keep their tokens out of the message stream.
+        config = {**(config or {}), "tags": [*(config or {}).get("tags", []), TAG_NOSTREAM]}
+        first = asyncio.ensure_future(self._acall(primary, input, config))
+        done, _ = await asyncio.wait({first}, timeout=self.router.state(primary[0]).hedge_delay())
+        if done and not first.exception():
+            return first.result()
+        pending = {first} if not done else set()
+        pending.add(asyncio.ensure_future(self._acall(secondary, input, config)))
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.exception():
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        return await self._asequential(rest, input, config) if rest else first.result()
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        """Call the primary model, hedging or falling back as configured."""
+        if self.hedge and len(self.targets) > 1:
+            return await self._ahedged(self.targets, input, config)
+        return await self._asequential(self.targets, input, config)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        """Stream from the first target that yields a chunk within its timeout."""
+        error: Optional[BaseException] = None
+        for target in self.targets:
+            state = self.router.state(target[0])
+            if not state.breaker.allow():
+                error = CircuitOpenError(f"circuit for {target[0]} is open")
+                continue
+            async with state.async_slots():
+                await state.bucket.aacquire()
+                stream = self._runnable(target).astream(input, config).__aiter__()
+                settled = False
+                try:
+                    try:
+                        first = await asyncio.wait_for(stream.__anext__(), state.settings.timeout)
+                    except StopAsyncIteration:
+                        settled = True
+                        state.breaker.record_success()
+                        return
+                    except Exception as e:
+                        settled = True
+                        state.breaker.record_failure()
+                        error = e
+                        logger.warning("LLM stream from %s:%s failed (%s: %s), falling back",
+                                       *target, type(e).__name__, e)
+                        continue
+                    yield first
+                    async for chunk in stream:
+                        yield chunk
+                    settled = True
+                    state.breaker.record_success()
+                    return
+                except Exception:
+                    # Failed mid-stream: too late to fall back, but it is the provider's failure.
+                    if not settled:
+                        settled = True
+                        state.breaker.record_failure()
+                    raise
+                finally:
+                    if not settled:
+                        # Cancelled or closed by the consumer: no outcome, free a half-open trial.
+                        state.breaker.release()
+                    if hasattr(stream, "aclose"):
+                        await stream.aclose()
+        raise error
+
+    # -- sync --------------------------------------------------------------
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        """Call the targets in order until one answers within its timeout."""
+        error: Optional[BaseException] = None
+        for target in self.targets:
+            state = self.router.state(target[0])
+            if not state.breaker.allow():
+                error = CircuitOpenError(f"circuit for {target[0]} is open")
+                continue
+            with state.sync_slots:
+                state.bucket.acquire()
+                started = time.monotonic()
+                runnable = self._runnable(target)
+                try:
+                    result = _call_with_timeout(lambda: runnable.invoke(input, config), state.settings.timeout)
+                except Exception as e:
+                    state.breaker.record_failure()
+                    error = e
+                    logger.warning("LLM call to %s:%s failed (%s: %s), falling back", *target, type(e).__name__, e)
+                    continue
+            state.breaker.record_success()
+            state.latency.record(time.monotonic() - started)
+            return result
+        raise error
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        """Stream from the first target that yields a chunk within its timeout."""
+        error: Optional[BaseException] = None
+        for target in self.targets:
+            state = self.router.state(target[0])
+            if not state.breaker.allow():
+                error = CircuitOpenError(f"circuit for {target[0]} is open")
+                continue
+            with state.sync_slots:
+                state.bucket.acquire()
+                stream = iter(self._runnable(target).stream(input, config))
+                settled = False
+                # A timed-out first chunk is still being produced in its thread; the
+                # generator cannot be closed from here while it runs.
+                abandoned = False
+                try:
+                    try:
+                        first = _call_with_timeout(lambda: next(stream, _END), state.settings.timeout)
+                    except Exception as e:
+                        settled = True
+                        abandoned = isinstance(e, TimeoutError)
+                        state.breaker.record_failure()
+                        error = e
+                        logger.warning("LLM stream from %s:%s failed (%s: %s), falling back",
+                                       *target, type(e).__name__, e)
+                        continue
+                    if first is _END:
+                        settled = True
+                        state.breaker.record_success()
+                        return
+                    yield first
+                    yield from stream
+                    settled = True
+                    state.breaker.record_success()
+                    return
+                except Exception:
+                    if not settled:
+                        settled = True
+                        state.breaker.record_failure()
+                    raise
+                finally:
+                    if not settled:
+                        state.breaker.release()
+                    if hasattr(stream, "close") and not abandoned:
+                        stream.close()
+        raise error
+
+
+_router: Optional[ProviderRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ProviderRouter:
+    """Return the process-wide router."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter()
+        return _router
+
+
+def get_chat_model(model: str, tools: Optional[Sequence[Any]] = None, **kwargs: Any) -> RoutedChatModel:
+    """Return the process-wide routed model for ``model`` with ``tools`` bound.
+
+    Keyword arguments are ``fallbacks``, ``hedge`` and any chat model
+    parameter (``temperature``, ``max_tokens``, ...). The same arguments give
+    back the same object, so graphs may call this on every step.
+    """
+    return get_router().chat_model(model, tools, **kwargs)
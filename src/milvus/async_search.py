@@ -0,0 +1,96 @@
+"""Non-blocking Milvus search for async callers such as LangGraph tool nodes.
+
+``MilvusClient.search`` is a blocking gRPC call. Calling it directly from an
+``async`` tool stalls the event loop, and with it every other thread the
+LangGraph server is running. ``AsyncMilvusSearcher`` runs searches on a bounded
+thread pool and enforces a per-call timeout both on the asyncio side and as the
+gRPC deadline, so a slow search cannot pin a worker forever. In ``search_text``
+the embedding and the search share one deadline.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pymilvus import MilvusClient
+
+from .embedding_provider import get_embedding_provider
+
+
+class AsyncMilvusSearcher:
+    """Offload blocking ``MilvusClient`` searches to a bounded thread pool."""
+
+    def __init__(self, client: MilvusClient, max_workers: int = 8, timeout: float = 10.0, embedder=None):
+        """Search ``client`` from up to ``max_workers`` threads; ``embedder`` defaults to the shared provider."""
+        self.client = client
+        self.timeout = timeout
+        self.embedder = embedder
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="milvus-search")
+
+    async def search(
+            self,
+            collection_name: str,
+            data: List[List[float]],
+            limit: int = 10,
+            output_fields: Optional[List[str]] = None,
+            search_params: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None,
+            **kwargs,
+    ) -> List[List[dict]]:
+        """Run ``client.search`` off the event loop; raise ``asyncio.TimeoutError`` on timeout."""
+        timeout = timeout or self.timeout
+
+        def call():
+            # Resolve the client in the worker: a lazily connected client may
+            # connect or health-check on attribute access.
+            return self.client.search(
+                collection_name=collection_name,
+                data=data,
+                limit=limit,
+                output_fields=output_fields,
+                search_params=search_params,
+                timeout=timeout,
+                **kwargs,
+            )
+
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self._executor, call), timeout)
+
+    async def search_text(
+            self,
+            query: str,
+            collection_name: str,
+            limit: int = 10,
+            output_fields: Optional[List[str]] = None,
+            search_params: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None,
+            embedder=None,
+            **kwargs,
+    ) -> List[dict]:
+        """Embed ``query`` asynchronously and return its hits.
+
+        ``timeout`` bounds the whole call: the search gets whatever time the
+        embedding left over.
+        """
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        embedder = embedder or self.embedder or get_embedding_provider()
+        query_vector = await asyncio.wait_for(embedder.aembed_query(query), timeout)
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        res = await self.search(
+            collection_name,
+            [query_vector],
+            limit=limit,
+            output_fields=output_fields,
+            search_params=search_params,
+            timeout=remaining,
+            **kwargs,
+        )
+        return res[0] if res else []
+
+    def close(self) -> None:
+        """Shut the thread pool down without waiting for running searches."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,273 @@
+r"""Recall/latency benchmark for the Milvus search path.
+
+A corpus with known nearest neighbours is ingested into a fresh
+``collection_test``-shaped collection per index profile, then queries are
+replayed while sweeping search batch size and top-k. Each run reports QPS,
+p50/p95/p99 latency per search call and recall@k against exact NumPy ground
+truth, as JSON. Each profile also reports the bytes stored per vector, which is
+how the quantized ``int8`` and ``binary`` profiles are compared with the
+float32 ``default``.
+
+The ``client_rss`` figures are the RSS of the benchmark process. They only
+reflect index memory for ``numpy://`` URIs; Milvus Lite and remote Milvus hold
+their indexes in another process.
+
+The corpus is either synthetic clustered vectors (no embedding needed) or a
+JSONL/text file embedded with ``--embedder``; ``hash`` is a deterministic local
+stand-in for Ollama so the whole benchmark runs offline.
+
+Usage:
+    python -m milvus.benchmark --uri ./data/bench.db --num-docs 20000 \
+        --profiles default,hnsw --batch-sizes 1,16 --top-k 1,10 --output bench.json
+    python -m milvus.benchmark --uri numpy://./data/bench_numpy --profiles default,int8,binary
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .connection import get_client
+from .embedding_provider import get_embedding_provider
+from .ingest import iter_chunks
+from .profiles import apply_profile, get_profile, resident_memory_mb
+from .quantization import code_bytes
+
+
+class HashEmbeddings:
+    """Deterministic feature-hashing embedder, a stand-in for Ollama in benchmarks."""
+
+    def __init__(self, dim: int = 768):
+        """Embed into ``dim`` hashed buckets."""
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        tokens = text.lower().split() or [text]
+        for token in tokens:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed one query."""
+        return self._embed(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of documents."""
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async :meth:`embed_query`."""
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async :meth:`embed_documents`."""
+        return self.embed_documents(texts)
+
+
+@dataclass
+class Corpus:
+    """Documents with their unit vectors, and the query vectors replayed against them."""
+    contents: List[str]
+    vectors: np.ndarray
+    queries: np.ndarray
+
+
+def synthetic_corpus(num_docs: int, num_queries: int, dim: int, clusters: int = 64,
+                     noise: float = 0.1, seed: int = 0) -> Corpus:
+    """Clustered unit vectors; queries are noisy copies of random documents."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=num_docs)] + rng.normal(scale=0.5, size=(num_docs, dim))
+    vectors = _normalize(vectors.astype(np.float32))
+    picks = rng.choice(num_docs, size=num_queries, replace=num_queries > num_docs)
+    queries = _normalize(vectors[picks] + rng.normal(scale=noise, size=(num_queries, dim)).astype(np.float32))
+    contents = [f"synthetic document {i}" for i in range(num_docs)]
+    return Corpus(contents, vectors, queries)
+
+
+def file_corpus(paths: Sequence[str], num_queries: int, embedder, seed: int = 0) -> Corpus:
+    """Chunk and embed files; queries are the first words of random chunks."""
+    contents = [chunk.text for chunk in iter_chunks(paths)]
+    vectors = _normalize(np.asarray(embedder.embed_documents(contents), dtype=np.float32))
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(contents), size=num_queries, replace=num_queries > len(contents))
+    query_texts = [" ".join(contents[i].split()[:12]) for i in picks]
+    queries = _normalize(np.asarray(embedder.embed_documents(query_texts), dtype=np.float32))
+    return Corpus(contents, vectors, queries)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def ground_truth(corpus: Corpus, k: int) -> np.ndarray:
+    """Exact top-k row numbers for every query (cosine on unit vectors)."""
+    result = []
+    for start in range(0, len(corpus.queries), 256):
+        scores = corpus.queries[start:start + 256] @ corpus.vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        result.append(np.take_along_axis(top, order, axis=1))
+    return np.concatenate(result)
+
+
+@dataclass
+class RunResult:
+    """Throughput, latency and recall of one (profile, batch size, top-k) run."""
+    profile: str
+    batch_size: int
+    top_k: int
+    queries: int
+    qps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    recall_at_k: float
+    client_rss_mb: float
+
+
+def ingest(client, collection_name: str, corpus: Corpus, profile_name: str,
+           insert_batch_size: int = 1000) -> Tuple[dict, float]:
+    """Recreate ``collection_name`` with a profile and insert the corpus; return the index report and seconds."""
+    if client.has_collection(collection_name):
+        client.drop_collection(collection_name)
+    profile = get_profile(profile_name, dim=corpus.vectors.shape[1])
+    report = apply_profile(client, collection_name, profile)
+    started = time.perf_counter()
+    for start in range(0, len(corpus.contents), insert_batch_size):
+        client.insert(
+            collection_name=collection_name,
+            data=[
+                {"my_id": i, "my_vector": corpus.vectors[i].tolist(), "my_content": corpus.contents[i]}
+                for i in range(start, min(start + insert_batch_size, len(corpus.contents)))
+            ],
+        )
+    if hasattr(client, "flush"):
+        client.flush(collection_name)
+    return report.to_dict(), time.perf_counter() - started
+
+
+def run_search(client, collection_name: str, corpus: Corpus, truth: np.ndarray, profile_name: str,
+               batch_size: int, top_k: int) -> RunResult:
+    """Replay every query in batches of ``batch_size`` and measure latency and recall@``top_k``."""
+    search_params = get_profile(profile_name).search_request()
+    latencies = []
+    hits_found = 0
+    started = time.perf_counter()
+    for start in range(0, len(corpus.queries), batch_size):
+        batch = corpus.queries[start:start + batch_size]
+        t0 = time.perf_counter()
+        res = client.search(
+            collection_name=collection_name,
+            data=batch.tolist(),
+            limit=top_k,
+            output_fields=["my_id"],
+            search_params=search_params,
+        )
+        latencies.append(time.perf_counter() - t0)
+        for offset, hits in enumerate(res):
+            expected = set(truth[start + offset, :top_k].tolist())
+            hits_found += len(expected & {hit["id"] for hit in hits})
+    elapsed = time.perf_counter() - started
+    latencies_ms = np.asarray(latencies) * 1000
+    return RunResult(
+        profile=profile_name,
+        batch_size=batch_size,
+        top_k=top_k,
+        queries=len(corpus.queries),
+        qps=len(corpus.queries) / elapsed if elapsed else 0.0,
+        p50_ms=float(np.percentile(latencies_ms, 50)),
+        p95_ms=float(np.percentile(latencies_ms, 95)),
+        p99_ms=float(np.percentile(latencies_ms, 99)),
+        recall_at_k=hits_found / (len(corpus.queries) * top_k),
+        client_rss_mb=resident_memory_mb(),
+    )
+
+
+def run_benchmark(uri: str, corpus: Corpus, profiles: Sequence[str], batch_sizes: Sequence[int],
+                  top_ks: Sequence[int], keep: bool = False) -> Dict:
+    """Benchmark each profile on ``uri`` and return the JSON-ready report."""
+    truth = ground_truth(corpus, max(top_ks))
+    client = get_client(uri)
+    report = {
+        "uri": uri,
+        "num_docs": len(corpus.contents),
+        "num_queries": len(corpus.queries),
+        "dim": int(corpus.vectors.shape[1]),
+        "profiles": {},
+        "runs": [],
+    }
+    try:
+        for profile_name in profiles:
+            collection_name = f"bench_{profile_name}"
+            rss_before = resident_memory_mb()
+            index_report, ingest_seconds = ingest(client, collection_name, corpus, profile_name)
+            profile = get_profile(profile_name)
+            summary = {
+                "index": index_report,
+                "quantization": profile.quantization,
+                "vector_bytes_per_row": code_bytes(int(corpus.vectors.shape[1]), profile.quantization),
+                "ingest_seconds": ingest_seconds,
+                "ingest_client_rss_delta_mb": resident_memory_mb() - rss_before,
+            }
+            rss_before = resident_memory_mb()
+            for batch_size in batch_sizes:
+                for top_k in top_ks:
+                    result = run_search(client, collection_name, corpus, truth, profile_name, batch_size, top_k)
+                    report["runs"].append(asdict(result))
+            summary["search_client_rss_delta_mb"] = resident_memory_mb() - rss_before
+            report["profiles"][profile_name] = summary
+            if not keep:
+                client.drop_collection(collection_name)
+    finally:
+        client.close()
+    return report
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark Milvus retrieval recall and latency.")
+    parser.add_argument("--uri", default="./data/bench.db")
+    parser.add_argument("--corpus", nargs="*", help="text/JSONL files; synthetic vectors if omitted")
+    parser.add_argument("--embedder", choices=["hash", "ollama"], default="hash")
+    parser.add_argument("--num-docs", type=int, default=10000)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--profiles", default="default")
+    parser.add_argument("--batch-sizes", type=_ints, default=[1, 16])
+    parser.add_argument("--top-k", type=_ints, default=[1, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the bench_* collections")
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        embedder = HashEmbeddings(args.dim) if args.embedder == "hash" else get_embedding_provider()
+        corpus = file_corpus(args.corpus, args.num_queries, embedder, seed=args.seed)
+    else:
+        corpus = synthetic_corpus(args.num_docs, args.num_queries, args.dim, seed=args.seed)
+
+    report = run_benchmark(
+        args.uri, corpus, args.profiles.split(","), args.batch_sizes, args.top_k, keep=args.keep
+    )
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Sparse lexical (BM25) index kept alongside a Milvus collection.
+
+Dense retrieval often misses exact identifiers, error codes and names. This
+index stores an inverted index in SQLite (``postings`` keyed by term, plus
+per-term document frequencies and collection length stats), so it is updated
+incrementally on insert, shared between processes and scored with Okapi BM25
+at query time.
+
+Tokenization is CJK-aware: runs of Chinese/Japanese/Korean characters become
+unigrams plus bigrams, everything else is split into lower-cased word tokens
+that keep ``-``, ``_`` and ``.`` inside identifiers (``ERR-404``, ``my_id``).
+"""
+
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .retrieval import SearchHit
+
+DEFAULT_INDEX_DIR = "./data/bm25"
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[A-Za-z0-9]+(?:[-_.][A-Za-z0-9]+)*")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split mixed Chinese/English text into BM25 terms."""
+    tokens: List[str] = []
+    for match in _TOKEN_RE.finditer(text):
+        token = match.group()
+        if _CJK_RE.match(token):
+            tokens.extend(token)
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            token = token.lower()
+            tokens.append(token)
+            # Also index the parts of compound identifiers so "404" finds "ERR-404".
+            parts = re.split(r"[-_.]", token)
+            if len(parts) > 1:
+                tokens.extend(p for p in parts if p)
+    return tokens
+
+
+class BM25Index:
+    """SQLite-backed inverted index with Okapi BM25 scoring."""
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        """Open (or create) the index at ``path`` with BM25 parameters ``k1`` and ``b``."""
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, len INTEGER NOT NULL, content TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+            CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO stats VALUES ('n_docs', 0), ('total_len', 0);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(docs)")}
+        if "tenant" not in columns:
+            self._conn.execute("ALTER TABLE docs ADD COLUMN tenant TEXT NOT NULL DEFAULT ''")
+            self._conn.commit()
+
+    def add(self, docs: Iterable[Tuple]) -> None:
+        """Index ``(id, content)`` or ``(id, content, tenant)`` tuples.
+
+        Documents that already exist are replaced.
+        """
+        docs = list(docs)
+        if not docs:
+            return
+        with self._lock:
+            self._remove([doc[0] for doc in docs])
+            total_len = 0
+            df: Counter = Counter()
+            postings = []
+            rows = []
+            for doc in docs:
+                doc_id, content = doc[0], doc[1]
+                tenant = doc[2] if len(doc) > 2 else ""
+                counts = Counter(tokenize(content))
+                length = sum(counts.values())
+                total_len += length
+                rows.append((doc_id, length, content, tenant or ""))
+                df.update(counts.keys())
+                postings.extend((term, doc_id, tf) for term, tf in counts.items())
+            self._conn.executemany("INSERT INTO docs (id, len, content, tenant) VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+            self._conn.executemany(
+                "INSERT INTO terms VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                df.items(),
+            )
+            self._bump_stats(len(rows), total_len)
+            self._conn.commit()
+
+    def remove(self, ids: Sequence[int]) -> None:
+        """Delete documents by id; unknown ids are ignored."""
+        with self._lock:
+            self._remove(ids)
+            self._conn.commit()
+
+    def _remove(self, ids: Sequence[int]) -> None:
+        for start in range(0, len(ids), 500):
+            chunk = list(ids[start:start + 500])
+            placeholders = ",".join("?" * len(chunk))
+            removed = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(len), 0) FROM docs WHERE id IN ({placeholders})", chunk
+            ).fetchone()
+            if not removed[0]:
+                continue
+            terms = self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE doc_id IN ({placeholders}) GROUP BY term", chunk
+            ).fetchall()
+            self._conn.executemany("UPDATE terms SET df = df - ? WHERE term = ?", [(n, t) for t, n in terms])
+            self._conn.execute("DELETE FROM terms WHERE df <= 0")
+            self._conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", chunk)
+            self._conn.execute(f"DELETE FROM docs WHERE id IN ({placeholders})", chunk)
+            self._bump_stats(-removed[0], -removed[1])
+
+    def _bump_stats(self, n_docs: int, total_len: int) -> None:
+        self._conn.executemany(
+            "UPDATE stats SET value = value + ? WHERE key = ?",
+            [(n_docs, "n_docs"), (total_len, "total_len")],
+        )
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        with self._lock:
+            return self._conn.execute("SELECT value FROM stats WHERE key = 'n_docs'").fetchone()[0]
+
+    def search(self, query: str, limit: int = 10, max_df_ratio: float = 0.5,
+               tenant: Optional[str] = None) -> List[SearchHit]:
+        """Return the ``limit`` best BM25 matches for ``query``.
+
+        Terms that occur in more than ``max_df_ratio`` of all documents are
+        skipped (unless nothing else is left) since they carry almost no
+        signal but have the longest posting lists. With ``tenant`` only that
+        tenant's documents are scored.
+        """
+        query_terms = Counter(tokenize(query))
+        if not query_terms:
+            return []
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT key, value FROM stats").fetchall())
+            n_docs = stats["n_docs"]
+            if not n_docs:
+                return []
+            avgdl = stats["total_len"] / n_docs
+            terms = list(query_terms)
+            placeholders = ",".join("?" * len(terms))
+            df: Dict[str, int] = dict(
+                self._conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms).fetchall()
+            )
+            if not df:
+                return []
+            selective = [t for t in df if df[t] <= max_df_ratio * n_docs] or list(df)
+            placeholders = ",".join("?" * len(selective))
+            sql = (
+                "SELECT p.term, p.doc_id, p.tf, d.len FROM postings p JOIN docs d ON d.id = p.doc_id"
+                f" WHERE p.term IN ({placeholders})"
+            )
+            params = list(selective)
+            if tenant is not None:
+                sql += " AND d.tenant = ?"
+                params.append(tenant)
+            rows = self._conn.execute(sql, params).fetchall()
+
+            scores: Dict[int, float] = {}
+            for term, doc_id, tf, length in rows:
+                idf = math.log(1 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_terms[term] * idf * norm
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            if not top:
+                return []
+            placeholders = ",".join("?" * len(top))
+            contents = dict(
+                self._conn.execute(
+                    f"SELECT id, content FROM docs WHERE id IN ({placeholders})", [doc_id for doc_id, _ in top]
+                ).fetchall()
+            )
+        return [SearchHit(id=doc_id, content=contents.get(doc_id, ""), score=score) for doc_id, score in top]
+
+    def clear(self) -> None:
+        """Drop every document, e.g. when the collection it shadows is dropped."""
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM terms")
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("UPDATE stats SET value = 0")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(collection_name: str, root: str = DEFAULT_INDEX_DIR) -> BM25Index:
+    """Return the process-wide BM25 index that shadows ``collection_name``."""
+    path = os.path.join(root, f"{collection_name}.db")
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = BM25Index(path)
+            _indexes[path] = index
+        return index
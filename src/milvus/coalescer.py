@@ -0,0 +1,132 @@
+"""Micro-batching of concurrent embedding requests.
+
+When many LangGraph threads call ``milvus_search`` at once, each one would send
+its own single-text request to Ollama. ``EmbeddingCoalescer`` collects queries
+that arrive within ``max_wait`` seconds (or until ``max_batch`` are queued),
+sends them as one ``aembed_documents`` call and hands each waiter its vector.
+"""
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Set, Tuple
+
+
+@dataclass
+class CoalescerStats:
+    """Counters describing how well requests are being batched."""
+
+    requests: int = 0
+    batches: int = 0
+    texts_embedded: int = 0
+    size_flushes: int = 0
+    timer_flushes: int = 0
+    errors: int = 0
+    total_wait: float = 0.0
+
+    @property
+    def avg_batch_size(self) -> float:
+        """Mean number of requests per embedding call."""
+        return self.requests / self.batches if self.batches else 0.0
+
+    @property
+    def avg_wait_ms(self) -> float:
+        """Mean time a request waited for its batch, in milliseconds."""
+        return self.total_wait * 1000 / self.requests if self.requests else 0.0
+
+
+class EmbeddingCoalescer:
+    """Batch ``aembed_query`` calls from concurrent tasks into one request.
+
+    The sync methods and ``aembed_documents`` pass straight through, so the
+    coalescer can stand in for the provider it wraps.
+    """
+
+    def __init__(self, embedder, max_batch: int = 32, max_wait: float = 0.005):
+        """Wrap ``embedder``, flushing at ``max_batch`` requests or after ``max_wait`` seconds."""
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = CoalescerStats()
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The event loop keeps only weak references to tasks: hold running batches here.
+        self._tasks: Set[asyncio.Task] = set()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed one query with the wrapped embedder."""
+        return self.embedder.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with the wrapped embedder."""
+        return self.embedder.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with the wrapped embedder, asynchronously."""
+        return await self.embedder.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed one query as part of the next batch."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            if self._pending:
+                raise RuntimeError("EmbeddingCoalescer is already batching on another event loop")
+            self._loop = loop
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        self.stats.requests += 1
+        if len(self._pending) >= self.max_batch:
+            self.stats.size_flushes += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._on_timer)
+        return await future
+
+    def info(self) -> dict:
+        """Return the counters and the number of pending requests, handy for logging."""
+        return {
+            **asdict(self.stats),
+            "avg_batch_size": self.stats.avg_batch_size,
+            "avg_wait_ms": self.stats.avg_wait_ms,
+            "pending": len(self._pending),
+        }
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        if self._pending:
+            self.stats.timer_flushes += 1
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        task = self._loop.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        now = time.perf_counter()
+        self.stats.total_wait += sum(now - queued for _, _, queued in batch)
+        # Identical queries in the same window are embedded once.
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        self.stats.batches += 1
+        self.stats.texts_embedded += len(texts)
+        try:
+            vectors = await self.embedder.aembed_documents(texts)
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            self.stats.errors += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_text = dict(zip(texts, vectors))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
@@ -0,0 +1,233 @@
+"""Shared, lazily created Milvus connections.
+
+Each module used to open its own ``MilvusClient`` at import time, so merely
+importing the react_agent tools spun up Milvus Lite. ``get_client`` instead
+returns a lightweight handle; the real client is created on first use and
+reference-counted per URI, so every handle in the process shares it.
+
+- Milvus Lite paths (``./data/milvus_demo.db``) get a single client.
+- Remote URIs (``http://host:19530``) get a small pool of clients, each with
+  its own gRPC channel, handed out round-robin.
+- ``numpy://<dir>`` URIs open a :class:`~milvus.numpy_store.NumpyVectorClient`.
+
+Local paths are keyed by their absolute path, so ``data/milvus_demo.db`` and
+``./data/milvus_demo.db`` share one Milvus Lite server.
+
+Connections are health-checked at most every ``health_interval`` seconds, in a
+background thread so callers never wait for the probe, and replaced if the
+check fails. Everything still open is closed at exit.
+"""
+
+import atexit
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymilvus import MilvusClient
+
+DEFAULT_URI = "./data/milvus_demo.db"
+
+logger = logging.getLogger(__name__)
+
+
+def _is_remote(uri: str) -> bool:
+    return uri.startswith(("http://", "https://", "tcp://", "grpc://"))
+
+
+class _Pool:
+    def __init__(self, uri: str, size: int, kwargs: Dict[str, Any]):
+        self.uri = uri
+        self.kwargs = kwargs
+        self.refs = 0
+        self.lock = threading.Lock()
+        self.clients: List[Any] = [self._connect() for _ in range(size)]
+        self._next = itertools.cycle(range(size))
+        self.checked_at = time.monotonic()
+        self.checking = False
+
+    def _connect(self):
+        if self.uri.startswith("numpy://"):
+            from .numpy_store import NumpyVectorClient
+
+            return NumpyVectorClient(self.uri[len("numpy://"):])
+        return MilvusClient(self.uri, **self.kwargs)
+
+    def get(self):
+        with self.lock:
+            return self.clients[next(self._next)]
+
+    def claim_check(self, interval: float) -> bool:
+        """Whether a health check is due and not already running; if so, the caller runs it."""
+        with self.lock:
+            if self.checking or time.monotonic() - self.checked_at <= interval:
+                return False
+            self.checking = True
+            return True
+
+    def health_check(self, timeout: float = 2.0) -> int:
+        """Replace clients that fail a trivial request; return how many were replaced.
+
+        Probes and reconnects run without the pool lock, so ``get`` keeps
+        handing out clients meanwhile.
+        """
+        replaced = 0
+        try:
+            with self.lock:
+                clients = list(self.clients)
+            for i, client in enumerate(clients):
+                try:
+                    if isinstance(client, MilvusClient):
+                        client.list_collections(timeout=timeout)
+                    else:
+                        client.list_collections()
+                    continue
+                except Exception as e:
+                    logger.warning("Milvus connection to %s unhealthy, reconnecting: %s", self.uri, e)
+                fresh = self._connect()
+                with self.lock:
+                    if i < len(self.clients) and self.clients[i] is client:
+                        self.clients[i], stale = fresh, client
+                        replaced += 1
+                    else:
+                        # Closed or replaced meanwhile.
+                        stale = fresh
+                _close_quietly(stale)
+        finally:
+            with self.lock:
+                self.checked_at = time.monotonic()
+                self.checking = False
+        return replaced
+
+    def close(self):
+        with self.lock:
+            for client in self.clients:
+                _close_quietly(client)
+            self.clients = []
+
+
+def _close_quietly(client) -> None:
+    try:
+        client.close()
+    except Exception as e:
+        logger.warning("Error during cleanup: %s", e)
+
+
+class ConnectionManager:
+    """Reference-counted clients keyed by URI, safe to share across threads and tasks."""
+
+    def __init__(self, remote_pool_size: int = 4, health_interval: float = 30.0):
+        """Pool ``remote_pool_size`` clients per remote URI; check health every ``health_interval`` seconds."""
+        self.remote_pool_size = remote_pool_size
+        self.health_interval = health_interval
+        self._pools: Dict[Tuple, _Pool] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close_all)
+
+    @staticmethod
+    def _key(uri: str, kwargs: Dict[str, Any]) -> Tuple:
+        if uri.startswith("numpy://"):
+            uri = "numpy://" + os.path.abspath(uri[len("numpy://"):])
+        elif not _is_remote(uri):
+            uri = os.path.abspath(uri)
+        return (uri, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+
+    def acquire(self, uri: str = DEFAULT_URI, **kwargs) -> Tuple:
+        """Open (or share) the connection for ``uri`` and take a reference to it."""
+        key = self._key(uri, kwargs)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                size = self.remote_pool_size if _is_remote(uri) else 1
+                pool = _Pool(uri, size, kwargs)
+                self._pools[key] = pool
+            pool.refs += 1
+        return key
+
+    def release(self, key: Tuple) -> None:
+        """Drop a reference; the connection is closed when the last one goes."""
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                return
+            pool.refs -= 1
+            if pool.refs > 0:
+                return
+            del self._pools[key]
+        pool.close()
+
+    def get(self, key: Tuple):
+        """Return a client for an acquired connection, starting a health check if one is due."""
+        pool = self._pools.get(key)
+        if pool is None:
+            raise RuntimeError("Milvus connection has been released")
+        if pool.claim_check(self.health_interval):
+            threading.Thread(target=pool.health_check, name="milvus-health-check", daemon=True).start()
+        return pool.get()
+
+    def health_check(self) -> Dict[str, int]:
+        """Check every pool now, in the calling thread."""
+        with self._lock:
+            pools = list(self._pools.values())
+        return {pool.uri: pool.health_check() for pool in pools}
+
+    def close_all(self) -> None:
+        """Close every connection, whatever its reference count; runs at exit."""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+
+_manager: Optional[ConnectionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_connection_manager() -> ConnectionManager:
+    """Return the process-wide connection manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ConnectionManager()
+        return _manager
+
+
+class LazyMilvusClient:
+    """A ``MilvusClient`` stand-in that connects on first use.
+
+    Attribute access is forwarded to a client from the shared
+    :class:`ConnectionManager`; ``close`` only drops this handle's reference.
+    """
+
+    def __init__(self, uri: str = DEFAULT_URI, **kwargs):
+        """Remember ``uri`` and client arguments; nothing connects yet."""
+        self.uri = uri
+        self._kwargs = kwargs
+        self._key: Optional[Tuple] = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        if self._key is None:
+            with self._lock:
+                if self._key is None:
+                    self._key = get_connection_manager().acquire(self.uri, **self._kwargs)
+        return get_connection_manager().get(self._key)
+
+    def __getattr__(self, name: str):
+        """Forward to a connected client."""
+        return getattr(self._client(), name)
+
+    def close(self) -> None:
+        """Drop this handle's reference to the shared connection."""
+        with self._lock:
+            if self._key is not None:
+                get_connection_manager().release(self._key)
+                self._key = None
+
+
+def get_client(uri: str = DEFAULT_URI, **kwargs) -> LazyMilvusClient:
+    """Return a lazily connecting, shared client handle for ``uri``."""
+    return LazyMilvusClient(uri, **kwargs)
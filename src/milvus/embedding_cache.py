@@ -0,0 +1,314 @@
+"""Persistent content-addressed cache in front of the embedding provider.
+
+Entries are keyed by ``sha256(model + normalized text)``. Lookups go through an
+in-memory LRU first and then a SQLite table of float32 blobs; the SQLite tier is
+bounded by size and evicts the least recently used rows once it grows past
+``max_bytes``. Disk hits only note their access time in memory; the
+``last_access`` updates are written in batches, with the next insert or once
+``touch_batch`` of them are pending, so reads do not each commit a write.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_CACHE_PATH = "./data/embedding_cache.db"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so near-verbatim repeats share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    """Return the content address of ``text`` embedded by ``model``."""
+    payload = f"{model}\x00{normalize_text(text)}".encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for an :class:`EmbeddingCache`."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from either tier."""
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+
+class EmbeddingCache:
+    """Two-tier (LRU + SQLite) float32 embedding store."""
+
+    def __init__(
+            self,
+            path: str = DEFAULT_CACHE_PATH,
+            memory_items: int = 4096,
+            max_bytes: int = 512 * 1024 * 1024,
+            touch_batch: int = 256,
+    ):
+        """Open (or create) the cache database at ``path``.
+
+        ``memory_items`` bounds the LRU tier and ``max_bytes`` the SQLite tier;
+        ``last_access`` updates of disk hits are written every ``touch_batch`` reads.
+        """
+        self.path = path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, List[float]] = OrderedDict()
+        # key -> last disk read, not yet written to ``last_access``.
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        self._disk_bytes = int(row[0])
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up ``texts``; missing entries are returned as ``None``."""
+        keys = [cache_key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        with self._lock:
+            pending: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    # Callers get copies: the stored list must not change under the LRU.
+                    results[i] = list(vector)
+                else:
+                    pending.setdefault(key, []).append(i)
+            if not pending:
+                return results
+
+            found = self._read_disk(list(pending))
+            for key, positions in pending.items():
+                vector = found.get(key)
+                if vector is None:
+                    self.stats.misses += len(positions)
+                    continue
+                self.stats.disk_hits += len(positions)
+                self._remember(key, vector)
+                for i in positions:
+                    results[i] = list(vector)
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Store freshly computed embeddings in both tiers."""
+        now = time.time()
+        rows: Dict[str, tuple] = {}
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(model, text)
+                vector = list(vector)
+                self._remember(key, vector)
+                rows[key] = (key, model, array("f", vector).tobytes(), now)
+            self._write_disk(list(rows.values()))
+
+    def clear(self) -> None:
+        """Drop every cached embedding."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._disk_bytes = 0
+
+    def close(self) -> None:
+        """Write pending access times and close the database."""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+    def info(self) -> dict:
+        """Return counters and tier sizes, handy for logging."""
+        return {
+            **asdict(self.stats),
+            "hit_rate": self.stats.hit_rate,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        # SQLite limits the number of host parameters per statement.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        if found:
+            now = time.time()
+            self._touched.update((key, now) for key in found)
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._conn.commit()
+        return found
+
+    def _flush_touched(self) -> None:
+        """Write pending ``last_access`` updates; the caller commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(now, key) for key, now in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _write_disk(self, rows: List[tuple]) -> None:
+        if not rows:
+            return
+        # Eviction orders by last_access, so pending reads must be recorded first.
+        self._flush_touched()
+        # Rows being replaced must not be counted twice towards the budget.
+        replaced = 0
+        for start in range(0, len(rows), 500):
+            chunk = [row[0] for row in rows[start:start + 500]]
+            placeholders = ",".join("?" * len(chunk))
+            replaced += self._conn.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({placeholders})",
+                chunk,
+            ).fetchone()[0]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model, vector, last_access) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self._disk_bytes += sum(len(row[2]) for row in rows) - int(replaced)
+        if self._disk_bytes > self.max_bytes:
+            self._evict()
+        self._conn.commit()
+
+    def _evict(self) -> None:
+        # Evict down to 90% of the budget so we do not evict on every insert.
+        target = int(self.max_bytes * 0.9)
+        while self._disk_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            evicted = []
+            for key, size in rows:
+                if self._disk_bytes <= target:
+                    break
+                evicted.append((key,))
+                self._memory.pop(key, None)
+                self._touched.pop(key, None)
+                self._disk_bytes -= size
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+            self.stats.evictions += len(evicted)
+
+
+class CachedEmbeddings:
+    """Wrap an embedder exposing ``embed_query``/``embed_documents`` with a cache.
+
+    Only cache misses are forwarded to the wrapped embedder, batched into a
+    single ``embed_documents`` call. The async methods run the SQLite tier in a
+    worker thread so lookups never block the event loop.
+    """
+
+    def __init__(self, embedder, cache: EmbeddingCache, model: str):
+        """Cache the embeddings ``embedder`` computes for ``model``."""
+        self.embedder = embedder
+        self.cache = cache
+        self.model = model
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed one query, from the cache when possible."""
+        cached = self.cache.get_many(self.model, [text])[0]
+        if cached is not None:
+            return cached
+        vector = self.embedder.embed_query(text)
+        self.cache.put_many(self.model, [text], [vector])
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, computing only the cache misses."""
+        results = self.cache.get_many(self.model, texts)
+        missing = _missing_texts(self.model, texts, results)
+        if missing:
+            pending = [text for text, _ in missing.values()]
+            vectors = self.embedder.embed_documents(pending)
+            self.cache.put_many(self.model, pending, vectors)
+            _fill(results, missing, vectors)
+        return results
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async :meth:`embed_query`."""
+        cached = (await asyncio.to_thread(self.cache.get_many, self.model, [text]))[0]
+        if cached is not None:
+            return cached
+        vector = await self.embedder.aembed_query(text)
+        await asyncio.to_thread(self.cache.put_many, self.model, [text], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async :meth:`embed_documents`."""
+        results = await asyncio.to_thread(self.cache.get_many, self.model, texts)
+        missing = _missing_texts(self.model, texts, results)
+        if missing:
+            pending = [text for text, _ in missing.values()]
+            vectors = await self.embedder.aembed_documents(pending)
+            await asyncio.to_thread(self.cache.put_many, self.model, pending, vectors)
+            _fill(results, missing, vectors)
+        return results
+
+
+def _missing_texts(
+        model: str, texts: Sequence[str], results: List[Optional[List[float]]]
+) -> Dict[str, Tuple[str, List[int]]]:
+    """Group cache misses by key so duplicates in a batch are embedded once."""
+    missing: Dict[str, Tuple[str, List[int]]] = {}
+    for i, (text, vector) in enumerate(zip(texts, results)):
+        if vector is None:
+            missing.setdefault(cache_key(model, text), (text, []))[1].append(i)
+    return missing
+
+
+def _fill(results: List[Optional[List[float]]], missing: Dict[str, Tuple[str, List[int]]], vectors) -> None:
+    for (_, positions), vector in zip(missing.values(), vectors):
+        for i in positions:
+            results[i] = list(vector)
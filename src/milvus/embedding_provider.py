@@ -0,0 +1,121 @@
+"""Shared Ollama embedding provider.
+
+Every caller used to build a fresh ``OllamaEmbeddings`` per request, paying for
+client construction and a new HTTP connection each time. This module keeps one
+long-lived client per model whose underlying httpx transports pool keep-alive
+connections, and exposes sync and async ``embed_query`` / ``embed_documents``.
+
+pip install -qU langchain-ollama
+
+Smoke test, from src/: ``python -m milvus.embedding_provider``.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_ollama import OllamaEmbeddings
+
+from .coalescer import EmbeddingCoalescer
+from .embedding_cache import CachedEmbeddings, EmbeddingCache
+
+DEFAULT_MODEL = "nomic-embed-text"
+
+
+class EmbeddingProvider:
+    """A long-lived embedding client for a single Ollama model."""
+
+    def __init__(
+            self,
+            model: str = DEFAULT_MODEL,
+            base_url: Optional[str] = None,
+            max_connections: int = 16,
+            max_keepalive_connections: int = 8,
+            keepalive_expiry: float = 60.0,
+            timeout: float = 30.0,
+    ):
+        """Create the client of ``model``; pool limits and ``timeout`` apply to sync and async calls."""
+        self.model = model
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # client_kwargs are forwarded to ollama.Client / ollama.AsyncClient and
+        # from there to httpx, so both transports share the same pool limits.
+        self._embeddings = OllamaEmbeddings(
+            model=model,
+            base_url=base_url,
+            client_kwargs={"timeout": timeout, "limits": limits},
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query text."""
+        return self._embeddings.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts in one request."""
+        if not texts:
+            return []
+        return self._embeddings.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single query text without blocking the event loop."""
+        return await self._embeddings.aembed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts without blocking the event loop."""
+        if not texts:
+            return []
+        return await self._embeddings.aembed_documents(texts)
+
+
+_providers: Dict[Tuple[str, bool, bool], Any] = {}
+_providers_lock = threading.Lock()
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, opening it on first use."""
+    global _cache
+    with _providers_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+
+def get_embedding_provider(model: str = DEFAULT_MODEL, cached: bool = True, coalesce: bool = False):
+    """Return the process-wide provider for ``model``, creating it on first use.
+
+    With ``cached`` (the default) the provider is wrapped by the persistent
+    embedding cache so repeated texts skip the Ollama round-trip. With
+    ``coalesce`` concurrent ``aembed_query`` cache misses are micro-batched
+    into a single Ollama request.
+    """
+    key = (model, cached, coalesce)
+    provider = _providers.get(key)
+    if provider is not None:
+        return provider
+    cache = get_embedding_cache() if cached else None
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = _providers.get((model, False, False))
+            if provider is None:
+                provider = EmbeddingProvider(model=model)
+                _providers[(model, False, False)] = provider
+            # Layering: cache -> coalescer -> pooled client, so cache hits
+            # never wait for a batching window.
+            if coalesce:
+                provider = EmbeddingCoalescer(provider)
+            if cache is not None:
+                provider = CachedEmbeddings(provider, cache, model)
+            _providers[key] = provider
+        return provider
+
+
+if __name__ == "__main__":
+    provider = get_embedding_provider()
+    vectors = provider.embed_documents(["Hello, world!", "你好，世界！"])
+    print(len(vectors), len(vectors[0]))  # noqa: T201
+    print(get_embedding_cache().info())  # noqa: T201
@@ -0,0 +1,357 @@
+"""A whitelisted subset of the Milvus boolean filter language.
+
+Supported: comparisons of a field with a literal (``==``, ``!=``, ``<``,
+``<=``, ``>``, ``>=``, also chained as ``lo <= field < hi``), ``in`` /
+``not in`` lists, ``like`` with ``%`` wildcards, ``and`` / ``or`` / ``not``
+(or ``&&`` / ``||`` / ``!``) and parentheses. Literals are strings, numbers
+and ``true`` / ``false``.
+
+:func:`parse_filter` compiles an expression into a predicate over an entity
+dict. ``milvus.retrieval.build_filter`` parses model-supplied expressions
+with it before combining them with the tenant clause. :func:`filter_mask`
+evaluates the same expression over whole :class:`Column` arrays at once;
+``NumpyVectorClient.search`` uses it for the metadata fields it keeps as
+columns and falls back to the predicate for any other field.
+"""
+
+import ast
+import operator
+import re
+from typing import Any, Callable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+Predicate = Callable[[Mapping[str, Any]], bool]
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<op>==|!=|<=|>=|&&|\|\||[<>!()\[\],])
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    )""",
+    re.VERBOSE,
+)
+
+_COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+# ``5 < x`` is ``x > 5``.
+_FLIPPED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+_KEYWORDS = {"and", "or", "not", "in", "like", "true", "false"}
+
+
+def _tokenize(expr: str) -> List[Tuple[str, Any]]:
+    tokens = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        match = _TOKEN.match(expr, pos)
+        if match is None:
+            raise ValueError(f"Unsupported filter syntax at {expr[pos:pos + 20]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            tokens.append(("literal", ast.literal_eval(text)))
+        elif kind == "number":
+            tokens.append(("literal", float(text) if any(c in text for c in ".eE") else int(text)))
+        elif kind == "name" and text.lower() in ("true", "false"):
+            tokens.append(("literal", text.lower() == "true"))
+        elif kind == "name" and text.lower() in _KEYWORDS:
+            tokens.append(("op", text.lower()))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+def _compare(field: str, op: str, value: Any) -> Predicate:
+    compare = _COMPARISONS[op]
+
+    def predicate(entity: Mapping[str, Any]) -> bool:
+        if field not in entity:
+            return False
+        try:
+            return bool(compare(entity[field], value))
+        except TypeError:
+            return False
+
+    return predicate
+
+
+def _like(field: str, pattern: str) -> Predicate:
+    regex = re.compile(".*".join(re.escape(part) for part in pattern.split("%")), re.DOTALL)
+
+    def predicate(entity: Mapping[str, Any]) -> bool:
+        value = entity.get(field)
+        return isinstance(value, str) and regex.fullmatch(value) is not None
+
+    return predicate
+
+
+class Column(NamedTuple):
+    """One metadata field of every row of a collection, for :func:`filter_mask`.
+
+    Numeric fields hold float64 ``values``; string fields hold codes into the
+    sorted unique ``categories``, so comparisons run once per distinct value.
+    ``present`` is false where a row lacks the field or holds another type.
+    """
+
+    values: np.ndarray
+    present: np.ndarray
+    categories: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(cls, values: Sequence[Any], kind: type) -> "Column":
+        """Column of ``values`` (``None`` for a missing field); ``kind`` is ``str`` or ``float``."""
+        if kind is str:
+            present = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+            strings = np.array([v if ok else "" for v, ok in zip(values, present)], dtype=str)
+            categories, codes = np.unique(strings, return_inverse=True)
+            return cls(codes.reshape(-1), present, categories)
+        present = np.fromiter(
+            (isinstance(v, (int, float)) and not isinstance(v, bool) for v in values), dtype=bool, count=len(values)
+        )
+        numbers = np.array([v if ok else 0 for v, ok in zip(values, present)], dtype=np.float64)
+        return cls(numbers, present)
+
+    def extend(self, values: Sequence[Any], kind: type) -> "Column":
+        """Return this column followed by ``values``."""
+        tail = Column.build(values, kind)
+        present = np.concatenate([self.present, tail.present])
+        if self.categories is None:
+            return Column(np.concatenate([self.values, tail.values]), present)
+        strings = np.concatenate([self.categories[self.values], tail.categories[tail.values]])
+        categories, codes = np.unique(strings, return_inverse=True)
+        return Column(codes.reshape(-1), present, categories)
+
+    def head(self, count: int) -> "Column":
+        """Return the first ``count`` rows."""
+        return self._replace(values=self.values[:count], present=self.present[:count])
+
+
+class _Parser:
+    """Recursive-descent parser; every method returns a compiled predicate.
+
+    The ``_leaf_*`` and combinator methods build the result, so a subclass can
+    evaluate the same grammar into something other than predicates.
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        self.tokens = _tokenize(expr)
+        self.pos = 0
+
+    def _peek(self) -> Tuple[str, Any]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ("end", None)
+
+    def _accept(self, *ops: str) -> bool:
+        kind, value = self._peek()
+        if kind == "op" and value in ops:
+            self.pos += 1
+            return True
+        return False
+
+    def _error(self, expected: str) -> ValueError:
+        kind, value = self._peek()
+        found = "end of expression" if kind == "end" else repr(value)
+        return ValueError(f"Invalid filter {self.expr!r}: expected {expected}, found {found}")
+
+    def parse(self) -> Predicate:
+        predicate = self._or()
+        if self._peek()[0] != "end":
+            # e.g. a ")" closing a group that was never opened.
+            raise self._error("end of expression")
+        return predicate
+
+    def _any(self, terms: List[Predicate]) -> Predicate:
+        return lambda entity: any(term(entity) for term in terms)
+
+    def _all(self, terms: List[Predicate]) -> Predicate:
+        return lambda entity: all(term(entity) for term in terms)
+
+    def _negate(self, inner: Predicate) -> Predicate:
+        return lambda entity: not inner(entity)
+
+    def _leaf_compare(self, field: str, op: str, value: Any) -> Predicate:
+        return _compare(field, op, value)
+
+    def _leaf_like(self, field: str, pattern: str) -> Predicate:
+        return _like(field, pattern)
+
+    def _leaf_in(self, field: str, values: List[Any], negate: bool) -> Predicate:
+        return lambda entity: (field in entity and entity[field] in values) != negate
+
+    def _or(self) -> Predicate:
+        terms = [self._and()]
+        while self._accept("or", "||"):
+            terms.append(self._and())
+        if len(terms) == 1:
+            return terms[0]
+        return self._any(terms)
+
+    def _and(self) -> Predicate:
+        terms = [self._not()]
+        while self._accept("and", "&&"):
+            terms.append(self._not())
+        if len(terms) == 1:
+            return terms[0]
+        return self._all(terms)
+
+    def _not(self) -> Predicate:
+        if self._accept("not", "!"):
+            return self._negate(self._not())
+        if self._accept("("):
+            inner = self._or()
+            if not self._accept(")"):
+                raise self._error("')'")
+            return inner
+        return self._comparison()
+
+    def _operand(self) -> Tuple[str, Any]:
+        kind, value = self._peek()
+        if kind not in ("name", "literal"):
+            raise self._error("a field name or a literal")
+        self.pos += 1
+        return kind, value
+
+    def _literal(self) -> Any:
+        kind, value = self._peek()
+        if kind != "literal":
+            raise self._error("a literal")
+        self.pos += 1
+        return value
+
+    def _comparison_op(self) -> str:
+        kind, value = self._peek()
+        if kind == "op" and value in _COMPARISONS:
+            self.pos += 1
+            return value
+        raise self._error("a comparison operator")
+
+    def _comparison(self) -> Predicate:
+        left_kind, left = self._operand()
+        if left_kind == "name":
+            if self._accept("like"):
+                pattern = self._literal()
+                if not isinstance(pattern, str):
+                    raise self._error("a string pattern")
+                return self._leaf_like(left, pattern)
+            negate = self._accept("not")
+            if negate or self._accept("in"):
+                if negate and not self._accept("in"):
+                    raise self._error("'in'")
+                return self._leaf_in(left, self._list(), negate)
+            op = self._comparison_op()
+            return self._leaf_compare(left, op, self._literal())
+        # literal op field [op literal], e.g. 1700000000 <= created_at < 1800000000
+        op = self._comparison_op()
+        kind, field = self._peek()
+        if kind != "name":
+            raise self._error("a field name")
+        self.pos += 1
+        lower = self._leaf_compare(field, _FLIPPED[op], left)
+        kind, value = self._peek()
+        if kind == "op" and value in _COMPARISONS:
+            upper = self._leaf_compare(field, self._comparison_op(), self._literal())
+            return self._all([lower, upper])
+        return lower
+
+    def _list(self) -> List[Any]:
+        if not self._accept("["):
+            raise self._error("'['")
+        values = []
+        if not self._accept("]"):
+            values.append(self._literal())
+            while self._accept(","):
+                values.append(self._literal())
+            if not self._accept("]"):
+                raise self._error("']'")
+        return values
+
+
+class _NoColumn(Exception):
+    """The expression uses a field that has no column."""
+
+
+class _MaskParser(_Parser):
+    """Evaluates the grammar directly into boolean arrays over ``columns``."""
+
+    def __init__(self, expr: str, columns: Mapping[str, Column]):
+        super().__init__(expr)
+        self.columns = columns
+
+    def _column(self, field: str) -> Column:
+        if field not in self.columns:
+            raise _NoColumn(field)
+        return self.columns[field]
+
+    def _any(self, terms):
+        return np.logical_or.reduce(terms)
+
+    def _all(self, terms):
+        return np.logical_and.reduce(terms)
+
+    def _negate(self, inner):
+        return ~inner
+
+    def _leaf_compare(self, field, op, value):
+        column = self._column(field)
+        # Like the predicate: a value of the wrong type is unequal and not ordered.
+        if column.categories is not None:
+            if not isinstance(value, str):
+                return column.present.copy() if op == "!=" else np.zeros_like(column.present)
+            return _COMPARISONS[op](column.categories, value)[column.values] & column.present
+        if isinstance(value, str):
+            return column.present.copy() if op == "!=" else np.zeros_like(column.present)
+        return _COMPARISONS[op](column.values, value) & column.present
+
+    def _leaf_like(self, field, pattern):
+        column = self._column(field)
+        if column.categories is None:
+            return np.zeros_like(column.present)
+        predicate = _like(field, pattern)
+        hits = np.fromiter((predicate({field: c}) for c in column.categories.tolist()), dtype=bool,
+                           count=len(column.categories))
+        return hits[column.values] & column.present
+
+    def _leaf_in(self, field, values, negate):
+        column = self._column(field)
+        if column.categories is not None:
+            hits = np.isin(column.categories, [v for v in values if isinstance(v, str)])[column.values]
+        else:
+            hits = np.isin(column.values, [v for v in values if not isinstance(v, str)])
+        return (hits & column.present) != negate
+
+
+def filter_mask(expr: str, columns: Mapping[str, Column], count: int) -> Optional[np.ndarray]:
+    """Evaluate ``expr`` over ``count`` rows of ``columns`` at once.
+
+    Gives the same result as :func:`parse_filter` on each row, or ``None`` if
+    ``expr`` uses a field that has no column. Raises ``ValueError`` like
+    :func:`parse_filter`.
+    """
+    if not expr or not expr.strip():
+        return np.ones(count, dtype=bool)
+    try:
+        return np.broadcast_to(_MaskParser(expr, columns).parse(), (count,)).copy()
+    except _NoColumn:
+        _Parser(expr).parse()
+        return None
+
+
+def parse_filter(expr: str) -> Predicate:
+    """Compile ``expr`` into a predicate over an entity dict.
+
+    Raises ``ValueError`` for anything outside the supported subset, including
+    unbalanced parentheses, so a parsed expression is always one
+    self-contained sub-expression.
+    """
+    if not expr or not expr.strip():
+        return lambda entity: True
+    return _Parser(expr).parse()
@@ -0,0 +1,540 @@
+"""Bulk streaming ingestion into a ``collection_test``-shaped collection.
+
+Files (plain text or JSONL) are read lazily and cut into overlapping chunks,
+embedded in batches through ``embed_documents`` with a bounded number of
+concurrent requests against Ollama, and flushed to ``MilvusClient.upsert`` in
+large batches. Embedding batches are queued in order with a bounded queue, so a
+slow Milvus flush throttles the reader instead of buffering the whole corpus.
+
+Unless disabled, every flushed batch is also added to the collection's BM25
+index (see ``milvus.bm25``) so lexical and dense search stay in sync.
+
+A JSON checkpoint records how many chunks have been committed; re-running the
+same job with the same checkpoint skips them and picks up where it left off.
+
+Primary keys are derived from a hash of each chunk's tenant, source and text,
+so the same chunk always gets the same ``my_id``. ``--incremental`` uses that
+with a manifest of the ids ingested per file: unchanged files are skipped by
+size and mtime, and for changed files only new chunks are embedded and
+upserted while chunks that disappeared are deleted.
+
+Usage:
+    python -m milvus.ingest data/example.txt data/docs.jsonl --collection collection_test
+    python -m milvus.ingest data/*.txt --collection collection_test --incremental
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from pymilvus import MilvusClient
+
+from .bm25 import BM25Index, get_lexical_index
+from .connection import get_client
+from .embedding_provider import get_embedding_provider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Chunk:
+    """One piece of a source document, in stream order."""
+
+    source: str
+    index: int
+    text: str
+    tenant: str = ""
+    created_at: int = 0
+
+    def metadata(self) -> Dict[str, Any]:
+        """Structured fields stored next to the vector and usable in filters."""
+        return {"source": self.source, "tenant": self.tenant, "created_at": self.created_at}
+
+
+def split_stream(pieces: Iterable[str], chunk_size: int = 1000, overlap: int = 100) -> Iterator[str]:
+    """Cut a stream of text pieces into overlapping chunks without reading it all.
+
+    Chunks prefer to end on a newline or a space in their second half.
+    """
+    if not 0 <= overlap < chunk_size // 2:
+        raise ValueError("overlap must be smaller than half of chunk_size")
+    buffer = ""
+    carried = 0
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) >= chunk_size:
+            cut = _cut_point(buffer, chunk_size)
+            chunk = buffer[:cut].strip()
+            if chunk:
+                yield chunk
+            buffer = buffer[cut - overlap:]
+            carried = overlap
+    if len(buffer) > carried and buffer.strip():
+        yield buffer.strip()
+
+
+def _cut_point(buffer: str, chunk_size: int) -> int:
+    for sep in ("\n", " "):
+        pos = buffer.rfind(sep, chunk_size // 2, chunk_size)
+        if pos != -1:
+            return pos + 1
+    return chunk_size
+
+
+def _read_blocks(path: str, block_size: int = 64 * 1024) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def iter_chunks(
+        paths: Sequence[str],
+        chunk_size: int = 1000,
+        overlap: int = 100,
+        text_field: str = "content",
+        tenant: str = "",
+) -> Iterator[Chunk]:
+    """Lazily yield chunks from text files and JSONL files.
+
+    JSONL records contribute ``record[text_field]``; each record is chunked on
+    its own. Its ``source``, ``tenant`` and ``created_at`` (unix seconds) are
+    taken from the record when present, otherwise from ``path#<record id>``
+    (or just ``path`` without an ``id``), ``tenant`` and the file's
+    modification time. The source is part of the chunk id, so it never depends
+    on the line number: inserting a record must not change the ids of the
+    records after it.
+    """
+    for path in paths:
+        modified = int(os.path.getmtime(path))
+        if path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    text = record.get(text_field) or ""
+                    source = record.get("source")
+                    if not source:
+                        source = path if record.get("id") is None else f"{path}#{record['id']}"
+                    source = str(source)
+                    record_tenant = str(record.get("tenant") or tenant)
+                    created_at = int(record.get("created_at") or modified)
+                    for i, piece in enumerate(split_stream([text], chunk_size, overlap)):
+                        yield Chunk(source=source, index=i, text=piece, tenant=record_tenant, created_at=created_at)
+        else:
+            for i, piece in enumerate(split_stream(_read_blocks(path), chunk_size, overlap)):
+                yield Chunk(source=path, index=i, text=piece, tenant=tenant, created_at=modified)
+
+
+def _batched(iterable: Iterable[Chunk], size: int) -> Iterator[List[Chunk]]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def content_id(text: str, source: str = "", tenant: str = "") -> int:
+    """Return a positive int64 primary key derived from a chunk's content.
+
+    Re-ingesting an unchanged chunk yields the same key, so it can be upserted
+    or skipped instead of duplicated.
+    """
+    digest = hashlib.blake2b(f"{tenant}\0{source}\0{text}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & (1 << 63) - 1
+
+
+def chunk_id(chunk: Chunk) -> int:
+    """Return the primary key of ``chunk``; see :func:`content_id`."""
+    return content_id(chunk.text, chunk.source, chunk.tenant)
+
+
+class Checkpoint:
+    """Number of chunks already committed by a given ingest job."""
+
+    def __init__(self, path: Optional[str], job: str):
+        """Load the checkpoint at ``path`` (in memory only if ``None``) for ``job``."""
+        self.path = path
+        self.job = job
+        self.committed = 0
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("job") != job:
+                raise ValueError(
+                    f"Checkpoint {path} belongs to a different ingest job (other files, settings or"
+                    f" file contents); remove it to start over."
+                )
+            self.committed = int(state.get("committed", 0))
+
+    def advance(self, count: int) -> None:
+        """Record ``count`` more committed chunks and save atomically."""
+        self.committed += count
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"job": self.job, "committed": self.committed, "updated_at": time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _file_signature(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def job_fingerprint(paths: Sequence[str], collection_name: str, chunk_size: int, overlap: int,
+                    tenant: str = "") -> str:
+    """Identify an ingest job so a checkpoint is never applied to another one.
+
+    Each file's size and mtime are part of the job: a checkpoint counts chunks
+    of the content it was written for, so editing a file starts a new job
+    instead of skipping the first chunks of the new content.
+    """
+    signatures = [_file_signature(path) for path in paths]
+    payload = json.dumps(
+        [list(paths), collection_name, chunk_size, overlap] + ([tenant] if tenant else []) + [signatures]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+async def ingest_chunks(
+        chunks: Iterable[Chunk],
+        collection_name: str,
+        client: MilvusClient,
+        embedder=None,
+        embed_batch_size: int = 64,
+        max_concurrency: int = 4,
+        insert_batch_size: int = 1000,
+        checkpoint: Optional[Checkpoint] = None,
+        lexical_index: Optional[BM25Index] = None,
+        upsert: bool = True,
+) -> int:
+    """Embed ``chunks`` in batches and write them into ``collection_name``.
+
+    Rows are written with ``client.upsert`` by default: ids are content
+    hashes, so re-running over chunks that are already stored replaces them
+    instead of adding rows with duplicate primary keys. Pass ``upsert=False``
+    to use ``client.insert`` on a collection known to be empty.
+    Returns the number of chunks written by this call.
+    """
+    embedder = embedder or get_embedding_provider()
+    checkpoint = checkpoint or Checkpoint(None, "")
+    chunks = islice(chunks, checkpoint.committed, None)
+
+    # The queue holds embedding tasks in stream order. Its bound is what limits
+    # concurrent Ollama requests and applies backpressure to the reader.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency)
+    inserted = 0
+
+    async def produce():
+        try:
+            for batch in _batched(chunks, embed_batch_size):
+                task = asyncio.ensure_future(embedder.aembed_documents([c.text for c in batch]))
+                await queue.put((batch, task))
+        finally:
+            await queue.put(None)
+
+    async def flush(rows: List[dict]):
+        nonlocal inserted
+        write = client.upsert if upsert else client.insert
+        # Identical chunks share an id; one row per primary key per request.
+        unique = list({row["my_id"]: row for row in rows}.values())
+        await asyncio.to_thread(write, collection_name=collection_name, data=unique)
+        if lexical_index is not None:
+            await asyncio.to_thread(
+                lexical_index.add, [(row["my_id"], row["my_content"], row["tenant"]) for row in unique]
+            )
+        inserted += len(rows)
+        checkpoint.advance(len(rows))
+
+    producer = asyncio.ensure_future(produce())
+    rows: List[dict] = []
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            batch, task = item
+            vectors = await task
+            rows.extend(
+                {
+                    "my_id": chunk_id(chunk),
+                    "my_vector": vector,
+                    "my_content": chunk.text,
+                    **chunk.metadata(),
+                }
+                for chunk, vector in zip(batch, vectors)
+            )
+            if len(rows) >= insert_batch_size:
+                await flush(rows)
+                rows = []
+        if rows:
+            await flush(rows)
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                item[1].cancel()
+    return inserted
+
+
+def ingest_files(
+        paths: Sequence[str],
+        collection_name: str,
+        client: MilvusClient,
+        chunk_size: int = 1000,
+        overlap: int = 100,
+        checkpoint_path: Optional[str] = None,
+        lexical: bool = True,
+        tenant: str = "",
+        **kwargs,
+) -> int:
+    """Chunk ``paths`` and ingest them with a checkpoint; the synchronous entry point."""
+    checkpoint = Checkpoint(
+        checkpoint_path, job_fingerprint(paths, collection_name, chunk_size, overlap, tenant)
+    )
+    chunks = iter_chunks(paths, chunk_size=chunk_size, overlap=overlap, tenant=tenant)
+    lexical_index = get_lexical_index(collection_name) if lexical else None
+    return asyncio.run(
+        ingest_chunks(
+            chunks, collection_name, client, checkpoint=checkpoint, lexical_index=lexical_index, **kwargs
+        )
+    )
+
+
+class Manifest:
+    """Chunk ids ingested per file, for one collection and chunking setup.
+
+    Stored as JSON next to the checkpoint and rewritten atomically after each
+    file, so an interrupted run loses at most the file it was working on.
+    """
+
+    def __init__(self, path: Optional[str], job: str):
+        """Load the manifest at ``path``, or start empty if it belongs to another job."""
+        self.path = path
+        self.job = job
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            # A different collection or chunking makes every stored id stale;
+            # starting empty re-embeds everything once.
+            if state.get("job") == job:
+                self.files = state.get("files", {})
+
+    def unchanged(self, path: str) -> bool:
+        """Return whether ``path`` still has the size and mtime it was ingested with."""
+        entry = self.files.get(path)
+        return entry is not None and entry.get("signature") == _file_signature(path)
+
+    def ids(self, path: str) -> List[int]:
+        """Return the chunk ids ingested from ``path``."""
+        return list(self.files.get(path, {}).get("ids", []))
+
+    def update(self, path: str, ids: Sequence[int]) -> None:
+        """Record the chunk ids and signature of ``path`` and save."""
+        self.files[path] = {"signature": _file_signature(path), "ids": list(ids)}
+        self.save()
+
+    def forget(self, path: str) -> None:
+        """Drop ``path`` from the manifest and save."""
+        self.files.pop(path, None)
+        self.save()
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"job": self.job, "files": self.files, "updated_at": time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class SyncReport:
+    """What :func:`sync_chunks` did, per file and per chunk."""
+    files_skipped: int = 0
+    files_synced: int = 0
+    files_removed: int = 0
+    chunks_unchanged: int = 0
+    chunks_embedded: int = 0
+    chunks_deleted: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        """Return the report as a JSON-ready dict."""
+        return asdict(self)
+
+
+async def _delete_ids(client: MilvusClient, collection_name: str, ids: Sequence[int],
+                      lexical_index: Optional[BM25Index]) -> None:
+    ids = list(ids)
+    for start in range(0, len(ids), 1000):
+        batch = ids[start:start + 1000]
+        await asyncio.to_thread(client.delete, collection_name=collection_name, ids=batch)
+        if lexical_index is not None:
+            await asyncio.to_thread(lexical_index.remove, batch)
+
+
+async def sync_chunks(
+        paths: Sequence[str],
+        collection_name: str,
+        client: MilvusClient,
+        manifest: Manifest,
+        chunk_size: int = 1000,
+        overlap: int = 100,
+        tenant: str = "",
+        lexical_index: Optional[BM25Index] = None,
+        prune: bool = False,
+        **kwargs,
+) -> SyncReport:
+    """Bring ``collection_name`` in line with the current contents of ``paths``.
+
+    Per file: skip it if its size and mtime match the manifest, otherwise
+    re-chunk it, embed and upsert only the chunks whose ids are new, delete the
+    ids that are gone, then record the new id set. With ``prune``, files in the
+    manifest that no longer exist on disk have all their chunks deleted.
+    """
+    report = SyncReport()
+    for path in paths:
+        if manifest.unchanged(path):
+            report.files_skipped += 1
+            report.chunks_unchanged += len(manifest.ids(path))
+            continue
+        try:
+            old_ids = set(manifest.ids(path))
+            fresh: Dict[int, Chunk] = {}
+            for chunk in iter_chunks([path], chunk_size=chunk_size, overlap=overlap, tenant=tenant):
+                fresh.setdefault(chunk_id(chunk), chunk)
+            added = [chunk for key, chunk in fresh.items() if key not in old_ids]
+            removed = old_ids.difference(fresh)
+            if added:
+                await ingest_chunks(
+                    added, collection_name, client, lexical_index=lexical_index, upsert=True, **kwargs
+                )
+            if removed:
+                await _delete_ids(client, collection_name, sorted(removed), lexical_index)
+            manifest.update(path, list(fresh))
+        except Exception as e:
+            logger.warning("Failed to sync %s: %s", path, e)
+            report.errors[path] = str(e)
+            continue
+        report.files_synced += 1
+        report.chunks_unchanged += len(fresh) - len(added)
+        report.chunks_embedded += len(added)
+        report.chunks_deleted += len(removed)
+
+    if prune:
+        for path in [p for p in manifest.files if p not in paths and not os.path.exists(p)]:
+            ids = manifest.ids(path)
+            await _delete_ids(client, collection_name, ids, lexical_index)
+            manifest.forget(path)
+            report.files_removed += 1
+            report.chunks_deleted += len(ids)
+    return report
+
+
+def sync_files(
+        paths: Sequence[str],
+        collection_name: str,
+        client: MilvusClient,
+        chunk_size: int = 1000,
+        overlap: int = 100,
+        manifest_path: Optional[str] = None,
+        lexical: bool = True,
+        tenant: str = "",
+        prune: bool = False,
+        **kwargs,
+) -> SyncReport:
+    """Re-ingest what changed in ``paths`` according to the manifest; the synchronous entry point."""
+    manifest = Manifest(manifest_path, job_fingerprint([], collection_name, chunk_size, overlap, tenant))
+    lexical_index = get_lexical_index(collection_name) if lexical else None
+    return asyncio.run(
+        sync_chunks(
+            paths, collection_name, client, manifest, chunk_size=chunk_size, overlap=overlap, tenant=tenant,
+            lexical_index=lexical_index, prune=prune, **kwargs
+        )
+    )
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Bulk ingest text/JSONL files into Milvus.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--collection", default="collection_test")
+    parser.add_argument("--uri", default="./data/milvus_demo.db")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--embed-batch-size", type=int, default=64)
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--insert-batch-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", default="./data/ingest.checkpoint.json")
+    parser.add_argument("--tenant", default="", help="tenant stored on every chunk")
+    parser.add_argument("--no-lexical", action="store_true", help="do not update the BM25 index")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only embed new/changed chunks and delete removed ones, tracked in --manifest")
+    parser.add_argument("--manifest", default="./data/ingest.manifest.json")
+    parser.add_argument("--prune", action="store_true",
+                        help="with --incremental, delete chunks of manifest files that no longer exist")
+    args = parser.parse_args()
+
+    client = get_client(args.uri)
+    try:
+        started = time.perf_counter()
+        if args.incremental:
+            report = sync_files(
+                args.paths,
+                args.collection,
+                client,
+                chunk_size=args.chunk_size,
+                overlap=args.overlap,
+                manifest_path=args.manifest,
+                embed_batch_size=args.embed_batch_size,
+                max_concurrency=args.max_concurrency,
+                insert_batch_size=args.insert_batch_size,
+                lexical=not args.no_lexical,
+                tenant=args.tenant,
+                prune=args.prune,
+            )
+            print(json.dumps(report.to_dict(), ensure_ascii=False))  # noqa: T201
+            print(f"synced in {time.perf_counter() - started:.1f}s")  # noqa: T201
+            return
+        count = ingest_files(
+            args.paths,
+            args.collection,
+            client,
+            chunk_size=args.chunk_size,
+            overlap=args.overlap,
+            checkpoint_path=args.checkpoint,
+            embed_batch_size=args.embed_batch_size,
+            max_concurrency=args.max_concurrency,
+            insert_batch_size=args.insert_batch_size,
+            lexical=not args.no_lexical,
+            tenant=args.tenant,
+        )
+        print(f"inserted {count} chunks in {time.perf_counter() - started:.1f}s")  # noqa: T201
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
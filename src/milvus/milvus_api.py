@@ -1,24 +1,19 @@
 import sys
 import os
-import atexit
+from typing import List, Tuple
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from pymilvus import MilvusClient, DataType
+# Import the package as ``milvus`` (rooted at src/), like react_agent does, so the
+# embedding provider, caches and connection manager exist once per process.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.milvus.ollama_embedding import get_embeddings
+from milvus.bm25 import get_lexical_index
+from milvus.connection import get_client
+from milvus.embedding_provider import get_embedding_provider
+from milvus.profiles import apply_profile, get_profile
+from milvus.retrieval import multi_search
 
-client = MilvusClient("./data/milvus_demo.db")
-
-
-# Register cleanup function
-def cleanup():
-    try:
-        client.close()
-    except Exception as e:
-        print(f"Error during cleanup: {e}")
-
-
-atexit.register(cleanup)
+# Connects on first use; the connection manager closes it at exit.
+client = get_client("./data/milvus_demo.db")
 
 
 def collection_list():
@@ -26,29 +21,10 @@ def collection_list():
     print(res)
 
 
-def create_collection_test(collection_name: str):
-    schema = MilvusClient.create_schema(
-        auto_id=False,
-        enable_dynamic_field=True,
-    )
-
-    schema.add_field(field_name="my_id", datatype=DataType.INT64, is_primary=True)
-    schema.add_field(field_name="my_vector", datatype=DataType.FLOAT_VECTOR, dim=768)
-    schema.add_field(field_name="my_content", datatype=DataType.VARCHAR, max_length=65535)
-
-    index_params = client.prepare_index_params()
-
-    index_params.add_index(
-        field_name="my_vector",
-        index_type="AUTOINDEX",
-        metric_type="COSINE"
-    )
-
-    client.create_collection(
-        collection_name=collection_name,
-        schema=schema,
-        index_params=index_params
-    )
+def create_collection_test(collection_name: str, profile: str = "default"):
+    """Create (or re-index) ``collection_name`` from a named profile, see milvus.profiles."""
+    report = apply_profile(client, collection_name, get_profile(profile))
+    print(report.to_dict())
 
     res = client.get_load_state(
         collection_name=collection_name
@@ -61,10 +37,13 @@ def drop_collection(collection_name: str):
     client.drop_collection(
         collection_name=collection_name
     )
+    # The BM25 index shadows the collection: without this hybrid search keeps
+    # returning lexical hits for the dropped rows.
+    get_lexical_index(collection_name).clear()
 
 
 def insert_data(id: int, data: str, collection_name: str):
-    vector = get_embeddings(data)
+    vector = get_embedding_provider().embed_query(data)
     data = [
         {
             'my_id': id,
@@ -76,28 +55,63 @@ def insert_data(id: int, data: str, collection_name: str):
         collection_name=collection_name,
         data=data
     )
+    get_lexical_index(collection_name).add([(id, data[0]['my_content'])])
     print(res)
 
 
-def search_data(query: str, collection_name: str):
-    query_vector = get_embeddings(query)
+def insert_batch(items: List[Tuple[int, str]], collection_name: str, batch_size: int = 256):
+    """Embed and insert ``(id, content)`` pairs with one request per batch."""
+    provider = get_embedding_provider()
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        vectors = provider.embed_documents([content for _, content in batch])
+        res = client.insert(
+            collection_name=collection_name,
+            data=[
+                {
+                    'my_id': id,
+                    'my_vector': vector,
+                    'my_content': content
+                }
+                for (id, content), vector in zip(batch, vectors)
+            ]
+        )
+        get_lexical_index(collection_name).add(batch)
+        print(res)
+
+
+def search_data(query: str, collection_name: str, profile: str = "default", limit: int = 2,
+                filter: str = "", offset: int = 0):
+    # e.g. filter='tenant == "acme" and created_at >= 1700000000'; offset pages through results
+    query_vector = get_embedding_provider().embed_query(query)
+    search_params = get_profile(profile).search_request()
+    if offset:
+        search_params["offset"] = offset
     res = client.search(
         collection_name=collection_name,
         data=[query_vector],
-        limit=2,
-        output_fields=["my_id", "my_content"],
-        search_params={"metric_type": "COSINE"}
+        limit=limit,
+        filter=filter,
+        output_fields=["my_id", "my_content", "source", "created_at"],
+        search_params=search_params
     )
     for hits in res:
         for hit in hits:
             print(hit)
 
 
+def search_many(queries: List[str], collection_name: str, limit: int = 5, fusion: str = "rrf"):
+    res = multi_search(client, queries, collection_name, limit=limit, fusion=fusion)
+    for hit in res.hits:
+        print(hit)
+
+
 if __name__ == "__main__":
     try:
         # collection_list()
         collection_name = 'collection_test'
         # create_collection_test(collection_name)
+        # create_collection_test(collection_name, profile="hnsw")
         # collection_list()
         print(client.has_collection(collection_name))
         # print(client.describe_collection(collection_name))
@@ -105,5 +119,4 @@ if __name__ == "__main__":
         # insert_data(2, 'hello', collection_name)
         search_data('hi', collection_name)
     finally:
-        cleanup()
-        atexit.unregister(cleanup)
+        client.close()
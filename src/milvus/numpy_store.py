@@ -0,0 +1,661 @@
+"""Embedded NumPy vector store, a lightweight alternative to Milvus Lite.
+
+Each collection is a directory of append-only files:
+
+    meta.json      dimension, metric and quantization
+    vectors.f32    row-major float32 matrix, L2-normalized for COSINE
+    codes.i8       int8 codes (+ scales.f32), only with int8 quantization
+    codes.u8       packed sign bits, only with binary quantization
+    ids.i64        primary key of each row
+    entities.bin   JSON of each row's non-vector fields, concatenated
+    offsets.i64    end offset of each row inside entities.bin
+    deleted.i64    tombstoned row numbers
+    ivf.npz        optional coarse quantizer (centroids + row assignments)
+    write.lock     held by the writer while it appends
+
+Everything is memory-mapped read-only, so worker processes share the same
+pages and opening a collection costs nothing. Writes are appends under
+``write.lock``; readers do not take it and pick new rows up on the next call.
+``ids.i64`` is appended last, so its length is the committed row count. A
+writer that crashed mid-insert leaves bytes past that count in the other
+files; they are cut off before the next insert, and on open when no writer
+holds the lock, so later rows stay aligned across files.
+
+``NumpyVectorClient`` mirrors the subset of ``MilvusClient`` used in this repo
+(``create_collection``, ``insert``, ``upsert``, ``search``, ``delete``, ...) and
+returns hits in the same ``{"id", "distance", "entity"}`` shape, so it can be
+passed wherever a ``MilvusClient`` is expected by the helpers in this package.
+
+With quantization (see ``milvus.quantization``) searches scan only the compact
+codes and re-rank a small candidate set against ``vectors.f32``, so the float
+matrix stays on disk instead of in the page cache of every searching process.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import threading
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+from .filter_expr import Column, filter_mask, parse_filter
+from .quantization import (
+    DEFAULT_REFINE_K,
+    QUANTIZATIONS,
+    binary_encode,
+    binary_scores,
+    int8_encode,
+    int8_scores,
+    quantization_for,
+)
+
+SUPPORTED_METRICS = ("COSINE", "IP")
+# Metadata written by ingestion; filters over these fields run on cached columns.
+_FILTER_COLUMNS: Dict[str, type] = {"source": str, "tenant": str, "created_at": float}
+
+
+@contextlib.contextmanager
+def _write_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """Hold the inter-process lock on ``path/write.lock``; yield whether it was acquired."""
+    try:
+        f = open(os.path.join(path, "write.lock"), "a+b")
+    except OSError:
+        if blocking:
+            raise
+        yield False
+        return
+    with f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10s; keep waiting
+                    if not blocking:
+                        yield False
+                        return
+            try:
+                yield True
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class _Snapshot(NamedTuple):
+    """The arrays of one committed state, taken together under the collection lock.
+
+    ``refresh`` replaces the arrays instead of mutating them, so a search keeps
+    a consistent view while an insert or delete re-maps the files.
+    """
+
+    count: int
+    vectors: np.ndarray
+    ids: np.ndarray
+    offsets: np.ndarray
+    entities: np.ndarray
+    codes: Optional[np.ndarray]
+    scales: Optional[np.ndarray]
+    alive: np.ndarray
+    centroids: Optional[np.ndarray]
+    lists: Optional[Tuple[np.ndarray, np.ndarray]]
+
+    def entity(self, row: int) -> Dict[str, Any]:
+        start = int(self.offsets[row - 1]) if row else 0
+        end = int(self.offsets[row])
+        return json.loads(self.entities[start:end].tobytes().decode("utf-8"))
+
+
+class NumpyCollection:
+    """One collection stored as memory-mapped NumPy files."""
+
+    def __init__(self, path: str):
+        """Open the collection at ``path``, dropping rows a crashed insert left uncommitted."""
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dim: int = meta["dim"]
+        self.metric: str = meta["metric"]
+        self.quantization: Optional[str] = meta.get("quantization")
+        self._lock = threading.RLock()
+        self._count = -1
+        self._deleted_size = -1
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._entities: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+        self._ivf: Optional[Dict[str, np.ndarray]] = None
+        self._ivf_lists: Optional[tuple] = None
+        self._columns: Dict[str, Column] = {}
+        self._columns_rows = 0
+        with _write_lock(path, blocking=False) as locked:
+            if locked:
+                self._truncate_uncommitted()
+        self.refresh()
+
+    @classmethod
+    def create(cls, path: str, dim: int, metric: str = "COSINE",
+               quantization: Optional[str] = None) -> "NumpyCollection":
+        """Create an empty collection at ``path`` and open it."""
+        metric = metric.upper()
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"Unsupported metric {metric!r}, expected one of {SUPPORTED_METRICS}")
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "metric": metric, "quantization": quantization}, f)
+        names = ["vectors.f32", "ids.i64", "entities.bin", "offsets.i64", "deleted.i64"]
+        if quantization == "int8":
+            names += ["codes.i8", "scales.f32"]
+        elif quantization == "binary":
+            names.append("codes.u8")
+        for name in names:
+            open(os.path.join(path, name), "ab").close()
+        return cls(path)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _truncate_uncommitted(self) -> None:
+        """Cut off rows a crashed insert appended to some files but never committed to ``ids.i64``."""
+        count = os.path.getsize(self._file("ids.i64")) // 8
+        row_sizes = {"ids.i64": 8, "vectors.f32": 4 * self.dim, "offsets.i64": 8}
+        if self.quantization == "int8":
+            row_sizes.update({"codes.i8": self.dim, "scales.f32": 4})
+        elif self.quantization == "binary":
+            row_sizes["codes.u8"] = (self.dim + 7) // 8
+        for name, row_size in row_sizes.items():
+            if os.path.getsize(self._file(name)) > count * row_size:
+                os.truncate(self._file(name), count * row_size)
+        end = 0
+        if count:
+            end = int(np.fromfile(self._file("offsets.i64"), dtype=np.int64, count=1, offset=(count - 1) * 8)[0])
+        if os.path.getsize(self._file("entities.bin")) > end:
+            os.truncate(self._file("entities.bin"), end)
+        ivf_path = self._file("ivf.npz")
+        if os.path.exists(ivf_path):
+            ivf = dict(np.load(ivf_path))
+            if len(ivf["assign"]) > count:
+                ivf["assign"] = ivf["assign"][:count]
+                np.savez(ivf_path, **ivf)
+
+    def _map(self, name: str, dtype, shape=None) -> np.ndarray:
+        if os.path.getsize(self._file(name)) == 0:
+            return np.zeros(shape or (0,), dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape)
+
+    def refresh(self) -> None:
+        """Re-map the files if another writer appended rows since the last call."""
+        with self._lock:
+            count = os.path.getsize(self._file("ids.i64")) // 8
+            deleted_size = os.path.getsize(self._file("deleted.i64"))
+            if count == self._count and deleted_size == self._deleted_size:
+                return
+            if count < self._columns_rows:
+                self._columns, self._columns_rows = {}, 0
+            self._count = count
+            self._deleted_size = deleted_size
+            self._vectors = self._map("vectors.f32", np.float32, (count, self.dim))
+            self._ids = self._map("ids.i64", np.int64, (count,))
+            self._offsets = self._map("offsets.i64", np.int64, (count,))
+            self._entities = self._map("entities.bin", np.uint8)
+            if self.quantization == "int8":
+                self._codes = self._map("codes.i8", np.int8, (count, self.dim))
+                self._scales = self._map("scales.f32", np.float32, (count,))
+            elif self.quantization == "binary":
+                self._codes = self._map("codes.u8", np.uint8, (count, (self.dim + 7) // 8))
+            alive = np.ones(count, dtype=bool)
+            deleted = np.fromfile(self._file("deleted.i64"), dtype=np.int64)
+            alive[deleted[deleted < count]] = False
+            self._alive = alive
+            ivf_path = self._file("ivf.npz")
+            self._ivf = dict(np.load(ivf_path)) if os.path.exists(ivf_path) else None
+            self._ivf_lists = None
+
+    @property
+    def num_entities(self) -> int:
+        """Number of rows that are not deleted."""
+        return int(self.snapshot().alive.sum())
+
+    def _prepare(self, vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dim {self.dim}, got {matrix.shape[1]}")
+        if self.metric == "COSINE":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.maximum(norms, 1e-12)
+        return matrix
+
+    def insert(self, rows: Sequence[Dict[str, Any]], vector_field: str = "my_vector",
+               id_field: str = "my_id") -> List[int]:
+        """Append rows shaped like Milvus insert data."""
+        if not rows:
+            return []
+        with self._lock, _write_lock(self.path):
+            self._truncate_uncommitted()
+            self.refresh()
+            if self._ivf is not None:
+                self._ivf["assign"] = self._ivf["assign"][:self._count]
+            matrix = self._prepare([row[vector_field] for row in rows])
+            ids = np.asarray([row[id_field] for row in rows], dtype=np.int64)
+            blobs = [
+                json.dumps({k: v for k, v in row.items() if k != vector_field}, ensure_ascii=False).encode("utf-8")
+                for row in rows
+            ]
+            start = os.path.getsize(self._file("entities.bin"))
+            offsets = start + np.cumsum([len(b) for b in blobs], dtype=np.int64)
+            with open(self._file("entities.bin"), "ab") as f:
+                f.write(b"".join(blobs))
+            with open(self._file("offsets.i64"), "ab") as f:
+                f.write(offsets.tobytes())
+            with open(self._file("vectors.f32"), "ab") as f:
+                f.write(np.ascontiguousarray(matrix).tobytes())
+            if self.quantization == "int8":
+                codes, scales = int8_encode(matrix)
+                with open(self._file("codes.i8"), "ab") as f:
+                    f.write(codes.tobytes())
+                with open(self._file("scales.f32"), "ab") as f:
+                    f.write(scales.tobytes())
+            elif self.quantization == "binary":
+                with open(self._file("codes.u8"), "ab") as f:
+                    f.write(binary_encode(matrix).tobytes())
+            if self._ivf is not None:
+                assign = self._assign(matrix, self._ivf["centroids"])
+                self._ivf["assign"] = np.concatenate([self._ivf["assign"], assign])
+                np.savez(self._file("ivf.npz"), **self._ivf)
+            # ids are written last: their length defines the committed row count.
+            with open(self._file("ids.i64"), "ab") as f:
+                f.write(ids.tobytes())
+            self.refresh()
+            return ids.tolist()
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """Tombstone every live row whose primary key is in ``ids``."""
+        with self._lock:
+            self.refresh()
+            rows = np.nonzero(np.isin(self._ids, np.asarray(list(ids), dtype=np.int64)) & self._alive)[0]
+            if rows.size:
+                with open(self._file("deleted.i64"), "ab") as f:
+                    f.write(rows.astype(np.int64).tobytes())
+                self.refresh()
+            return int(rows.size)
+
+    def entity(self, row: int) -> Dict[str, Any]:
+        """Return the stored fields of ``row``."""
+        return self.snapshot().entity(row)
+
+    def snapshot(self) -> _Snapshot:
+        """Refresh and return the current arrays as one consistent view."""
+        with self._lock:
+            self.refresh()
+            lists = self._lists() if self._ivf is not None else None
+            return _Snapshot(
+                count=self._count, vectors=self._vectors, ids=self._ids, offsets=self._offsets,
+                entities=self._entities, codes=self._codes, scales=self._scales, alive=self._alive,
+                centroids=self._ivf["centroids"] if self._ivf is not None else None, lists=lists,
+            )
+
+    def _filter_columns(self, count: int) -> Dict[str, Column]:
+        """``_FILTER_COLUMNS`` of the first ``count`` rows; only rows appended since the last call are decoded."""
+        with self._lock:
+            snap = self.snapshot()
+            if self._columns_rows < snap.count:
+                entities = [snap.entity(row) for row in range(self._columns_rows, snap.count)]
+                for name, kind in _FILTER_COLUMNS.items():
+                    values = [entity.get(name) for entity in entities]
+                    column = self._columns.get(name)
+                    self._columns[name] = column.extend(values, kind) if column else Column.build(values, kind)
+                self._columns_rows = snap.count
+            return {name: column.head(count) for name, column in self._columns.items()}
+
+    def build_ivf(self, nlist: Optional[int] = None, iterations: int = 10, seed: int = 0) -> None:
+        """Train a k-means coarse quantizer over the live vectors."""
+        with self._lock:
+            self.refresh()
+            live = np.nonzero(self._alive)[0]
+            if live.size == 0:
+                return
+            nlist = nlist or max(1, int(np.sqrt(live.size)))
+            nlist = min(nlist, live.size)
+            rng = np.random.default_rng(seed)
+            sample = self._vectors[rng.choice(live, size=min(live.size, nlist * 256), replace=False)]
+            centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = self._assign(sample, centroids)
+                for c in range(nlist):
+                    members = sample[labels == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                if self.metric == "COSINE":
+                    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+            assign = np.concatenate([
+                self._assign(self._vectors[start:start + 65536], centroids)
+                for start in range(0, self._count, 65536)
+            ])
+            self._ivf = {"centroids": centroids.astype(np.float32), "assign": assign}
+            np.savez(self._file("ivf.npz"), **self._ivf)
+            self._ivf_lists = None
+
+    @staticmethod
+    def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        return np.argmax(matrix @ centroids.T, axis=1).astype(np.int32)
+
+    def _lists(self):
+        if self._ivf_lists is None:
+            assign = self._ivf["assign"][:self._count]
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(self._ivf["centroids"]) + 1))
+            self._ivf_lists = (order, bounds)
+        return self._ivf_lists
+
+    @staticmethod
+    def _candidates(snap: _Snapshot, query: np.ndarray, nprobe: int) -> np.ndarray:
+        order, bounds = snap.lists
+        centroid_scores = snap.centroids @ query
+        probe = np.argpartition(-centroid_scores, min(nprobe, len(centroid_scores)) - 1)[:nprobe]
+        return np.concatenate([order[bounds[c]:bounds[c + 1]] for c in probe])
+
+    def _coarse_scores(self, snap: _Snapshot, rows: Optional[np.ndarray], queries: np.ndarray) -> np.ndarray:
+        """Quantized scores of ``rows`` (all rows if ``None``), in blocks to bound memory."""
+        if rows is not None:
+            if self.quantization == "int8":
+                return int8_scores(snap.codes[rows], snap.scales[rows], queries)
+            return binary_scores(snap.codes[rows], queries)
+        blocks = []
+        for start in range(0, snap.count, 8192):
+            block = slice(start, start + 8192)
+            if self.quantization == "int8":
+                blocks.append(int8_scores(snap.codes[block], snap.scales[block], queries))
+            else:
+                blocks.append(binary_scores(snap.codes[block], queries))
+        return np.concatenate(blocks, axis=1)
+
+    def _refine(self, snap: _Snapshot, rows: np.ndarray, coarse: np.ndarray, query: np.ndarray, limit: int,
+                refine_k: float, output_fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """Keep the ``limit * refine_k`` best coarse candidates and re-score them exactly."""
+        coarse = np.where(snap.alive[rows], coarse, -np.inf)
+        k = min(rows.size, max(limit, int(np.ceil(limit * refine_k))))
+        if k == 0:
+            return []
+        picked = np.argpartition(-coarse, k - 1)[:k]
+        picked = picked[np.isfinite(coarse[picked])]
+        candidates = np.sort(rows[picked])
+        scores = snap.vectors[candidates] @ query
+        return self._top_k(snap, candidates, scores, limit, output_fields)
+
+    def search(self, queries, limit: int = 10, nprobe: Optional[int] = None,
+               output_fields: Optional[List[str]] = None,
+               refine_k: float = DEFAULT_REFINE_K, filter: str = "") -> List[List[Dict[str, Any]]]:
+        """Return the top ``limit`` live rows for every query vector.
+
+        Exact search is one matrix product per batch of queries; with an IVF
+        quantizer and ``nprobe`` only the ``nprobe`` closest lists are scanned.
+        Quantized collections score codes first and re-rank the best
+        ``limit * refine_k`` rows with their float vectors.
+
+        ``filter`` (see ``milvus.filter_expr``) is evaluated before scoring and
+        rows that fail it are treated as deleted. Over ``source``, ``tenant``
+        and ``created_at`` it runs vectorized on cached columns; any other
+        field makes it decode every live row's entity.
+        """
+        predicate = parse_filter(filter) if filter else None
+        snap = self.snapshot()
+        matrix = self._prepare(queries)
+        if snap.count == 0:
+            return [[] for _ in range(matrix.shape[0])]
+        if predicate is not None:
+            keep = filter_mask(filter, self._filter_columns(snap.count), snap.count)
+            if keep is None:
+                keep = np.fromiter(
+                    (bool(snap.alive[row]) and predicate(snap.entity(row)) for row in range(snap.count)),
+                    dtype=bool, count=snap.count,
+                )
+            snap = snap._replace(alive=snap.alive & keep)
+        results = []
+        if self.quantization is not None:
+            if snap.centroids is not None and nprobe:
+                for query in matrix:
+                    rows = self._candidates(snap, query, nprobe)
+                    coarse = self._coarse_scores(snap, rows, query[None, :])[0]
+                    results.append(self._refine(snap, rows, coarse, query, limit, refine_k, output_fields))
+            else:
+                rows = np.arange(snap.count)
+                for query, coarse in zip(matrix, self._coarse_scores(snap, None, matrix)):
+                    results.append(self._refine(snap, rows, coarse, query, limit, refine_k, output_fields))
+        elif snap.centroids is not None and nprobe:
+            for query in matrix:
+                rows = self._candidates(snap, query, nprobe)
+                rows = rows[snap.alive[rows]]
+                scores = snap.vectors[rows] @ query
+                results.append(self._top_k(snap, rows, scores, limit, output_fields))
+        else:
+            scores = matrix @ snap.vectors.T
+            scores[:, ~snap.alive] = -np.inf
+            rows = np.arange(snap.count)
+            for query_scores in scores:
+                results.append(self._top_k(snap, rows, query_scores, limit, output_fields))
+        return results
+
+    @staticmethod
+    def _top_k(snap: _Snapshot, rows: np.ndarray, scores: np.ndarray, limit: int,
+               output_fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        if rows.size == 0:
+            return []
+        k = min(limit, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        hits = []
+        for i in top:
+            if not np.isfinite(scores[i]):
+                break
+            row = int(rows[i])
+            entity = snap.entity(row)
+            if output_fields is not None:
+                entity = {k: v for k, v in entity.items() if k in output_fields}
+            hits.append({"id": int(snap.ids[row]), "distance": float(scores[i]), "entity": entity})
+        return hits
+
+    def compact(self) -> None:
+        """Rewrite the files without tombstoned rows."""
+        with self._lock:
+            snap = self.snapshot()
+            live = np.nonzero(snap.alive)[0]
+            rows = [dict(snap.entity(int(r)), my_vector=snap.vectors[r]) for r in live]
+            nlist = len(self._ivf["centroids"]) if self._ivf is not None else None
+            tmp_path = f"{self.path}.compact"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            fresh = NumpyCollection.create(tmp_path, self.dim, self.metric, self.quantization)
+            for start in range(0, len(rows), 4096):
+                fresh.insert(rows[start:start + 4096])
+            shutil.rmtree(self.path)
+            os.replace(tmp_path, self.path)
+            self._count = -1
+            self._columns, self._columns_rows = {}, 0
+            self.refresh()
+            if nlist:
+                self.build_ivf(nlist=nlist)
+
+
+class _IndexParams(list):
+    """Accepts ``add_index`` calls like pymilvus ``IndexParams`` and ignores them."""
+
+    def add_index(self, field_name: str, **kwargs) -> None:
+        self.append({"field_name": field_name, **kwargs})
+
+
+class NumpyVectorClient:
+    """Drop-in subset of ``MilvusClient`` backed by :class:`NumpyCollection`."""
+
+    def __init__(self, root: str = "./data/numpy_store"):
+        """Keep collections under the directory ``root``."""
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._collections: Dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+
+    def _collection(self, collection_name: str) -> NumpyCollection:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.get(collection_name)
+                if collection is None:
+                    path = os.path.join(self.root, collection_name)
+                    if not os.path.exists(os.path.join(path, "meta.json")):
+                        raise ValueError(f"Collection {collection_name!r} does not exist")
+                    collection = NumpyCollection(path)
+                    self._collections[collection_name] = collection
+        return collection
+
+    def list_collections(self) -> List[str]:
+        """Return the names of the collections, sorted."""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, "meta.json"))
+        )
+
+    def has_collection(self, collection_name: str) -> bool:
+        """Return whether ``collection_name`` exists."""
+        return os.path.exists(os.path.join(self.root, collection_name, "meta.json"))
+
+    def describe_collection(self, collection_name: str, **kwargs) -> dict:
+        """Describe a collection in ``MilvusClient``'s shape; non-vector fields are dynamic."""
+        collection = self._collection(collection_name)
+        return {
+            "collection_name": collection_name,
+            "fields": [
+                {"name": "my_id", "type": "INT64", "params": {}, "is_primary": True},
+                {"name": "my_vector", "type": "FLOAT_VECTOR", "params": {"dim": collection.dim}},
+                {"name": "my_content", "type": "VARCHAR", "params": {}},
+            ],
+            "enable_dynamic_field": True,
+            "metric_type": collection.metric,
+            "quantization": collection.quantization,
+            "num_entities": collection.num_entities,
+        }
+
+    def create_collection(self, collection_name: str, dimension: Optional[int] = None,
+                          metric_type: str = "COSINE", schema=None, index_params=None,
+                          quantization: Optional[str] = None, **kwargs) -> None:
+        """Create a collection from a dimension or a pymilvus schema and index params."""
+        if dimension is None and schema is not None:
+            # Accept the pymilvus schemas built by milvus.profiles.
+            dimension = next((f.params["dim"] for f in schema.fields if "dim" in (f.params or {})), None)
+        for index in index_params or []:
+            # Quantizing Milvus index types (IVF_SQ8, IVF_RABITQ, ...) select the same codes here.
+            if index.get("index_type") and index.get("metric_type"):
+                metric_type = index["metric_type"]
+                quantization = quantization or quantization_for(index["index_type"])
+        with self._lock:
+            self._collections[collection_name] = NumpyCollection.create(
+                os.path.join(self.root, collection_name), dimension or 768, metric_type, quantization
+            )
+
+    def drop_collection(self, collection_name: str) -> None:
+        """Delete a collection and its files."""
+        with self._lock:
+            self._collections.pop(collection_name, None)
+            shutil.rmtree(os.path.join(self.root, collection_name), ignore_errors=True)
+
+    def insert(self, collection_name: str, data: Sequence[Dict[str, Any]], **kwargs) -> dict:
+        """Append ``data`` rows."""
+        ids = self._collection(collection_name).insert(data)
+        return {"insert_count": len(ids), "ids": ids}
+
+    def upsert(self, collection_name: str, data: Sequence[Dict[str, Any]], **kwargs) -> dict:
+        """Replace the rows with the ids in ``data``, inserting new ones."""
+        collection = self._collection(collection_name)
+        collection.delete(row["my_id"] for row in data)
+        ids = collection.insert(data)
+        return {"upsert_count": len(ids)}
+
+    def delete(self, collection_name: str, ids: Optional[Sequence[int]] = None, **kwargs) -> dict:
+        """Delete rows by primary key."""
+        return {"delete_count": self._collection(collection_name).delete(ids or [])}
+
+    def search(self, collection_name: str, data, limit: int = 10,
+               output_fields: Optional[List[str]] = None,
+               search_params: Optional[dict] = None, filter: str = "",
+               **kwargs) -> List[List[Dict[str, Any]]]:
+        """Search like ``MilvusClient.search``, honouring ``offset``, ``nprobe`` and ``refine_k``."""
+        search_params = search_params or {}
+        params = search_params.get("params") or {}
+        offset = int(search_params.get("offset") or kwargs.get("offset") or 0)
+        res = self._collection(collection_name).search(
+            data, limit=limit + offset, nprobe=params.get("nprobe"), output_fields=output_fields,
+            refine_k=params.get("refine_k") or DEFAULT_REFINE_K, filter=filter,
+        )
+        return [hits[offset:] for hits in res] if offset else res
+
+    # Index and load management are no-ops: vectors are always "loaded" and the
+    # IVF quantizer is built explicitly with build_ivf.
+    def prepare_index_params(self, **kwargs) -> "_IndexParams":
+        """Return an index params collector."""
+        return _IndexParams()
+
+    def create_index(self, collection_name: str, index_params=None, **kwargs) -> None:
+        """Do nothing; see :meth:`build_ivf`."""
+
+    def drop_index(self, collection_name: str, index_name: str = "", **kwargs) -> None:
+        """Do nothing."""
+
+    def list_indexes(self, collection_name: str, **kwargs) -> List[str]:
+        """Return no indexes."""
+        return []
+
+    def describe_index(self, collection_name: str, index_name: str = "", **kwargs) -> dict:
+        """Return an empty description."""
+        return {}
+
+    def load_collection(self, collection_name: str, **kwargs) -> None:
+        """Pick up rows written by other processes."""
+        self._collection(collection_name).refresh()
+
+    def release_collection(self, collection_name: str, **kwargs) -> None:
+        """Do nothing."""
+
+    def get_load_state(self, collection_name: str, **kwargs) -> dict:
+        """Report a collection as loaded whenever it exists."""
+        return {"state": "Loaded" if self.has_collection(collection_name) else "NotExist"}
+
+    def flush(self, collection_name: str, **kwargs) -> None:
+        """Do nothing; inserts are durable once they return."""
+
+    def build_ivf(self, collection_name: str, nlist: Optional[int] = None) -> None:
+        """Build the IVF coarse quantizer of a collection."""
+        self._collection(collection_name).build_ivf(nlist=nlist)
+
+    def close(self) -> None:
+        """Forget the open collections."""
+        self._collections.clear()
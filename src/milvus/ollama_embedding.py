@@ -1,13 +1,15 @@
-from langchain_ollama import OllamaEmbeddings
+from .embedding_provider import DEFAULT_MODEL, get_embedding_provider
 
 """
 pip install -qU langchain-ollama
+
+Run as a module from src/ (the package uses relative imports):
+python -m milvus.ollama_embedding
 """
 
 
-def get_embeddings(text: str):
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
-    return embeddings.embed_query(text)
+def get_embeddings(text: str, model: str = DEFAULT_MODEL):
+    return get_embedding_provider(model).embed_query(text)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+"""Named collection profiles: schema, vector index, search and scalar-index settings.
+
+``create_collection_test`` used to hard-code ``AUTOINDEX``/COSINE and searches
+passed no ``ef``/``nprobe``. A :class:`CollectionProfile` makes all of that
+explicit, and :func:`apply_profile` creates a collection from a profile (or
+re-indexes an existing one) and reports the build time.
+
+Milvus Lite builds FLAT indexes whatever the profile asks for; HNSW/IVF
+parameters take effect on a standalone or distributed Milvus. The quantized
+profiles (``int8``, ``binary``) also apply to ``numpy://`` collections, which
+store int8 or binary codes and re-rank with float vectors kept on disk.
+"""
+
+import os
+import resource
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, List, Optional
+
+from pymilvus import DataType, MilvusClient
+
+from .quantization import quantization_for
+
+VECTOR_FIELD = "my_vector"
+
+# Structured metadata written by ingestion and usable in filter expressions.
+METADATA_FIELDS = {
+    "source": {"datatype": DataType.VARCHAR, "max_length": 1024},
+    "tenant": {"datatype": DataType.VARCHAR, "max_length": 128},
+    "created_at": {"datatype": DataType.INT64},
+}
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """Everything needed to create, index and search a collection."""
+
+    name: str
+    index_type: str = "AUTOINDEX"
+    metric_type: str = "COSINE"
+    build_params: Dict[str, Any] = field(default_factory=dict)
+    search_params: Dict[str, Any] = field(default_factory=dict)
+    dim: int = 768
+    max_content_length: int = 65535
+    metadata_fields: bool = False
+    """Declare ``METADATA_FIELDS`` in the schema instead of leaving them dynamic."""
+    scalar_indexes: Dict[str, str] = field(default_factory=dict)
+    """Scalar field name -> index type (e.g. ``INVERTED``, ``STL_SORT``)."""
+    partition_key: Optional[str] = None
+    num_partitions: Optional[int] = None
+
+    @property
+    def quantization(self) -> Optional[str]:
+        """``int8``/``binary`` if the index stores quantized vectors, else ``None``."""
+        return quantization_for(self.index_type)
+
+    def search_request(self, **overrides) -> Dict[str, Any]:
+        """Return the ``search_params`` argument for ``MilvusClient.search``."""
+        return {"metric_type": self.metric_type, "params": {**self.search_params, **overrides}}
+
+
+PROFILES: Dict[str, CollectionProfile] = {
+    # The original collection_test setup.
+    "default": CollectionProfile(name="default"),
+    "flat": CollectionProfile(name="flat", index_type="FLAT"),
+    "hnsw": CollectionProfile(
+        name="hnsw",
+        index_type="HNSW",
+        build_params={"M": 16, "efConstruction": 200},
+        search_params={"ef": 64},
+    ),
+    "hnsw_high_recall": CollectionProfile(
+        name="hnsw_high_recall",
+        index_type="HNSW",
+        build_params={"M": 32, "efConstruction": 400},
+        search_params={"ef": 256},
+    ),
+    "ivf_flat": CollectionProfile(
+        name="ivf_flat",
+        index_type="IVF_FLAT",
+        build_params={"nlist": 1024},
+        search_params={"nprobe": 16},
+    ),
+    # Quantized vectors with a float re-rank of refine_k * top-k candidates.
+    # int8 is ~4x smaller than float32; binary (RaBitQ, Milvus >= 2.6) ~32x.
+    "int8": CollectionProfile(
+        name="int8",
+        index_type="IVF_SQ8",
+        build_params={"nlist": 1024},
+        search_params={"nprobe": 16},
+    ),
+    "binary": CollectionProfile(
+        name="binary",
+        index_type="IVF_RABITQ",
+        build_params={"nlist": 1024, "refine": True, "refine_type": "SQ8"},
+        search_params={"nprobe": 16, "refine_k": 32},
+    ),
+    # Multi-tenant: rows are routed to partitions by tenant, and source /
+    # created_at get scalar indexes for cheap pre-filtering.
+    "tenant_hnsw": CollectionProfile(
+        name="tenant_hnsw",
+        index_type="HNSW",
+        build_params={"M": 16, "efConstruction": 200},
+        search_params={"ef": 64},
+        metadata_fields=True,
+        scalar_indexes={"source": "INVERTED", "created_at": "STL_SORT"},
+        partition_key="tenant",
+        num_partitions=64,
+    ),
+}
+
+
+def get_profile(name: str, **overrides) -> CollectionProfile:
+    """Look up a named profile, optionally overriding some of its settings."""
+    try:
+        profile = PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown collection profile {name!r}, expected one of {sorted(PROFILES)}") from None
+    return replace(profile, **overrides) if overrides else profile
+
+
+def build_schema(profile: CollectionProfile):
+    """Return the collection schema of ``profile``."""
+    schema = MilvusClient.create_schema(
+        auto_id=False,
+        enable_dynamic_field=True,
+    )
+    schema.add_field(field_name="my_id", datatype=DataType.INT64, is_primary=True)
+    schema.add_field(field_name=VECTOR_FIELD, datatype=DataType.FLOAT_VECTOR, dim=profile.dim)
+    schema.add_field(field_name="my_content", datatype=DataType.VARCHAR, max_length=profile.max_content_length)
+    if profile.metadata_fields:
+        for name, spec in METADATA_FIELDS.items():
+            schema.add_field(field_name=name, is_partition_key=(name == profile.partition_key), **spec)
+    return schema
+
+
+def build_index_params(client: MilvusClient, profile: CollectionProfile):
+    """Return the vector and scalar index params of ``profile``."""
+    index_params = client.prepare_index_params()
+    index_params.add_index(
+        field_name=VECTOR_FIELD,
+        index_type=profile.index_type,
+        metric_type=profile.metric_type,
+        params=profile.build_params,
+    )
+    for field_name, index_type in profile.scalar_indexes.items():
+        index_params.add_index(field_name=field_name, index_type=index_type)
+    return index_params
+
+
+def resident_memory_mb() -> float:
+    """Return the resident set size of this (client) process in MiB (peak RSS off Linux).
+
+    Milvus Lite and remote Milvus build and hold indexes in their own process,
+    so this is not index memory; only ``numpy://`` collections live in-process.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # ru_maxrss is KiB on Linux and bytes on macOS; either way it is an upper bound.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if peak < 1 << 32 else peak / (1024 * 1024)
+
+
+@dataclass
+class ProfileReport:
+    """Outcome and timing of :func:`apply_profile`."""
+    collection_name: str
+    profile: str
+    created: bool
+    build_seconds: float
+    # RSS of this client process around the build, not index memory (see resident_memory_mb).
+    client_rss_before_mb: float
+    client_rss_after_mb: float
+    indexes: List[Dict[str, Any]]
+
+    def to_dict(self) -> dict:
+        """Return the report as a JSON-ready dict."""
+        return asdict(self)
+
+
+def apply_profile(
+        client: MilvusClient,
+        collection_name: str,
+        profile: CollectionProfile,
+        timeout: Optional[float] = None,
+) -> ProfileReport:
+    """Create ``collection_name`` from ``profile``, or rebuild its vector index.
+
+    Existing collections keep their data and schema: they are released, their
+    vector index is dropped and rebuilt with the profile's parameters and they
+    are loaded again. Scalar indexes are added for fields the schema has.
+    """
+    rss_before = resident_memory_mb()
+    started = time.perf_counter()
+    created = not client.has_collection(collection_name)
+    if created:
+        kwargs = {}
+        if profile.partition_key and profile.num_partitions:
+            kwargs["num_partitions"] = profile.num_partitions
+        client.create_collection(
+            collection_name=collection_name,
+            schema=build_schema(profile),
+            index_params=build_index_params(client, profile),
+            timeout=timeout,
+            **kwargs,
+        )
+    else:
+        fields = {f["name"] for f in client.describe_collection(collection_name)["fields"]}
+        client.release_collection(collection_name)
+        for index_name in client.list_indexes(collection_name):
+            if index_name == VECTOR_FIELD or index_name in profile.scalar_indexes:
+                client.drop_index(collection_name, index_name=index_name)
+        usable = replace(
+            profile, scalar_indexes={k: v for k, v in profile.scalar_indexes.items() if k in fields}
+        )
+        client.create_index(collection_name, build_index_params(client, usable), timeout=timeout)
+    client.load_collection(collection_name, timeout=timeout)
+    build_seconds = time.perf_counter() - started
+
+    indexes = [
+        client.describe_index(collection_name, index_name=index_name)
+        for index_name in client.list_indexes(collection_name)
+    ]
+    return ProfileReport(
+        collection_name=collection_name,
+        profile=profile.name,
+        created=created,
+        build_seconds=build_seconds,
+        client_rss_before_mb=rss_before,
+        client_rss_after_mb=resident_memory_mb(),
+        indexes=indexes,
+    )
@@ -0,0 +1,80 @@
+"""Scalar (int8) and binary vector quantization with float re-ranking.
+
+A 768-dim float32 vector costs 3 KB. Int8 codes with one float32 scale per
+row cost ``dim + 4`` bytes (~4x smaller) and binary sign codes ``dim / 8``
+bytes (32x smaller). Quantized scores are only used to pick a candidate set
+``refine_k`` times larger than the requested top-k; the candidates are then
+re-scored exactly against the float vectors, which are read from disk for
+those few rows only.
+
+Index types map to the same quantization on a standalone Milvus, so one
+profile describes both the server-side index and the local NumPy store.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+QUANTIZATIONS = ("int8", "binary")
+
+# Milvus index types whose vectors are stored quantized.
+INDEX_QUANTIZATION: Dict[str, str] = {
+    "IVF_SQ8": "int8",
+    "HNSW_SQ": "int8",
+    "IVF_RABITQ": "binary",
+}
+
+DEFAULT_REFINE_K = 4
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantization_for(index_type: str) -> Optional[str]:
+    """Return the code type searched for a Milvus ``index_type``, or ``None`` for float32."""
+    return INDEX_QUANTIZATION.get(index_type.upper())
+
+
+def code_bytes(dim: int, quantization: Optional[str]) -> int:
+    """Bytes stored per vector for the searchable codes."""
+    if quantization == "int8":
+        return dim + 4
+    if quantization == "binary":
+        return (dim + 7) // 8
+    return dim * 4
+
+
+def int8_encode(matrix: np.ndarray):
+    """Symmetric per-row int8 codes and their float32 scales."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def int8_scores(codes: np.ndarray, scales: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Approximate inner products of float ``queries`` with int8 rows."""
+    return (queries @ codes.astype(np.float32).T) * scales[None, :]
+
+
+def binary_encode(matrix: np.ndarray) -> np.ndarray:
+    """Sign bits packed eight dimensions per byte."""
+    return np.packbits(matrix > 0, axis=1)
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(words)
+    return _POPCOUNT[words.view(np.uint8)]
+
+
+def binary_scores(codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Negated Hamming distances, so that larger is closer like the float metrics."""
+    query_codes = binary_encode(queries)
+    if codes.shape[1] % 8 == 0:
+        # XOR and popcount 64 bits at a time instead of byte by byte.
+        codes = np.ascontiguousarray(codes).view(np.uint64)
+        query_codes = query_codes.view(np.uint64)
+    scores = np.empty((query_codes.shape[0], codes.shape[0]), dtype=np.float32)
+    for i, query_code in enumerate(query_codes):
+        scores[i] = -_popcount(np.bitwise_xor(codes, query_code)).sum(axis=1, dtype=np.int32)
+    return scores
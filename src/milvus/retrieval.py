@@ -0,0 +1,266 @@
+"""Multi-query retrieval over ``collection_test``-shaped collections.
+
+Several rewrites of a question (or several sub-questions) are embedded in one
+``embed_documents`` call and sent to Milvus as a single batched ``search``.
+Per-query hit lists are then merged and de-duplicated by ``my_id`` with either
+max-score or reciprocal-rank fusion. The same fusion merges dense hits with
+BM25 hits from ``milvus.bm25`` for hybrid retrieval.
+
+Searches accept a Milvus boolean ``filter`` over the metadata written by
+ingestion (``source``, ``tenant``, ``created_at``) and an ``offset`` for
+paging; both are pushed down into ``MilvusClient.search`` rather than applied
+to the returned hits. Filters are limited to the subset in
+``milvus.filter_expr``, which ``NumpyVectorClient`` evaluates as well.
+"""
+
+import asyncio
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from pymilvus import MilvusClient
+
+from .embedding_provider import get_embedding_provider
+from .filter_expr import parse_filter
+
+OUTPUT_FIELDS = ["my_id", "my_content"]
+
+
+@dataclass
+class SearchHit:
+    """A retrieved chunk, optionally merged from several ranked lists."""
+
+    id: int
+    content: str
+    score: float
+    matched: List[int] = field(default_factory=list)
+    """Indices of the ranked lists (queries) that returned this chunk."""
+
+
+@dataclass
+class RetrievalResult:
+    """Fused hits for a set of queries."""
+
+    queries: List[str]
+    hits: List[SearchHit]
+    fusion: str
+
+    def to_json(self) -> str:
+        """Serialize the result, e.g. for a tool message."""
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+
+def hits_from_milvus(hits: Sequence[dict]) -> List[SearchHit]:
+    """Convert one query's raw ``MilvusClient.search`` hits."""
+    converted = []
+    for hit in hits:
+        entity = hit.get("entity") or {}
+        converted.append(
+            SearchHit(
+                id=entity.get("my_id", hit.get("id")),
+                content=entity.get("my_content", ""),
+                score=float(hit.get("distance", 0.0)),
+            )
+        )
+    return converted
+
+
+def fuse_max_score(ranked_lists: Sequence[Sequence[SearchHit]], limit: int) -> List[SearchHit]:
+    """Keep each chunk once with the best score any list gave it.
+
+    Only meaningful when all lists share a score scale (e.g. COSINE similarity).
+    """
+    merged: Dict[int, SearchHit] = {}
+    for list_index, hits in enumerate(ranked_lists):
+        for hit in hits:
+            current = merged.get(hit.id)
+            if current is None:
+                merged[hit.id] = SearchHit(hit.id, hit.content, hit.score, [list_index])
+                continue
+            current.matched.append(list_index)
+            current.score = max(current.score, hit.score)
+    return sorted(merged.values(), key=lambda h: h.score, reverse=True)[:limit]
+
+
+def fuse_rrf(ranked_lists: Sequence[Sequence[SearchHit]], limit: int, k: int = 60) -> List[SearchHit]:
+    """Reciprocal-rank fusion: ``score = sum(1 / (k + rank))`` over all lists.
+
+    Works across lists with unrelated score scales, e.g. dense and BM25.
+    """
+    merged: Dict[int, SearchHit] = {}
+    for list_index, hits in enumerate(ranked_lists):
+        for rank, hit in enumerate(hits, start=1):
+            current = merged.get(hit.id)
+            if current is None:
+                current = SearchHit(hit.id, hit.content, 0.0, [])
+                merged[hit.id] = current
+            current.matched.append(list_index)
+            current.score += 1.0 / (k + rank)
+    return sorted(merged.values(), key=lambda h: h.score, reverse=True)[:limit]
+
+
+FUSIONS: Dict[str, Callable[..., List[SearchHit]]] = {
+    "max": fuse_max_score,
+    "rrf": fuse_rrf,
+}
+
+
+def fuse(ranked_lists: Sequence[Sequence[SearchHit]], limit: int, fusion: str = "rrf") -> List[SearchHit]:
+    """Merge ranked lists with the named fusion method."""
+    try:
+        method = FUSIONS[fusion]
+    except KeyError:
+        raise ValueError(f"Unknown fusion {fusion!r}, expected one of {sorted(FUSIONS)}") from None
+    return method(ranked_lists, limit)
+
+
+def _quote(value: str) -> str:
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+def build_filter(
+        expr: str = "",
+        tenant: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+) -> str:
+    """Combine a free-form filter expression with structured metadata clauses.
+
+    ``expr`` usually comes from the model, so it is parsed with
+    :func:`milvus.filter_expr.parse_filter` first: unbalanced parentheses or
+    anything outside that subset raise ``ValueError``. A parsed ``expr`` is one
+    self-contained sub-expression, so wrapping it in parentheses means an
+    ``or`` inside it can never widen the ``tenant`` clause.
+    """
+    clauses = []
+    if expr and expr.strip():
+        parse_filter(expr)
+        clauses.append(f"({expr.strip()})")
+    if tenant is not None:
+        clauses.append(f"tenant == {_quote(tenant)}")
+    if source is not None:
+        clauses.append(f"source == {_quote(source)}")
+    if since is not None:
+        clauses.append(f"created_at >= {int(since)}")
+    if until is not None:
+        clauses.append(f"created_at < {int(until)}")
+    return " and ".join(clauses)
+
+
+def _search_kwargs(search_params: Optional[dict], filter: str, offset: int) -> dict:
+    search_params = dict(search_params or {"metric_type": "COSINE"})
+    if offset:
+        search_params["offset"] = offset
+    kwargs = {"search_params": search_params}
+    if filter:
+        kwargs["filter"] = filter
+    return kwargs
+
+
+def multi_search(
+        client: MilvusClient,
+        queries: Sequence[str],
+        collection_name: str,
+        limit: int = 5,
+        per_query_limit: Optional[int] = None,
+        fusion: str = "rrf",
+        search_params: Optional[dict] = None,
+        embedder=None,
+        filter: str = "",
+        offset: int = 0,
+) -> RetrievalResult:
+    """Search all ``queries`` in one round-trip and fuse the results."""
+    queries = list(queries)
+    if not queries:
+        return RetrievalResult(queries=[], hits=[], fusion=fusion)
+    embedder = embedder or get_embedding_provider()
+    vectors = embedder.embed_documents(queries)
+    res = client.search(
+        collection_name=collection_name,
+        data=vectors,
+        limit=per_query_limit or limit,
+        output_fields=OUTPUT_FIELDS,
+        **_search_kwargs(search_params, filter, offset),
+    )
+    ranked_lists = [hits_from_milvus(hits) for hits in res]
+    return RetrievalResult(queries=queries, hits=fuse(ranked_lists, limit, fusion), fusion=fusion)
+
+
+async def amulti_search(
+        searcher,
+        queries: Sequence[str],
+        collection_name: str,
+        limit: int = 5,
+        per_query_limit: Optional[int] = None,
+        fusion: str = "rrf",
+        search_params: Optional[dict] = None,
+        embedder=None,
+        filter: str = "",
+        offset: int = 0,
+) -> RetrievalResult:
+    """Async variant of :func:`multi_search` on an ``AsyncMilvusSearcher``."""
+    queries = list(queries)
+    if not queries:
+        return RetrievalResult(queries=[], hits=[], fusion=fusion)
+    embedder = embedder or searcher.embedder or get_embedding_provider()
+    vectors = await embedder.aembed_documents(queries)
+    res = await searcher.search(
+        collection_name,
+        vectors,
+        limit=per_query_limit or limit,
+        output_fields=OUTPUT_FIELDS,
+        **_search_kwargs(search_params, filter, offset),
+    )
+    ranked_lists = [hits_from_milvus(hits) for hits in res]
+    return RetrievalResult(queries=queries, hits=fuse(ranked_lists, limit, fusion), fusion=fusion)
+
+
+async def ahybrid_search(
+        searcher,
+        lexical_index,
+        query: str,
+        collection_name: str,
+        limit: int = 5,
+        dense_limit: Optional[int] = None,
+        sparse_limit: Optional[int] = None,
+        search_params: Optional[dict] = None,
+        filter: str = "",
+        offset: int = 0,
+        tenant: Optional[str] = None,
+) -> RetrievalResult:
+    """Fuse dense hits from ``searcher`` with BM25 hits from ``lexical_index``.
+
+    The lexical lookup runs while the query is being embedded, so it adds no
+    latency; exact-term matches let ``dense_limit`` stay small.
+
+    ``tenant`` scopes both sides. The BM25 index cannot evaluate arbitrary
+    Milvus expressions or page consistently with Milvus, so with a ``filter``
+    or a non-zero ``offset`` only the dense side is searched, and then it
+    returns the full ``limit`` whatever ``dense_limit`` says.
+    """
+    lexical = lexical_index is not None and not (filter and filter.strip()) and not offset
+    dense_limit = (dense_limit or limit) if lexical else limit
+    sparse_limit = sparse_limit or limit
+    sparse_task = None
+    if lexical:
+        sparse_task = asyncio.ensure_future(
+            asyncio.to_thread(lexical_index.search, query, sparse_limit, tenant=tenant)
+        )
+    try:
+        dense = await searcher.search_text(
+            query,
+            collection_name=collection_name,
+            limit=dense_limit,
+            output_fields=OUTPUT_FIELDS,
+            **_search_kwargs(search_params, build_filter(filter, tenant=tenant), offset),
+        )
+    except BaseException:
+        if sparse_task is not None:
+            sparse_task.cancel()
+        raise
+    if sparse_task is None:
+        return RetrievalResult(queries=[query], hits=hits_from_milvus(dense)[:limit], fusion="dense")
+    sparse = await sparse_task
+    ranked_lists = [hits_from_milvus(dense), sparse]
+    return RetrievalResult(queries=[query], hits=fuse(ranked_lists, limit, "rrf"), fusion="rrf")
@@ -1,4 +1,5 @@
 import os
+import sys
 from typing import Annotated
 
 from langchain_community.tools import TavilySearchResults
@@ -8,11 +9,14 @@ from langgraph.prebuilt import create_react_agent
 from typing_extensions import Literal
 from langchain_experimental.utilities import PythonREPL
 
-from langchain_community.chat_models import ChatTongyi
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph, MessagesState
 from langgraph.types import Command
 
+# The shared LLM layer lives in src/llm, next to this package.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm.router import get_chat_model
+
 """
 https://langchain-ai.github.io/langgraph/tutorials/multi_agent/multi-agent-collaboration/
 """
@@ -21,7 +25,7 @@ os.environ["DASHSCOPE_API_KEY"] = "..."
 os.environ["TAVILY_API_KEY"] = "..."
 
 
-model = ChatTongyi(model="qwen-plus")
+model = get_chat_model("qwen:qwen-plus")
 
 tavily_tool = TavilySearchResults(max_results=5)
 
@@ -1,4 +1,5 @@
 import os
+import sys
 from typing import Annotated, TypedDict
 
 from langchain_community.tools import TavilySearchResults
@@ -8,11 +9,14 @@ from langgraph.prebuilt import create_react_agent
 from typing_extensions import Literal
 from langchain_experimental.utilities import PythonREPL
 
-from langchain_community.chat_models import ChatTongyi
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph, MessagesState
 from langgraph.types import Command
 
+# The shared LLM layer lives in src/llm, next to this package.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm.router import get_chat_model
+
 """
 https://langchain-ai.github.io/langgraph/tutorials/multi_agent/agent_supervisor/
 """
@@ -61,7 +65,7 @@ class Router(TypedDict):
     next: Literal[*options]
 
 
-llm = ChatTongyi(model="qwen-plus")
+llm = get_chat_model("qwen:qwen-plus")
 
 
 class State(MessagesState):
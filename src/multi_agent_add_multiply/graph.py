@@ -1,33 +1,24 @@
 import os
+import sys
 from typing import Annotated
 
-from langchain_community.chat_models import ChatTongyi
+from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.constants import START
-from langgraph.graph import StateGraph, MessagesState
-from langgraph.prebuilt import InjectedState
-from langchain_core.tools import tool
-from langchain_deepseek import ChatDeepSeek
-from langgraph.prebuilt import create_react_agent
+from langgraph.graph import MessagesState, StateGraph
+from langgraph.prebuilt import InjectedState, create_react_agent
 from langgraph.types import Command
 
+# The shared LLM layer lives in src/llm, next to this package.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm.router import get_chat_model
 
 os.environ["DEEPSEEK_API_KEY"] = "..."
 os.environ["DASHSCOPE_API_KEY"] = "..."
 
 
-# model = ChatDeepSeek(
-#     model="deepseek-chat",
-#     temperature=0,
-#     max_tokens=None,
-#     timeout=None,
-#     max_retries=2,
-# )
-
-
-model = ChatTongyi(
-    model="qwen-plus"
-)
+# model = get_chat_model("deepseek-chat", temperature=0)
+model = get_chat_model("qwen:qwen-plus")
 
 @tool
 def add(a: int, b: int) -> int:
@@ -1,8 +1,13 @@
-from langchain_deepseek import ChatDeepSeek
-from langchain_openai import ChatOpenAI
+import os
+import sys
+
 from langgraph.prebuilt import create_react_agent
 from langgraph_supervisor import create_supervisor
 
+# The shared LLM layer lives in src/llm, next to this package.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from llm.router import get_chat_model
+
 """
 https://langchain-ai.github.io/langgraph/agents/multi-agent/#supervisor
 pip install langgraph-supervisor
@@ -10,14 +15,7 @@ pip install -e .
 langgraph dev 
 """
 
-llm = ChatDeepSeek(
-    model="deepseek-chat",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    # other params...
-)
+llm = get_chat_model("deepseek-chat", temperature=0)
 
 
 def book_hotel(hotel_name: str):
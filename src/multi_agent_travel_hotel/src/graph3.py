@@ -4,17 +4,21 @@ from langchain_core.tools import tool, InjectedToolCallId
 from langgraph.prebuilt import InjectedState, create_react_agent
 from typing_extensions import Literal
 import os
+import sys
 import random
 
-from langchain_community.chat_models import ChatTongyi
 from langgraph.constants import START
 from langgraph.graph import StateGraph, MessagesState
 from langgraph.types import Command
 
+# The shared LLM layer lives in src/llm, next to this package.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from llm.router import get_chat_model
+
 os.environ["DEEPSEEK_API_KEY"] = "..."
 os.environ["DASHSCOPE_API_KEY"] = "..."
 
-model = ChatTongyi(model="qwen-plus")
+model = get_chat_model("qwen:qwen-plus")
 
 
 @tool
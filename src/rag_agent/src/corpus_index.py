@@ -0,0 +1,394 @@
+"""Prebuilt, on-disk index of the RAG corpus.
+
+Fetching the blog posts, splitting them with tiktoken and embedding every chunk
+used to happen at import time of ``graph.py``, on every ``langgraph dev``
+restart and worker spawn. ``build`` does it once and persists the result
+in a version directory:
+
+    CURRENT              name of the live version directory
+    .lock                held while a process builds or refreshes the index
+    v<ns>/manifest.json  embedding model, splitter settings and, per source,
+                         its ETag / Last-Modified / content hash and row range
+    v<ns>/chunks.jsonl   one ``{"id", "text", "metadata"}`` object per chunk
+    v<ns>/embeddings.f32 row-major float32 matrix, one L2-normalized row per chunk
+
+A build writes a new version directory and publishes it by replacing
+``CURRENT``, so a reader always sees the three files of one version. Workers
+that start together wait on ``.lock`` and reuse the index the first one built.
+
+At startup the graph memory-maps ``embeddings.f32`` instead of re-embedding.
+Rows are normalized when the index is built, so ``MatrixVectorStore`` can
+search the read-only mapping directly and workers share its pages.
+Refreshing sends conditional requests (``If-None-Match`` /
+``If-Modified-Since``); a source is only re-split and re-embedded when the
+server reports a change and its content hash actually differs, every other
+source keeps its rows. Sources are fetched concurrently by ``rag.loader``
+and each one is embedded as soon as its chunks arrive.
+
+Usage:
+    python -m rag.corpus_index build [--force] [url ...]
+    python -m rag.corpus_index status
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from rag.loader import CHUNK_OVERLAP, CHUNK_SIZE, load_sources, split_executor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URLS = [
+    "https://lilianweng.github.io/posts/2024-11-28-reward-hacking/",
+    "https://lilianweng.github.io/posts/2024-07-07-hallucination/",
+    # "https://lilianweng.github.io/posts/2024-04-12-diffusion-video/",
+]
+
+DEFAULT_INDEX_DIR = os.getenv(
+    "RAG_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rag_index"),
+)
+EMBEDDING_MODEL = "text-embedding-v3"
+# Sources are re-checked with conditional requests once the index is older than this.
+MAX_AGE_SECONDS = float(os.getenv("RAG_INDEX_MAX_AGE", "86400"))
+
+
+def default_embeddings():
+    """Return the DashScope embeddings the index is built with."""
+    from langchain_community.embeddings import DashScopeEmbeddings
+
+    return DashScopeEmbeddings(model=EMBEDDING_MODEL)
+
+
+class CorpusIndex:
+    """Chunks and their embeddings as persisted by :func:`build_index`."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_DIR):
+        """Open the live version of the index at ``path``; embeddings are memory-mapped."""
+        self.root = path
+        self.path = _current_dir(path)
+        with open(self._file("manifest.json"), encoding="utf-8") as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        with open(self._file("chunks.jsonl"), encoding="utf-8") as f:
+            self.chunks: List[Dict[str, Any]] = [json.loads(line) for line in f if line.strip()]
+        shape = (len(self.chunks), self.manifest["dim"])
+        if self.chunks:
+            self.embeddings = np.memmap(self._file("embeddings.f32"), dtype=np.float32, mode="r", shape=shape)
+        else:
+            self.embeddings = np.zeros(shape, dtype=np.float32)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @classmethod
+    def exists(cls, path: str = DEFAULT_INDEX_DIR) -> bool:
+        """Return whether an index has been written at ``path``."""
+        return os.path.exists(os.path.join(_current_dir(path), "manifest.json"))
+
+    def fresh(self, sources: Sequence[str], max_age: float) -> bool:
+        """Return whether the index matches ``sources`` and was checked within ``max_age`` seconds."""
+        return self.compatible(sources) and self.age_seconds <= max_age
+
+    @property
+    def age_seconds(self) -> float:
+        """Seconds since the sources were last checked."""
+        return time.time() - self.manifest.get("checked_at", 0)
+
+    def compatible(self, sources: Sequence[str]) -> bool:
+        """Whether this index was built with the current settings for ``sources``."""
+        return (
+            self.manifest.get("normalized", False)
+            and self.manifest.get("embedding_model") == EMBEDDING_MODEL
+            and self.manifest.get("chunk_size") == CHUNK_SIZE
+            and self.manifest.get("chunk_overlap") == CHUNK_OVERLAP
+            and set(self.manifest.get("sources", {})) == set(sources)
+        )
+
+    def source_rows(self, url: str) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Return the chunks and embeddings of one source."""
+        entry = self.manifest["sources"][url]
+        start, count = entry["start"], entry["count"]
+        return self.chunks[start:start + count], np.asarray(self.embeddings[start:start + count])
+
+    def documents(self) -> List[Document]:
+        """Return every chunk as a LangChain ``Document``."""
+        return [Document(id=c["id"], page_content=c["text"], metadata=c["metadata"]) for c in self.chunks]
+
+
+def _chunk_id(url: str, index: int, text: str) -> str:
+    return hashlib.sha1(f"{url}\0{index}\0{text}".encode()).hexdigest()
+
+
+def _current_dir(path: str) -> str:
+    """Directory holding the live version (``path`` itself for an unversioned index)."""
+    try:
+        with open(os.path.join(path, "CURRENT"), encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        return path
+
+
+@contextmanager
+def _build_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive inter-process lock on ``path/.lock``."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, ".lock"), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10s; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _write_index(path: str, manifest: Dict[str, Any], chunks: List[Dict[str, Any]],
+                 embeddings: np.ndarray) -> None:
+    """Write a new version directory and publish it by replacing ``CURRENT``.
+
+    The previous version is kept, since a reader may have just resolved it;
+    older ones and the files of an unversioned index are removed.
+    """
+    os.makedirs(path, exist_ok=True)
+    previous = os.path.basename(_current_dir(path)) if os.path.exists(os.path.join(path, "CURRENT")) else None
+    version = f"v{time.time_ns()}"
+    staging = os.path.join(path, f".{version}.tmp")
+    os.makedirs(staging)
+    with open(os.path.join(staging, "chunks.jsonl"), "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+    np.ascontiguousarray(embeddings, dtype=np.float32).tofile(os.path.join(staging, "embeddings.f32"))
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.rename(staging, os.path.join(path, version))
+    with open(os.path.join(path, "CURRENT.tmp"), "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(os.path.join(path, "CURRENT.tmp"), os.path.join(path, "CURRENT"))
+
+    for name in os.listdir(path):
+        if name in (version, previous):
+            continue
+        target = os.path.join(path, name)
+        if name.startswith("v") and os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        elif name in ("chunks.jsonl", "embeddings.f32", "manifest.json"):
+            try:
+                os.remove(target)
+            except OSError:  # still mapped by a reader on Windows
+                pass
+
+
+async def abuild_index(
+        urls: Iterable[str] = DEFAULT_URLS,
+        path: str = DEFAULT_INDEX_DIR,
+        embedding=None,
+        force: bool = False,
+        concurrency: int = 8,
+        per_host_rps: float = 4.0,
+        max_age: Optional[float] = None,
+) -> Dict[str, str]:
+    """Build or refresh the index at ``path``; return what happened to each source.
+
+    Unchanged sources (``304``, or ``200`` with an identical content hash) keep
+    their chunks and embeddings. With ``force`` every source is re-fetched,
+    re-split and re-embedded.
+
+    The build holds ``path/.lock``, so concurrent builds run one after the
+    other. With ``max_age``, a compatible index checked less than ``max_age``
+    seconds ago (e.g. by the process that held the lock) is left as it is.
+    """
+    urls = list(urls)
+    lock = _build_lock(path)
+    # Waiting for another process's build must not block this event loop.
+    await asyncio.to_thread(lock.__enter__)
+    try:
+        if max_age is not None and not force and CorpusIndex.exists(path) \
+                and CorpusIndex(path).fresh(urls, max_age):
+            return {url: "unchanged" for url in urls}
+        return await _abuild_index(urls, path, embedding, force, concurrency, per_host_rps)
+    finally:
+        lock.__exit__(None, None, None)
+
+
+async def _abuild_index(urls: List[str], path: str, embedding, force: bool, concurrency: int,
+                        per_host_rps: float) -> Dict[str, str]:
+    embedding = embedding or default_embeddings()
+    old = CorpusIndex(path) if CorpusIndex.exists(path) and not force else None
+    if old is not None and (
+            old.manifest.get("embedding_model") != EMBEDDING_MODEL
+            or old.manifest.get("chunk_size") != CHUNK_SIZE
+            or old.manifest.get("chunk_overlap") != CHUNK_OVERLAP
+    ):
+        old = None
+    old_sources = old.manifest["sources"] if old is not None else {}
+
+    async def embed(url: str, splits: List[Document]):
+        texts = [d.page_content for d in splits]
+        vectors = np.asarray(await embedding.aembed_documents(texts), dtype=np.float32) if texts else None
+        source_chunks = [
+            {"id": _chunk_id(url, i, d.page_content), "text": d.page_content, "metadata": d.metadata}
+            for i, d in enumerate(splits)
+        ]
+        return source_chunks, vectors
+
+    # url -> (status, manifest entry without the row range, chunks + vectors or an embedding task)
+    results: Dict[str, Tuple[str, Dict[str, Any], Any]] = {}
+    executor = split_executor(len(urls))
+    try:
+        async for result in load_sources(
+                urls, old_sources, concurrency=concurrency, per_host_rps=per_host_rps, executor=executor
+        ):
+            url = result.url
+            cached = old_sources.get(url)
+            digest = result.sha256 or cached["sha256"]
+            entry = {"etag": result.etag, "last_modified": result.last_modified, "sha256": digest}
+            if cached is not None and (result.status == 304 or digest == cached["sha256"]):
+                results[url] = ("unchanged", entry, old.source_rows(url))
+            else:
+                # Embedding starts now, while the remaining sources are still downloading.
+                task = asyncio.ensure_future(embed(url, result.splits))
+                results[url] = ("added" if cached is None else "updated", entry, task)
+        for url, (status, entry, rows) in list(results.items()):
+            if isinstance(rows, asyncio.Future):
+                results[url] = (status, entry, await rows)
+    finally:
+        for _, _, rows in results.values():
+            if isinstance(rows, asyncio.Future):
+                rows.cancel()
+        if executor is not None:
+            executor.shutdown()
+
+    chunks: List[Dict[str, Any]] = []
+    blocks: List[np.ndarray] = []
+    sources: Dict[str, Dict[str, Any]] = {}
+    status: Dict[str, str] = {}
+    # Lay sources out in configuration order, whatever order they finished in.
+    for url in urls:
+        source_status, entry, (source_chunks, vectors) = results[url]
+        sources[url] = {**entry, "start": len(chunks), "count": len(source_chunks)}
+        status[url] = source_status
+        chunks.extend(source_chunks)
+        if source_chunks:
+            blocks.append(vectors)
+    for url in old_sources:
+        if url not in sources:
+            status[url] = "removed"
+
+    dim = blocks[0].shape[1] if blocks else (old.manifest["dim"] if old is not None else 0)
+    embeddings = np.concatenate(blocks) if blocks else np.zeros((0, dim), dtype=np.float32)
+    # Rows kept from an index built before normalization are normalized here too.
+    embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    now = time.time()
+    manifest = {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "dim": int(dim),
+        "count": len(chunks),
+        "normalized": True,
+        "built_at": now if any(s != "unchanged" for s in status.values()) or old is None
+        else old.manifest.get("built_at", now),
+        "checked_at": now,
+        "sources": sources,
+    }
+    _write_index(path, manifest, chunks, embeddings)
+    return status
+
+
+def build_index(*args, **kwargs) -> Dict[str, str]:
+    """Run :func:`abuild_index` to completion, also from inside a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(abuild_index(*args, **kwargs))
+    # e.g. the graph module imported by an async server: build on a separate loop.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, abuild_index(*args, **kwargs)).result()
+
+
+def load_index(
+        urls: Sequence[str] = DEFAULT_URLS,
+        path: str = DEFAULT_INDEX_DIR,
+        embedding=None,
+        max_age: float = MAX_AGE_SECONDS,
+) -> CorpusIndex:
+    """Open the prebuilt index, building or refreshing it only when needed.
+
+    A missing or incompatible index is built; one older than ``max_age``
+    seconds is refreshed with conditional requests. A failed refresh keeps
+    serving the existing index. When several workers start at once, one builds
+    and the others reuse its result once the lock is released.
+    """
+    if CorpusIndex.exists(path):
+        index = CorpusIndex(path)
+        if not index.compatible(urls):
+            logger.info("RAG index at %s does not match the configured sources or settings, rebuilding", path)
+        elif index.age_seconds <= max_age:
+            return index
+        else:
+            try:
+                logger.info("RAG index refresh: %s", build_index(urls, path, embedding, max_age=max_age))
+            except Exception as e:
+                logger.warning("RAG index refresh failed, using the existing index: %s", e)
+                return index
+            return CorpusIndex(path)
+    logger.info("RAG index build: %s", build_index(urls, path, embedding, max_age=max_age))
+    return CorpusIndex(path)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Build the RAG agent's prebuilt corpus index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="fetch, split and embed the sources; reuse unchanged ones")
+    build.add_argument("urls", nargs="*", default=DEFAULT_URLS)
+    build.add_argument("--force", action="store_true", help="re-embed every source")
+    build.add_argument("--concurrency", type=int, default=8)
+    build.add_argument("--per-host-rps", type=float, default=4.0)
+    build.add_argument("--path", default=DEFAULT_INDEX_DIR)
+    status = sub.add_parser("status", help="print the manifest summary")
+    status.add_argument("--path", default=DEFAULT_INDEX_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        result = build_index(
+            args.urls, args.path, force=args.force, concurrency=args.concurrency, per_host_rps=args.per_host_rps
+        )
+        print(json.dumps(result, indent=2, ensure_ascii=False))  # noqa: T201
+        print(f"built in {time.perf_counter() - started:.1f}s")  # noqa: T201
+    else:
+        index = CorpusIndex(args.path)
+        summary = {k: v for k, v in index.manifest.items() if k != "sources"}
+        summary["sources"] = {url: entry["count"] for url, entry in index.manifest["sources"].items()}
+        print(json.dumps(summary, indent=2, ensure_ascii=False))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
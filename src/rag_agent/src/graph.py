@@ -1,9 +1,19 @@
+import asyncio
+import logging
 import os
+import re
+import sys
+from typing import Annotated, Any, Dict, Optional, Tuple
 
+import numpy as np
 from langchain_community.chat_models import ChatTongyi
-from langchain_core.messages import HumanMessage
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_community.document_loaders import WebBaseLoader
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.tools import tool
+from langgraph.constants import TAG_NOSTREAM
+from langgraph.graph import MessagesState
+from rag.corpus_index import DEFAULT_URLS, default_embeddings, load_index
+from rag.matrix_store import MatrixVectorStore
+from rag.rerank import get_scorer, rerank
 
 
 """
@@ -16,59 +26,138 @@ https://python.langchain.com/docs/integrations/chat/tongyi/
 
 cd src/rag_agent
 pip install -e .
+python -m rag.corpus_index build   # optional: prebuild the corpus index offline
 langgraph dev 
 """
 
-urls = [
-    "https://lilianweng.github.io/posts/2024-11-28-reward-hacking/",
-    "https://lilianweng.github.io/posts/2024-07-07-hallucination/",
-    # "https://lilianweng.github.io/posts/2024-04-12-diffusion-video/",
-]
-
-docs = [WebBaseLoader(url).load() for url in urls]
+logger = logging.getLogger(__name__)
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+urls = DEFAULT_URLS
 
-docs_list = [item for sublist in docs for item in sublist]
-
-text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-    chunk_size=100, chunk_overlap=50
+# Chunks and embeddings come from the prebuilt index (memory-mapped); it is only
+# built here if missing and refreshed for changed sources once it is stale.
+embeddings = default_embeddings()
+corpus_index = load_index(urls, embedding=embeddings)
+# One normalized matrix: a query is a single matrix-vector product.
+vectorstore = MatrixVectorStore.from_corpus_index(
+    corpus_index, embeddings, dtype=os.getenv("RAG_VECTOR_DTYPE", "float32")
 )
-doc_splits = text_splitter.split_documents(docs_list)
 
-from langchain_community.embeddings import DashScopeEmbeddings
+# Over-fetch, re-rank locally within a latency budget, keep the best few.
+RERANK_FETCH_K = int(os.getenv("RAG_RERANK_FETCH_K", "20"))
+RERANK_TOP_K = int(os.getenv("RAG_RERANK_TOP_K", "4"))
+RERANK_BUDGET_MS = float(os.getenv("RAG_RERANK_BUDGET_MS", "50"))
+# A calibrated re-rank score (cross-encoder only) at or above this counts as
+# relevant without asking the LLM grader.
+RERANK_SKIP_GRADER_SCORE = float(os.getenv("RAG_RERANK_SKIP_GRADER_SCORE", "0.8"))
 
-vectorstore = InMemoryVectorStore.from_documents(
-    documents=doc_splits, embedding=DashScopeEmbeddings(model="text-embedding-v3")
-)
-retriever = vectorstore.as_retriever()
+retriever = vectorstore.as_retriever(search_kwargs={"k": RERANK_FETCH_K})
 
-from langchain.tools.retriever import create_retriever_tool
 
-retriever_tool = create_retriever_tool(
-    retriever,
-    "retrieve_blog_posts",
-    "Search and return information about Lilian Weng blog posts.",
-)
+def _retrieve(query: str, vector=None):
+    """Over-fetch, re-rank and return the tool's ``(content, artifact)``."""
+    if vector is None:
+        candidates = retriever.invoke(query)
+    else:
+        candidates = vectorstore.similarity_search_by_vector(vector, k=RERANK_FETCH_K)
+    scorer = get_scorer()
+    ranked = rerank(query, candidates, top_k=RERANK_TOP_K, budget_ms=RERANK_BUDGET_MS, scorer=scorer)
+    content = "\n\n".join(doc.page_content for doc in ranked.documents)
+    artifact = {
+        "query": query,
+        "top_score": ranked.top_score,
+        "calibrated": scorer.calibrated,
+        "scores": ranked.scores,
+        "scored": ranked.scored,
+        "candidates": ranked.candidates,
+        "rerank_ms": ranked.elapsed_ms,
+    }
+    return content, artifact
+
+
+@tool(response_format="content_and_artifact")
+def retrieve_blog_posts(query: str):
+    """Search and return information about Lilian Weng blog posts."""
+    return _retrieve(query)
+
+
+retriever_tool = retrieve_blog_posts
+
+# Rewrites allowed per question before answering with the best context found so far.
+MAX_REWRITES = int(os.getenv("RAG_MAX_REWRITES", "2"))
+# A rewritten query at least this cosine-similar to an earlier one reuses its retrieval and grade.
+DUPLICATE_QUERY_SIMILARITY = float(os.getenv("RAG_DUPLICATE_QUERY_SIMILARITY", "0.95"))
+# Memoized retrievals kept per thread, oldest dropped first.
+RETRIEVAL_MEMO_SIZE = int(os.getenv("RAG_RETRIEVAL_MEMO_SIZE", "32"))
+# Draft the answer while the LLM grader runs; costs one discarded completion on a "no".
+SPECULATIVE_DRAFT = os.getenv("RAG_SPECULATIVE_DRAFT", "1").lower() not in ("0", "false", "no")
+
+
+def merge_memo(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reducer for ``retrieval_memo``: newer entries win and move to the end."""
+    merged = dict(left or {})
+    for key, entry in (right or {}).items():
+        merged.pop(key, None)
+        merged[key] = entry
+    while len(merged) > RETRIEVAL_MEMO_SIZE:
+        merged.pop(next(iter(merged)))
+    return merged
+
+
+class RagState(MessagesState):
+    """Messages plus the rewrite budget, retrieval memo and grade of the current question."""
+
+    rewrite_count: int
+    """Rewrites of the current question so far; reset once it is answered."""
+    retrieval_memo: Annotated[Dict[str, Dict[str, Any]], merge_memo]
+    """Normalized query -> query vector, tool content and artifact, and grade per question."""
+    grade: str
+    """Relevance of the latest retrieval: ``"yes"`` or ``"no"``."""
+    grade_reused: bool
+    """Whether ``grade`` came from the memo, i.e. this retrieval was already graded."""
+    draft: Optional[Dict[str, Any]]
+    """Speculative answer drafted while grading: ``{"question", "context", "message"}``."""
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+async def _find_memo(query: str, memo: Dict[str, Dict[str, Any]]) -> Tuple[Optional[str], Optional[list]]:
+    """Return the memo key matching ``query`` (exactly or semantically) and the query's vector.
+
+    The vector is only computed when there is no exact match, and is reused for
+    the search on a miss, so near-duplicate detection costs no extra embedding.
+    """
+    key = _normalize_query(query)
+    if key in memo:
+        return key, None
+    vector = np.asarray(await embeddings.aembed_query(query), dtype=np.float32)
+    vector /= max(float(np.linalg.norm(vector)), 1e-12)
+    keys = [k for k, entry in memo.items() if entry.get("vector")]
+    if keys:
+        similarities = np.asarray([memo[k]["vector"] for k in keys], dtype=np.float32) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= DUPLICATE_QUERY_SIMILARITY:
+            logger.debug("retrieve: %r duplicates %r (%.3f)", query, memo[keys[best]]["query"], similarities[best])
+            return keys[best], vector.tolist()
+    return None, vector.tolist()
 
-from langgraph.graph import MessagesState
 
 # response_model = ChatTongyi(model="qwen-plus", streaming=False, extra_body={"enable_thinking": False},)
 
 # response_model = ChatTongyi(model="qwq-plus")
 
-from langchain_deepseek import ChatDeepSeek
+# The shared LLM layer lives in src/llm, next to this package.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from llm.router import get_chat_model  # noqa: E402
 
-response_model = ChatDeepSeek(
-    model="deepseek-chat",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    # other params...
-)
+# Routed through llm.router (limits, circuit breaker, fallback to Qwen). With
+# temperature=0 repeated prompts (rewrites, answers over the same context) are
+# served from the shared response cache instead of the API.
+response_model = get_chat_model("deepseek-chat", temperature=0)
 
-def generate_query_or_respond(state: MessagesState):
+def generate_query_or_respond(state: RagState):
     """Call the model to generate a response based on the current state. Given
     the question, it will decide to retrieve using the retriever tool, or simply respond to the user.
     """
@@ -76,9 +165,35 @@ def generate_query_or_respond(state: MessagesState):
         response_model
         .bind_tools([retriever_tool]).invoke(state["messages"])
     )
+    if not response.tool_calls:
+        # Answered directly: the next question starts with a fresh rewrite budget.
+        return {"messages": [response], "rewrite_count": 0}
     return {"messages": [response]}
 
 
+async def retrieve(state: RagState):
+    """Run the retriever tool calls, reusing memoized results for repeated queries."""
+    memo = state.get("retrieval_memo") or {}
+    messages, updates = [], {}
+    for tool_call in state["messages"][-1].tool_calls:
+        query = tool_call["args"].get("query", "")
+        key, vector = await _find_memo(query, {**memo, **updates})
+        if key is not None:
+            entry = updates.get(key) or memo[key]
+            content, artifact = entry["content"], {**entry["artifact"], "memo_hit": True}
+        else:
+            key = _normalize_query(query)
+            # Search and re-rank are CPU-bound; keep them off the event loop.
+            content, artifact = await asyncio.to_thread(_retrieve, query, vector)
+            updates[key] = {"query": query, "vector": vector, "content": content, "artifact": artifact, "grades": {}}
+            artifact = {**artifact, "memo_hit": False}
+        artifact["memo_key"] = key
+        messages.append(ToolMessage(
+            content=content, artifact=artifact, name=tool_call["name"], tool_call_id=tool_call["id"]
+        ))
+    return {"messages": messages, "retrieval_memo": updates}
+
+
 
 
 from pydantic import BaseModel, Field
@@ -101,41 +216,67 @@ class GradeDocuments(BaseModel):
     )
 
 
-grader_model = ChatDeepSeek(
-    model="deepseek-chat",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    # other params...
-)
+grader_model = get_chat_model("deepseek-chat", temperature=0)
 
 
-def grade_documents(
-    state: MessagesState,
-) -> Literal["generate_answer", "rewrite_question"]:
-    """Determine whether the retrieved documents are relevant to the question."""
+async def grade_documents(state: RagState):
+    """Determine whether the retrieved documents are relevant to the question.
 
-    print(state)
-    print("*"*8)
+    While the LLM grader runs, an answer is drafted from the same context so a
+    relevant grade can be answered without a second round-trip.
+    """
     for message in state["messages"]:
         if isinstance(message, HumanMessage):
             question = message.content
     context = state["messages"][-1].content
-
-    prompt = GRADE_PROMPT.format(question=question, context=context)
-    response = (
-        grader_model
-        .with_structured_output(GradeDocuments).invoke(
-            [{"role": "user", "content": prompt}]
+    artifact = getattr(state["messages"][-1], "artifact", None) or {}
+
+    # Grades are memoized per original question: rewrites are appended as user
+    # messages, so it is the one ``rewrite_count`` messages before the latest.
+    humans = [m.content for m in state["messages"] if isinstance(m, HumanMessage)]
+    original = humans[max(len(humans) - 1 - state.get("rewrite_count", 0), 0)]
+    entry = (state.get("retrieval_memo") or {}).get(artifact.get("memo_key"))
+    if entry is not None and original in entry["grades"]:
+        # This retrieval was already graded for this question on an earlier lap.
+        return {"grade": entry["grades"][original], "grade_reused": True}
+
+    update = {}
+    if artifact.get("calibrated") and artifact.get("top_score", 0.0) >= RERANK_SKIP_GRADER_SCORE:
+        # The cross-encoder is confident enough: skip the grader's LLM round-trip.
+        score = "yes"
+    else:
+        prompt = GRADE_PROMPT.format(question=question, context=context)
+        grading = (
+            grader_model
+            .with_structured_output(GradeDocuments).ainvoke(
+                [{"role": "user", "content": prompt}]
+            )
         )
-    )
-    score = response.binary_score
-
-    if score == "yes":
+        if SPECULATIVE_DRAFT:
+            response, draft = await asyncio.gather(grading, draft_answer(question, context))
+            update["draft"] = {"question": question, "context": context, "message": draft}
+        else:
+            response = await grading
+        score = response.binary_score
+
+    update.update(grade=score, grade_reused=False)
+    if entry is not None:
+        update["retrieval_memo"] = {artifact["memo_key"]: {**entry, "grades": {**entry["grades"], original: score}}}
+    return update
+
+
+def route_after_grading(state: RagState) -> Literal["generate_answer", "rewrite_question"]:
+    """Answer on relevant context, otherwise rewrite while the budget lasts."""
+    if state.get("grade") == "yes":
         return "generate_answer"
-    else:
-        return "rewrite_question"
+    if state.get("rewrite_count", 0) >= MAX_REWRITES:
+        logger.info("rewrite budget of %d spent, answering with the context found so far", MAX_REWRITES)
+        return "generate_answer"
+    if state.get("grade_reused"):
+        # The rewrite landed on a query that already failed: another lap would repeat it.
+        logger.info("rewritten question duplicates an earlier failed retrieval, answering")
+        return "generate_answer"
+    return "rewrite_question"
 
 
 
@@ -149,14 +290,19 @@ REWRITE_PROMPT = (
 )
 
 
-def rewrite_question(state: MessagesState):
+async def rewrite_question(state: RagState):
     """Rewrite the original user question."""
     for message in state["messages"]:
         if isinstance(message, HumanMessage):
             question = message.content
     prompt = REWRITE_PROMPT.format(question=question)
-    response = response_model.invoke([{"role": "user", "content": prompt}])
-    return {"messages": [{"role": "user", "content": response.content}]}
+    # Under the messages stream mode ainvoke streams token by token; unlike
+    # astream it also checks the response cache first.
+    response = await response_model.ainvoke([{"role": "user", "content": prompt}])
+    return {
+        "messages": [{"role": "user", "content": response.content}],
+        "rewrite_count": state.get("rewrite_count", 0) + 1,
+    }
 
 
 
@@ -170,29 +316,43 @@ GENERATE_PROMPT = (
 )
 
 
-def generate_answer(state: MessagesState):
+async def draft_answer(question: str, context: str):
+    """Answer ``question`` from ``context`` without streaming to the client.
 
-    print(f"generate_answer messages: {state}")
+    Runs while the grader decides whether the context is relevant; it is only
+    shown, by ``generate_answer``, if that context ends up being answered from.
+    """
+    prompt = GENERATE_PROMPT.format(question=question, context=context)
+    return await response_model.ainvoke(
+        [{"role": "user", "content": prompt}], config={"tags": [TAG_NOSTREAM]}
+    )
+
+
+async def generate_answer(state: RagState):
     """Generate an answer."""
     for message in state["messages"]:
         if isinstance(message, HumanMessage):
             question = message.content
     context = state["messages"][-1].content
+    draft = state.get("draft") or {}
+    if draft.get("question") == question and draft.get("context") == context:
+        # Drafted concurrently with grading, for this very question and context.
+        return {"messages": [draft["message"]], "rewrite_count": 0, "draft": None}
     prompt = GENERATE_PROMPT.format(question=question, context=context)
-    response = response_model.invoke([{"role": "user", "content": prompt}])
-    return {"messages": [response]}
+    response = await response_model.ainvoke([{"role": "user", "content": prompt}])
+    return {"messages": [response], "rewrite_count": 0, "draft": None}
 
 
 
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
 from langgraph.prebuilt import tools_condition
 
-workflow = StateGraph(MessagesState)
+workflow = StateGraph(RagState)
 
 # Define the nodes we will cycle between
 workflow.add_node(generate_query_or_respond)
-workflow.add_node("retrieve", ToolNode([retriever_tool]))
+workflow.add_node(retrieve)
+workflow.add_node(grade_documents)
 workflow.add_node(rewrite_question)
 workflow.add_node(generate_answer)
 
@@ -211,10 +371,11 @@ workflow.add_conditional_edges(
 )
 
 # Edges taken after the `action` node is called.
+workflow.add_edge("retrieve", "grade_documents")
 workflow.add_conditional_edges(
-    "retrieve",
+    "grade_documents",
     # Assess agent decision
-    grade_documents,
+    route_after_grading,
 )
 workflow.add_edge("generate_answer", END)
 workflow.add_edge("rewrite_question", "generate_query_or_respond")
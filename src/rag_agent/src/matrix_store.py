@@ -0,0 +1,275 @@
+"""A ``VectorStore`` backed by one contiguous, L2-normalized NumPy matrix.
+
+LangChain's ``InMemoryVectorStore`` keeps a dict per document and computes
+cosine similarity document by document in Python. Here every vector is a row of
+a single matrix, normalized once when it is added, so a query is one
+matrix-vector product followed by ``argpartition`` for the top-k; a batch of
+queries is one matrix-matrix product.
+
+``dtype="float16"`` halves the memory of the matrix. Scores are then computed
+block by block in float32, which keeps the BLAS path and the precision of the
+ranking.
+
+``from_corpus_index`` with float32 searches the index's read-only memory map
+in place, so worker processes share its pages; the first ``add`` copies it
+into a private matrix (``delete`` only touches the in-process ``alive`` mask).
+"""
+
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# Rows converted to float32 at a time when the matrix is stored as float16.
+_BLOCK_ROWS = 16384
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+class MatrixVectorStore(VectorStore):
+    """Exact cosine search over a normalized float32/float16 matrix."""
+
+    def __init__(self, embedding: Embeddings, dtype: str = "float32"):
+        """Create an empty store keeping vectors as ``dtype`` (``float32`` or ``float16``)."""
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported dtype {dtype!r}, expected 'float32' or 'float16'")
+        self.embedding = embedding
+        self.dtype = np.dtype(dtype)
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._rows: Dict[str, int] = {}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """The embeddings queries and added texts go through."""
+        return self.embedding
+
+    def __len__(self) -> int:
+        """Return the number of live documents."""
+        return len(self._rows)
+
+    def add_vectors(
+            self,
+            vectors,
+            texts: Sequence[str],
+            metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+            ids: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        """Add precomputed embeddings; existing ids are replaced."""
+        matrix = _normalize(vectors).astype(self.dtype)
+        ids = [str(i) for i in ids] if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        if not (len(ids) == len(texts) == len(metadatas) == matrix.shape[0]):
+            raise ValueError("vectors, texts, metadatas and ids must have the same length")
+        self.delete([i for i in ids if i in self._rows])
+        self._reserve(matrix.shape[0], matrix.shape[1])
+        start = self._size
+        self._matrix[start:start + matrix.shape[0]] = matrix
+        self._size += matrix.shape[0]
+        self._alive[start:self._size] = True
+        for offset, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+            self._rows[doc_id] = start + offset
+        self._ids.extend(ids)
+        self._texts.extend(texts)
+        self._metadatas.extend(dict(m) for m in metadatas)
+        return ids
+
+    def _reserve(self, extra: int, dim: int) -> None:
+        """Grow the matrix geometrically so repeated adds stay amortized O(1)."""
+        if self._matrix is not None and self._matrix.shape[1] != dim:
+            raise ValueError(f"Expected vectors of dim {self._matrix.shape[1]}, got {dim}")
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if self._size + extra <= capacity:
+            return
+        capacity = max(self._size + extra, capacity * 2, 1024)
+        grown = np.zeros((capacity, dim), dtype=self.dtype)
+        alive = np.zeros(capacity, dtype=bool)
+        if self._matrix is not None:
+            grown[:self._size] = self._matrix[:self._size]
+            alive[:self._size] = self._alive[:self._size]
+        self._matrix = grown
+        self._alive = alive
+
+    def add_texts(
+            self,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]] = None,
+            *,
+            ids: Optional[List[str]] = None,
+            **kwargs: Any,
+    ) -> List[str]:
+        """Embed ``texts`` in one batch and add them."""
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_vectors(self.embedding.embed_documents(texts), texts, metadatas, ids)
+
+    async def aadd_texts(
+            self,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]] = None,
+            *,
+            ids: Optional[List[str]] = None,
+            **kwargs: Any,
+    ) -> List[str]:
+        """Async :meth:`add_texts`."""
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_vectors(await self.embedding.aembed_documents(texts), texts, metadatas, ids)
+
+    def add_documents(self, documents: List[Document], **kwargs: Any) -> List[str]:
+        """Add ``documents``, keeping their ids when they have one."""
+        ids = kwargs.pop("ids", None) or [doc.id or str(uuid.uuid4()) for doc in documents]
+        return self.add_texts(
+            [doc.page_content for doc in documents], [doc.metadata for doc in documents], ids=ids, **kwargs
+        )
+
+    def delete(self, ids: Optional[Sequence[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete documents by id; unknown ids are ignored."""
+        for doc_id in ids or []:
+            row = self._rows.pop(str(doc_id), None)
+            if row is not None:
+                self._alive[row] = False
+        return True
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        """Return the documents with the given ids, skipping unknown ones."""
+        return [self._document(self._rows[i]) for i in ids if i in self._rows]
+
+    def _document(self, row: int) -> Document:
+        return Document(id=self._ids[row], page_content=self._texts[row], metadata=self._metadatas[row])
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every (normalized) query with every live row."""
+        if self._size == 0:
+            return np.zeros((queries.shape[0], 0), dtype=np.float32)
+        matrix = self._matrix[:self._size]
+        if self.dtype == np.float32:
+            scores = queries @ matrix.T
+        else:
+            scores = np.empty((queries.shape[0], self._size), dtype=np.float32)
+            for start in range(0, self._size, _BLOCK_ROWS):
+                block = matrix[start:start + _BLOCK_ROWS].astype(np.float32)
+                scores[:, start:start + block.shape[0]] = queries @ block.T
+        scores[:, ~self._alive[:self._size]] = -np.inf
+        return scores
+
+    def _top_k(self, scores: np.ndarray, k: int,
+               filter: Optional[Callable[[Document], bool]] = None) -> List[Tuple[Document, float]]:
+        live = int(np.isfinite(scores).sum())
+        if live == 0 or k <= 0:
+            return []
+        if filter is None:
+            top = np.argpartition(-scores, min(k, live) - 1)[:min(k, live)]
+            order = top[np.argsort(-scores[top])]
+        else:
+            # Filters are arbitrary Python callables: walk rows best-first until k pass.
+            order = np.argsort(-scores)[:live]
+        results = []
+        for row in order:
+            doc = self._document(int(row))
+            if filter is not None and not filter(doc):
+                continue
+            results.append((doc, float(scores[row])))
+            if len(results) == k:
+                break
+        return results
+
+    def similarity_search_with_score_by_vector(
+            self,
+            embedding: List[float],
+            k: int = 4,
+            filter: Optional[Callable[[Document], bool]] = None,
+            **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Return the ``k`` best documents for an embedding, with cosine scores."""
+        return self._top_k(self._scores(_normalize(embedding))[0], k, filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        """Return the ``k`` best documents for an embedding."""
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Return the ``k`` best documents for ``query``, with cosine scores."""
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    async def asimilarity_search_with_score(
+            self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """Async :meth:`similarity_search_with_score`."""
+        return self.similarity_search_with_score_by_vector(await self.embedding.aembed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        """Return the ``k`` best documents for ``query``."""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        """Async :meth:`similarity_search`."""
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k, **kwargs)]
+
+    def batch_similarity_search_with_score(
+            self,
+            queries: Sequence[str],
+            k: int = 4,
+            filter: Optional[Callable[[Document], bool]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Embed ``queries`` together and score them with one matrix product."""
+        if not queries:
+            return []
+        scores = self._scores(_normalize(self.embedding.embed_documents(list(queries))))
+        return [self._top_k(row, k, filter) for row in scores]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+            cls,
+            texts: List[str],
+            embedding: Embeddings,
+            metadatas: Optional[List[dict]] = None,
+            *,
+            ids: Optional[List[str]] = None,
+            dtype: str = "float32",
+            **kwargs: Any,
+    ) -> "MatrixVectorStore":
+        """Create a store holding ``texts``."""
+        store = cls(embedding, dtype=dtype)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    @classmethod
+    def from_corpus_index(cls, index, embedding: Embeddings, dtype: str = "float32") -> "MatrixVectorStore":
+        """Load the chunks and embeddings of an ``rag.corpus_index.CorpusIndex``."""
+        store = cls(embedding, dtype=dtype)
+        if index.chunks and store.dtype == np.float32 and index.manifest.get("normalized"):
+            # Rows are already normalized: search the memory map itself. It is
+            # exactly full, so the first add grows it into a private copy.
+            store._matrix = index.embeddings
+            store._size = len(index.chunks)
+            store._alive = np.ones(store._size, dtype=bool)
+            store._ids = [c["id"] for c in index.chunks]
+            store._texts = [c["text"] for c in index.chunks]
+            store._metadatas = [dict(c["metadata"]) for c in index.chunks]
+            store._rows = {doc_id: row for row, doc_id in enumerate(store._ids)}
+        elif index.chunks:
+            store.add_vectors(
+                index.embeddings,
+                [c["text"] for c in index.chunks],
+                [c["metadata"] for c in index.chunks],
+                [c["id"] for c in index.chunks],
+            )
+        return store
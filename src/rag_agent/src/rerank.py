@@ -0,0 +1,160 @@
+"""Local re-ranking between retrieval and the LLM relevance grader.
+
+The retriever over-fetches candidates, a cheap local scorer re-orders them and
+only the best few are passed on. Scores are normalized to ``[0, 1]``. Only a
+scorer marked ``calibrated`` gives scores that say how relevant a chunk is, so
+only its top score may let ``grade_documents`` skip asking the LLM.
+
+Two scorers are available:
+
+- ``LexicalOverlapScorer`` (default): IDF-weighted overlap of query terms with
+  each chunk, IDF computed over the candidate set. No dependencies. Not
+  calibrated: any chunk containing every query term scores 1.0.
+- ``CrossEncoderScorer``: a small ``sentence-transformers`` cross-encoder on
+  CPU, used when ``RAG_RERANKER=cross-encoder`` and the package is installed.
+
+Scoring stops once ``budget_ms`` is spent; candidates that were not scored
+keep their retrieval order behind the scored ones.
+"""
+
+import math
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it of on or the to what when where which who "
+    "why with".split()
+)
+
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in _WORD_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class LexicalOverlapScorer:
+    """Share of the query's IDF mass that a chunk covers."""
+
+    # Documents are scored in slices so the latency budget is checked often.
+    batch_size = 16
+    calibrated = False
+
+    def prepare(self, query: str, texts: Sequence[str]) -> Callable[[Sequence[str]], List[float]]:
+        """Return a function scoring a slice of ``texts`` against ``query``."""
+        query_terms = Counter(_terms(query))
+        doc_freq: Counter = Counter()
+        for text in texts:
+            doc_freq.update(set(_terms(text)))
+        n = max(len(texts), 1)
+        idf = {t: math.log(1 + (n + 1) / (doc_freq[t] + 0.5)) for t in query_terms}
+        total = sum(idf[t] * c for t, c in query_terms.items()) or 1.0
+
+        def score(batch: Sequence[str]) -> List[float]:
+            scores = []
+            for text in batch:
+                present = set(_terms(text))
+                scores.append(sum(idf[t] * c for t, c in query_terms.items() if t in present) / total)
+            return scores
+
+        return score
+
+
+class CrossEncoderScorer:
+    """Sigmoid of a ``sentence-transformers`` cross-encoder's relevance logit."""
+
+    batch_size = 8
+    calibrated = True
+
+    def __init__(self, model_name: str = DEFAULT_CROSS_ENCODER):
+        """Load ``model_name`` on the CPU."""
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "CrossEncoderScorer requires sentence-transformers: pip install sentence-transformers"
+            ) from e
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def prepare(self, query: str, texts: Sequence[str]) -> Callable[[Sequence[str]], List[float]]:
+        """Return a function scoring batches of ``texts`` against ``query``."""
+        def score(batch: Sequence[str]) -> List[float]:
+            logits = self.model.predict([(query, text) for text in batch])
+            return [1.0 / (1.0 + math.exp(-float(x))) for x in logits]
+
+        return score
+
+
+@dataclass
+class RerankResult:
+    """Reranked documents with their scores and the cost of scoring them."""
+    documents: List[Document]
+    scores: List[Optional[float]]
+    """Scores aligned with ``documents``; ``None`` for chunks the budget did not reach."""
+    scored: int
+    elapsed_ms: float
+    candidates: int = 0
+
+    @property
+    def top_score(self) -> float:
+        """Best score among the scored documents, ``0.0`` if none was scored."""
+        return max((s for s in self.scores if s is not None), default=0.0)
+
+
+def rerank(
+        query: str,
+        documents: Sequence[Document],
+        top_k: int = 4,
+        budget_ms: float = 50.0,
+        scorer=None,
+) -> RerankResult:
+    """Re-order ``documents`` for ``query`` and keep the best ``top_k``."""
+    started = time.perf_counter()
+    documents = list(documents)
+    scorer = scorer or LexicalOverlapScorer()
+    texts = [d.page_content for d in documents]
+    score = scorer.prepare(query, texts)
+    scores: List[Optional[float]] = [None] * len(documents)
+    scored = 0
+    while scored < len(documents):
+        # The first slice is always scored so there is a top score to report.
+        if scored and (time.perf_counter() - started) * 1000 > budget_ms:
+            break
+        batch = texts[scored:scored + scorer.batch_size]
+        scores[scored:scored + len(batch)] = score(batch)
+        scored += len(batch)
+    # Scored chunks first by score, the rest in retrieval order.
+    order = sorted(
+        range(len(documents)),
+        key=lambda i: (scores[i] is None, -(scores[i] or 0.0), i),
+    )[:top_k]
+    return RerankResult(
+        documents=[documents[i] for i in order],
+        scores=[scores[i] for i in order],
+        scored=scored,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        candidates=len(documents),
+    )
+
+
+_scorers: dict = {}
+
+
+def get_scorer(kind: Optional[str] = None):
+    """Return the shared scorer named by ``kind`` or the ``RAG_RERANKER`` env var."""
+    kind = (kind or os.getenv("RAG_RERANKER", "lexical")).lower()
+    if kind not in _scorers:
+        if kind == "cross-encoder":
+            _scorers[kind] = CrossEncoderScorer(os.getenv("RAG_CROSS_ENCODER_MODEL", DEFAULT_CROSS_ENCODER))
+        elif kind == "lexical":
+            _scorers[kind] = LexicalOverlapScorer()
+        else:
+            raise ValueError(f"Unknown reranker {kind!r}, expected 'lexical' or 'cross-encoder'")
+    return _scorers[kind]
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field, fields
-from typing import Optional, Annotated
+from typing import Dict, Optional, Annotated
 
 from langchain_core.runnables import RunnableConfig, ensure_config
 
@@ -36,6 +36,52 @@ class Configuration:
         },
     )
 
+    max_context_tokens: int = field(
+        default=8000,
+        metadata={
+            "description": "Token budget for the conversation sent to the model. "
+                           "Beyond it, the oldest turns are folded into a running summary."
+        },
+    )
+
+    stale_tool_result_tokens: int = field(
+        default=200,
+        metadata={
+            "description": "Tool results from earlier turns longer than this many tokens "
+                           "are collapsed into a short reference."
+        },
+    )
+
+    max_parallel_tools: int = field(
+        default=4,
+        metadata={
+            "description": "Maximum number of tool calls from one model turn that run at the same time."
+        },
+    )
+
+    tool_timeout: float = field(
+        default=20.0,
+        metadata={
+            "description": "Seconds a tool call may take before it is reported as timed out "
+                           "(async tools are also cancelled)."
+        },
+    )
+
+    tool_timeouts: Dict[str, float] = field(
+        default_factory=dict,
+        metadata={
+            "description": "Per-tool overrides of tool_timeout, by tool name, e.g. {\"milvus_search\": 10}."
+        },
+    )
+
+    tenant: Optional[str] = field(
+        default=None,
+        metadata={
+            "description": "Tenant whose documents milvus_search may see. "
+                           "Applied to every search in addition to any filter the model passes."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
             cls, config: Optional[RunnableConfig] = None
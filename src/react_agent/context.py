@@ -0,0 +1,159 @@
+"""Keep the react_agent's prompt within a token budget.
+
+``call_model`` sends ``[system, *state.messages]`` every turn, so the prompt
+used to grow with the conversation, tool results (``milvus_search`` JSON)
+included. ``manage_context`` runs before each model call and:
+
+1. counts tokens once per message, remembering the counts in
+   ``State.token_counts`` so each turn only counts what is new;
+2. collapses tool results from earlier model steps, including earlier steps
+   of the current turn, into a one-line reference (the model can call the
+   tool again), rewriting the message in place; the latest step's results
+   are kept, so one long ReAct turn does not pile up search payloads;
+3. once the conversation exceeds ``Configuration.max_context_tokens``, folds
+   the oldest whole turns into ``State.summary`` with one model call and
+   removes them, down to half the budget so this does not happen every turn.
+
+Turns are only cut before a user message, so an AI tool call is never
+separated from its tool results.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import TAG_NOSTREAM
+
+from llm.router import get_chat_model
+from react_agent import prompts
+from react_agent.configuration import Configuration
+from react_agent.state import State
+
+logger = logging.getLogger(__name__)
+
+# Per-message overhead of the chat format (role, separators).
+_MESSAGE_OVERHEAD = 4
+_CJK_RE = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional: fall back to an estimate.
+    _encoding = None
+
+
+def count_text_tokens(text: str) -> int:
+    """Tokens in ``text``: exact with tiktoken, otherwise ~4 chars per token and one per CJK character."""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def count_message_tokens(message: AnyMessage) -> int:
+    """Estimate the tokens of a message, counting its tool calls and per-message overhead."""
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    tokens = count_text_tokens(content) + _MESSAGE_OVERHEAD
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_text_tokens(tool_call["name"]) + count_text_tokens(str(tool_call["args"]))
+    return tokens
+
+
+def _turn_starts(messages: Sequence[AnyMessage]) -> List[int]:
+    return [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+
+
+def _collapsed(message: ToolMessage, tokens: int) -> ToolMessage:
+    reference = (
+        f"[{message.name or 'tool'} result from an earlier step collapsed ({tokens} tokens); "
+        f"call the tool again if it is still needed]"
+    )
+    return ToolMessage(
+        content=reference, id=message.id, name=message.name, tool_call_id=message.tool_call_id,
+        additional_kwargs={"collapsed": True},
+    )
+
+
+def _format_for_summary(messages: Sequence[AnyMessage]) -> str:
+    lines = []
+    for m in messages:
+        content = m.content if isinstance(m.content, str) else str(m.content)
+        calls = getattr(m, "tool_calls", None)
+        if calls:
+            content += " " + "; ".join(f"calls {c['name']}({c['args']})" for c in calls)
+        lines.append(f"{m.type}: {content}")
+    return "\n".join(lines)
+
+
+async def summarize(previous: str, messages: Sequence[AnyMessage], configuration: Configuration) -> str:
+    """Fold ``messages`` into the running summary with one model call."""
+    model = get_chat_model(configuration.model, temperature=0)
+    prompt = prompts.SUMMARY_PROMPT.format(summary=previous or "(none)", messages=_format_for_summary(messages))
+    # Internal bookkeeping: keep the summary out of the client's token stream.
+    response = await model.ainvoke([{"role": "user", "content": prompt}], config={"tags": [TAG_NOSTREAM]})
+    return response.content
+
+
+async def manage_context(state: State, config: RunnableConfig) -> Dict:
+    """Count new messages, collapse stale tool results and summarize past the budget."""
+    configuration = Configuration.from_runnable_config(config)
+    messages = list(state.messages)
+    counts = dict(state.token_counts)
+    new_counts: Dict[str, Optional[int]] = {}
+    for m in messages:
+        if m.id not in counts:
+            counts[m.id] = new_counts[m.id] = count_message_tokens(m)
+
+    updates: List[AnyMessage] = []
+    starts = _turn_starts(messages)
+    current_turn = starts[-1] if starts else 0
+    # The latest model step's tool results follow its AI message; everything before it is stale.
+    latest_step = max((i for i, m in enumerate(messages) if isinstance(m, AIMessage)), default=0)
+
+    # Tool results of earlier steps: keep a reference, drop the payload.
+    for i, m in enumerate(messages[:latest_step]):
+        if (isinstance(m, ToolMessage) and not m.additional_kwargs.get("collapsed")
+                and counts[m.id] > configuration.stale_tool_result_tokens):
+            collapsed = _collapsed(m, counts[m.id])
+            messages[i] = collapsed
+            updates.append(collapsed)
+            counts[m.id] = new_counts[m.id] = count_message_tokens(collapsed)
+
+    summary = state.summary
+    total = count_text_tokens(summary) + sum(counts[m.id] for m in messages)
+    result: Dict = {}
+    if total > configuration.max_context_tokens and len(starts) > 1:
+        # Cut at the earliest turn boundary that brings the rest under half the budget,
+        # but always keep the current turn.
+        target = configuration.max_context_tokens // 2
+        cut = current_turn
+        for start in starts[1:]:
+            if sum(counts[m.id] for m in messages[start:]) <= target:
+                cut = start
+                break
+        removed = messages[:cut]
+        try:
+            summary = await summarize(summary, removed, configuration)
+        except Exception as e:
+            # Better to lose old turns than to fail the step or overflow the window.
+            logger.warning("Conversation summary failed, dropping %d old messages: %s", len(removed), e)
+        updates = [u for u in updates if u.id not in {m.id for m in removed}]
+        updates.extend(RemoveMessage(id=m.id) for m in removed)
+        for m in removed:
+            new_counts[m.id] = None
+        result["summary"] = summary
+
+    if updates:
+        result["messages"] = updates
+    if new_counts:
+        result["token_counts"] = new_counts
+    return result
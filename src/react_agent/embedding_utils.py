@@ -1,10 +1,15 @@
-from langchain_ollama import OllamaEmbeddings
+from milvus.embedding_provider import DEFAULT_MODEL, get_embedding_provider
 
 """
 pip install -qU langchain-ollama
 """
 
 
-def get_embeddings(text: str):
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
-    return embeddings.embed_query(text)
+def get_embeddings(text: str, model: str = DEFAULT_MODEL):
+    """Embed ``text`` with the shared provider of ``model``."""
+    return get_embedding_provider(model).embed_query(text)
+
+
+async def aget_embeddings(text: str, model: str = DEFAULT_MODEL):
+    """Async :func:`get_embeddings`."""
+    return await get_embedding_provider(model).aembed_query(text)
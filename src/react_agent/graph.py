@@ -2,17 +2,17 @@ import os
 from datetime import datetime, timezone
 from typing import Dict, List, Literal, cast
 
-from langchain_community.chat_models import ChatTongyi
-
 from react_agent.configuration import Configuration
+from react_agent.prompts import SUMMARY_CONTEXT
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
-from langchain_deepseek import ChatDeepSeek
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import ToolNode
 
+from checkpointer.sqlite_saver import get_checkpointer
+from llm.router import get_chat_model
+from react_agent.context import manage_context
 from react_agent.state import State, InputState
+from react_agent.tool_runner import make_tool_runner
 from react_agent.tools import TOOLS
 
 os.environ["DASHSCOPE_API_KEY"] = "..."
@@ -35,19 +35,16 @@ async def call_model(state: State, config: RunnableConfig) -> Dict[str, List[AIM
     """
     configuration = Configuration.from_runnable_config(config)
 
-    # model = ChatDeepSeek(
-    #     model=configuration.model,
-    #     temperature=0,
-    #     max_tokens=None,
-    #     timeout=None,
-    #     max_retries=2,
-    # ).bind_tools(TOOLS)
-
-    model = ChatTongyi().bind_tools(TOOLS)
+    # Cached per (model, tools, params): only rebuilt when the configuration changes.
+    # Concurrency limits, rate limiting and the DeepSeek -> Qwen fallback live in llm.router.
+    model = get_chat_model(configuration.model, tools=TOOLS)
 
     system_message = configuration.system_prompt.format(
         system_time=datetime.now(tz=timezone.utc).isoformat()
     )
+    if state.summary:
+        # Older turns were folded into the summary by manage_context.
+        system_message += SUMMARY_CONTEXT.format(summary=state.summary)
 
     # Get the model's response
     response = cast(
@@ -72,10 +69,14 @@ async def call_model(state: State, config: RunnableConfig) -> Dict[str, List[AIM
 
 graph_builder = StateGraph(State, input=InputState, config_schema=Configuration)
 
+graph_builder.add_node("manage_context", manage_context)
 graph_builder.add_node("call_model", call_model)
-graph_builder.add_node("tools", ToolNode(TOOLS))
+# Tool calls of one turn run concurrently, each with its own timeout.
+graph_builder.add_node("tools", make_tool_runner(TOOLS))
 
-graph_builder.add_edge("__start__", "call_model")
+# Every model call is preceded by trimming the conversation to the token budget.
+graph_builder.add_edge("__start__", "manage_context")
+graph_builder.add_edge("manage_context", "call_model")
 
 
 def route_model_output(state: State) -> Literal["__end__", "tools"]:
@@ -106,16 +107,18 @@ graph_builder.add_conditional_edges(
     route_model_output,
 )
 # Any time a tool is called, we return to the chatbot to decide the next step
-graph_builder.add_edge("tools", "call_model")
+graph_builder.add_edge("tools", "manage_context")
 
-# memory = MemorySaver()
+# Threads are persisted in SQLite (CHECKPOINT_PATH) and survive restarts;
+# pass {"configurable": {"thread_id": ...}} to continue a conversation.
+memory = get_checkpointer()
 
 # Compile the builder into an executable graph
 # You can customize this by adding interrupt points for state updates
 graph = graph_builder.compile(
     # interrupt_before=[],  # Add node names here to update state before they're called
     # interrupt_after=[],  # Add node names here to update state after they're called
-    # checkpointer=memory,
+    checkpointer=memory,
 )
 
 graph.name = "New Graph"  # This defines the custom name in LangSmith
@@ -2,4 +2,22 @@
 
 SYSTEM_PROMPT = """You are a helpful AI assistant.
 
-System time: {system_time}"""
\ No newline at end of file
+System time: {system_time}"""
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an AI assistant.
+
+Keep the facts, decisions, open questions and tool findings that later turns may rely on. \
+Be concise and write in the conversation's language.
+
+Current summary:
+{summary}
+
+New messages to fold in:
+{messages}
+
+Updated summary:"""
+
+SUMMARY_CONTEXT = """
+
+Summary of the earlier conversation:
+{summary}"""
\ No newline at end of file
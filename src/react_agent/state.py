@@ -4,7 +4,26 @@ from dataclasses import dataclass, field
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
 from langgraph.managed import IsLastStep
-from typing import Annotated, Sequence
+from typing import Annotated, Any, Dict, List, Optional, Sequence
+
+# Tool timings kept in state, most recent last.
+MAX_TOOL_TIMINGS = 100
+
+
+def merge_token_counts(left: Dict[str, int], right: Dict[str, Optional[int]]) -> Dict[str, int]:
+    """Reducer for ``token_counts``: ``None`` forgets a removed message."""
+    merged = dict(left or {})
+    for message_id, tokens in (right or {}).items():
+        if tokens is None:
+            merged.pop(message_id, None)
+        else:
+            merged[message_id] = tokens
+    return merged
+
+
+def append_tool_timings(left: List[Dict[str, Any]], right: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reducer for ``tool_timings``: append, keeping the last ``MAX_TOOL_TIMINGS``."""
+    return (list(left or []) + list(right or []))[-MAX_TOOL_TIMINGS:]
 
 
 @dataclass
@@ -49,6 +68,25 @@ class State(InputState):
     It is set to 'True' when the step count reaches recursion_limit - 1.
     """
 
+    summary: str = field(default="")
+    """
+    Running summary of the turns removed from `messages` to stay within the token budget.
+
+    Maintained by `react_agent.context.manage_context` and sent along with the system prompt.
+    """
+
+    token_counts: Annotated[Dict[str, int], merge_token_counts] = field(default_factory=dict)
+    """
+    Token count of each message in `messages`, by message id.
+
+    Each message is counted once, when it is first seen, so budgeting a turn only costs the new messages.
+    """
+
+    tool_timings: Annotated[List[Dict[str, Any]], append_tool_timings] = field(default_factory=list)
+    """
+    Status and duration of recent tool calls, one entry per call, recorded by `react_agent.tool_runner`.
+    """
+
     # Additional attributes can be added here as needed.
     # Common examples include:
     # retrieved_documents: List[Document] = field(default_factory=list)
@@ -0,0 +1,87 @@
+"""Run the tool calls of one model turn concurrently, each under its own deadline.
+
+When the model asks for several tools at once (a few ``milvus_search`` calls
+and a ``multiply``), ``run_tools``:
+
+- runs them concurrently, at most ``Configuration.max_parallel_tools`` at a time;
+- gives each call ``Configuration.tool_timeouts[name]`` seconds (default
+  ``Configuration.tool_timeout``) and stops waiting for it after that;
+- turns a timeout or an exception into an error ``ToolMessage`` for that call
+  only, so the other results still reach the model;
+- records each call's status and duration in ``State.tool_timings``.
+
+Results are returned in the order the model issued the calls. Interrupts
+(e.g. ``human_assistance``) propagate as they do from ``ToolNode``.
+
+A timeout cancels an ``async`` tool's coroutine. A synchronous tool runs in a
+worker thread that ``asyncio.wait_for`` cannot stop: the thread runs to
+completion and its result is discarded. That is why the tools in
+``react_agent.tools`` (``milvus_search``, ``multiply``, ...) are ``async``.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langchain_core.tools import tool as as_tool
+from langgraph.errors import GraphBubbleUp
+
+from react_agent.configuration import Configuration
+from react_agent.state import State
+
+
+def _timing(call: Dict[str, Any], status: str, started: float, ended: float) -> Dict[str, Any]:
+    return {
+        "tool": call["name"],
+        "tool_call_id": call["id"],
+        "status": status,
+        "ms": round((ended - started) * 1000, 1),
+        "started_at": started,
+    }
+
+
+def make_tool_runner(tools: Sequence[Callable[..., Any]]):
+    """Build the ``tools`` node for ``tools`` (functions or ``BaseTool`` instances)."""
+    tools_by_name = {t.name: t for t in (t if isinstance(t, BaseTool) else as_tool(t) for t in tools)}
+
+    async def run_tools(state: State, config: RunnableConfig) -> Dict[str, List]:
+        """Execute the tool calls of the last AI message concurrently."""
+        configuration = Configuration.from_runnable_config(config)
+        message = state.messages[-1]
+        if not isinstance(message, AIMessage):
+            raise ValueError(f"Expected AIMessage before tools, but got {type(message).__name__}")
+        slots = asyncio.Semaphore(max(1, configuration.max_parallel_tools))
+
+        async def run(call: Dict[str, Any]):
+            name = call["name"]
+            timeout = configuration.tool_timeouts.get(name, configuration.tool_timeout)
+            async with slots:
+                started = time.time()
+                tool = tools_by_name.get(name)
+                if tool is None:
+                    content, status = f"Error: {name} is not a valid tool, try one of {sorted(tools_by_name)}.", "error"
+                else:
+                    try:
+                        result = await asyncio.wait_for(tool.ainvoke({**call, "type": "tool_call"}, config), timeout)
+                        return result, _timing(call, "success", started, time.time())
+                    except GraphBubbleUp:
+                        raise
+                    except asyncio.TimeoutError:
+                        content = f"Error: {name} did not finish within {timeout:g}s and was cancelled. " \
+                                  f"Answer with the other results or try a narrower call."
+                        status = "timeout"
+                    except Exception as e:
+                        content, status = f"Error: {e!r}\n Please fix your mistakes.", "error"
+                tool_message = ToolMessage(content=content, name=name, tool_call_id=call["id"], status="error")
+                return tool_message, _timing(call, status, started, time.time())
+
+        results = await asyncio.gather(*(run(call) for call in message.tool_calls))
+        return {
+            "messages": [tool_message for tool_message, _ in results],
+            "tool_timings": [timing for _, timing in results],
+        }
+
+    return run_tools
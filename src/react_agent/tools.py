@@ -1,12 +1,24 @@
-import json
 from typing import List, Callable, Any
 
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 from langgraph.types import Command, interrupt
-from pymilvus import MilvusClient
-from react_agent.embedding_utils import get_embeddings
+from milvus.async_search import AsyncMilvusSearcher
+from milvus.bm25 import get_lexical_index
+from milvus.connection import get_client
+from milvus.embedding_provider import get_embedding_provider
+from milvus.profiles import get_profile
+from milvus.retrieval import ahybrid_search, amulti_search, build_filter
+from react_agent.configuration import Configuration
 
-client = MilvusClient("data/milvus_demo.db")
+# Milvus Lite is only started the first time a search actually runs.
+client = get_client("data/milvus_demo.db")
+# Index/search parameters of collection_test, see milvus.profiles.
+profile = get_profile("default")
+# Concurrent sessions share one batched embedding request per ~5 ms window.
+searcher = AsyncMilvusSearcher(
+    client, max_workers=8, timeout=10.0, embedder=get_embedding_provider(coalesce=True)
+)
 
 
 async def multiply(a: int, b: int) -> int:
@@ -21,22 +33,52 @@ async def human_assistance(query: str) -> str:
     return human_response["data"]
 
 
-async def milvus_search(query: str) -> str:
-    """
-    Search milvus for a query
+async def milvus_search(query: str, filter: str = "", offset: int = 0, limit: int = 3,
+                        *, config: RunnableConfig) -> str:
+    """Search milvus for a query.
+
     :param query: query for milvus search
+    :param filter: optional Milvus boolean expression over source (string), tenant (string)
+        and created_at (unix seconds), e.g. 'source like "docs/%" and created_at >= 1700000000'
+    :param offset: number of results to skip, to page through further results
+    :param limit: number of results to return
     :return: milvus search result
     """
     collection_name = 'collection_test'
-    query_vector = get_embeddings(query)
-    res = client.search(
-        collection_name=collection_name,
-        data=[query_vector],
-        limit=2,
-        output_fields=["my_id", "my_content"],
-        search_params={"metric_type": "COSINE"}
+    tenant = Configuration.from_runnable_config(config).tenant
+    # BM25 catches exact identifiers and error codes, so the dense top-k can stay small.
+    res = await ahybrid_search(
+        searcher,
+        get_lexical_index(collection_name),
+        query,
+        collection_name,
+        limit=limit,
+        dense_limit=max(limit - 1, 1),
+        sparse_limit=limit,
+        search_params=profile.search_request(),
+        filter=filter,
+        offset=offset,
+        tenant=tenant,
+    )
+    return res.to_json()
+
+
+async def milvus_multi_search(queries: List[str], limit: int = 5, filter: str = "",
+                              *, config: RunnableConfig) -> str:
+    """Search milvus for several phrasings or sub-questions at once.
+
+    :param queries: rewrites of the question or its sub-questions
+    :param limit: number of de-duplicated results to return
+    :param filter: optional Milvus boolean expression over source, tenant and created_at
+    :return: fused milvus search result
+    """
+    collection_name = 'collection_test'
+    tenant = Configuration.from_runnable_config(config).tenant
+    res = await amulti_search(
+        searcher, queries, collection_name, limit=limit, fusion="rrf", search_params=profile.search_request(),
+        filter=build_filter(filter, tenant=tenant),
     )
-    return json.dumps(res, ensure_ascii=False)
+    return res.to_json()
 
 
-TOOLS: List[Callable[..., Any]] = [multiply, milvus_search]
+TOOLS: List[Callable[..., Any]] = [multiply, milvus_search, milvus_multi_search]
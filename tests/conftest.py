@@ -0,0 +1,13 @@
+import os
+import sys
+import types
+
+# The graphs import their shared packages (milvus, llm, react_agent, ...) from src/.
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+
+# react_agent/__init__.py builds the whole graph (Milvus client, Ollama embeddings).
+# Register the package without running it so its modules can be tested on their own.
+_react_agent = types.ModuleType("react_agent")
+_react_agent.__path__ = [os.path.join(SRC, "react_agent")]
+sys.modules.setdefault("react_agent", _react_agent)
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+pytest.importorskip("pymilvus")
+
+from milvus.bm25 import BM25Index, tokenize  # noqa: E402
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.db"))
+    yield index
+    index.close()
+
+
+def test_cjk_runs_become_unigrams_and_bigrams():
+    assert tokenize("向量检索") == ["向", "量", "检", "索", "向量", "量检", "检索"]
+    assert tokenize("报错ERR-404了") == ["报", "错", "报错", "err-404", "err", "404", "了"]
+    assert tokenize("see my_id.v2, OK") == ["see", "my_id.v2", "my", "id", "v2", "ok"]
+
+
+def test_scores_follow_okapi_bm25(index):
+    index.add([(1, "apple banana"), (2, "apple apple cherry"), (3, "durian")])
+    k1, b, avgdl = index.k1, index.b, 2.0
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+
+    def expected(tf, length):
+        return idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avgdl))
+
+    hits = index.search("apple")
+    assert [hit.id for hit in hits] == [2, 1]
+    assert [hit.score for hit in hits] == pytest.approx([expected(2, 3), expected(1, 2)])
+    assert hits[0].content == "apple apple cherry"
+
+
+def test_common_terms_are_skipped_when_rarer_ones_match(index):
+    index.add([(1, "apple banana"), (2, "apple apple cherry"), (3, "durian")])
+    # "apple" is in 2 of 3 documents, above max_df_ratio: only "cherry" is scored.
+    assert [hit.id for hit in index.search("apple cherry")] == [2]
+
+
+def test_replacing_and_removing_documents_updates_the_statistics(index):
+    index.add([(1, "apple banana"), (2, "apple cherry")])
+    index.add([(2, "durian")])
+    assert len(index) == 2
+    assert index.search("cherry") == []
+    assert [hit.id for hit in index.search("durian")] == [2]
+    index.remove([2, 99])
+    assert len(index) == 1
+    assert index.search("durian") == []
+    assert [hit.id for hit in index.search("apple")] == [1]
+
+
+def test_tenant_only_sees_its_own_documents(index):
+    index.add([(1, "billing error ERR-404", "acme"), (2, "billing error ERR-404", "globex"), (3, "billing")])
+    assert [hit.id for hit in index.search("ERR-404", tenant="acme")] == [1]
+    assert [hit.id for hit in index.search("404", tenant="globex")] == [2]
+    assert {hit.id for hit in index.search("billing")} == {1, 2, 3}
+    assert index.search("billing", tenant="initech") == []
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langgraph")
+
+from langchain_core.language_models import FakeListChatModel  # noqa: E402
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langgraph.graph.message import add_messages  # noqa: E402
+
+from llm.cache import MemoryResponseBackend, ResponseCache  # noqa: E402
+
+
+def _model(cache):
+    # Only one scripted response: a second API call would fail the test.
+    return FakeListChatModel(responses=["Paris"], cache=cache)
+
+
+def test_repeated_question_in_one_thread_keeps_both_answers():
+    cache = ResponseCache(backend=MemoryResponseBackend())
+    model = _model(cache)
+    question = [HumanMessage("What is the capital of France?")]
+
+    thread = add_messages([], question + [model.invoke(question)])
+    thread = add_messages(thread, [HumanMessage("What is the capital of France?"), model.invoke(question)])
+
+    assert cache.stats.memory_hits == 1
+    answers = [m for m in thread if m.type == "ai"]
+    assert [m.content for m in answers] == ["Paris", "Paris"]
+    assert answers[0].id != answers[1].id
+
+
+@pytest.mark.parametrize("tier", ["memory", "backend"])
+def test_hits_are_fresh_copies(tier):
+    backend = MemoryResponseBackend()
+    cache = ResponseCache(backend=backend)
+    question = [HumanMessage("hi")]
+    first = _model(cache).invoke(question)
+    first.content = "mutated by the caller"
+    if tier == "backend":
+        # A new process: nothing in the memory tier, the entry is deserialized.
+        cache = ResponseCache(backend=backend)
+
+    hit = asyncio.run(_model(cache).ainvoke(question))
+    again = _model(cache).invoke(question)
+    assert hit.content == again.content == "Paris"
+    assert hit is not again
+    # The cached call's id is not replayed; LangChain or the graph assigns a new one.
+    assert first.id not in (hit.id, again.id)
@@ -0,0 +1,130 @@
+import pytest
+
+pytest.importorskip("langgraph")
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage  # noqa: E402
+from langgraph.graph import END, START, MessagesState, StateGraph  # noqa: E402
+
+from checkpointer import sqlite_saver  # noqa: E402
+from checkpointer.sqlite_saver import SQLiteCheckpointSaver  # noqa: E402
+
+
+def _graph(saver):
+    def reply(state):
+        return {"messages": [AIMessage(f"reply {len(state['messages'])}")]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=saver)
+
+
+def _chat(path, turns, thread_id="t1", **kwargs):
+    saver = SQLiteCheckpointSaver(path, max_age=0, **kwargs)
+    graph = _graph(saver)
+    config = {"configurable": {"thread_id": thread_id}}
+    for i in range(turns):
+        graph.invoke({"messages": [HumanMessage(f"question {i}")]}, config)
+    saver.close()
+
+
+def _count(saver, table):
+    return saver._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_thread_resumes_after_reopening(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    _chat(path, turns=2)
+
+    saver = SQLiteCheckpointSaver(path, max_age=0)
+    config = {"configurable": {"thread_id": "t1"}}
+    state = _graph(saver).invoke({"messages": [HumanMessage("question 2")]}, config)
+    assert [m.content for m in state["messages"]] == [
+        "question 0", "reply 1", "question 1", "reply 3", "question 2", "reply 5",
+    ]
+    latest = saver.get_tuple(config)
+    assert latest.checkpoint["channel_values"]["messages"] == state["messages"]
+    assert latest.parent_config is not None
+    saver.close()
+
+
+def test_missing_messages_raise_instead_of_dropping_history(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    _chat(path, turns=1)
+
+    saver = SQLiteCheckpointSaver(path, max_age=0)
+    with saver._conn:
+        saver._conn.execute("DELETE FROM messages WHERE rowid = (SELECT MIN(rowid) FROM messages)")
+    with pytest.raises(RuntimeError, match="missing messages"):
+        saver.get_tuple({"configurable": {"thread_id": "t1"}})
+    saver.close()
+
+
+def test_prune_keeps_the_newest_checkpoints_and_what_they_reference(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    _chat(path, turns=5, keep_last=2)
+    _chat(path, turns=1, thread_id="t2", keep_last=2)
+
+    saver = SQLiteCheckpointSaver(path, max_age=0, keep_last=2)
+    config = {"configurable": {"thread_id": "t1"}}
+    assert len(list(saver.list(config))) == 2
+    # The newest checkpoint still resumes with the whole conversation.
+    assert len(saver.get_tuple(config).checkpoint["channel_values"]["messages"]) == 10
+    # Only blobs referenced by a kept checkpoint are left.
+    referenced = {
+        (channel, str(version))
+        for item in saver.list(config)
+        for channel, version in item.checkpoint["channel_versions"].items()
+    }
+    stored = set(saver._conn.execute("SELECT channel, version FROM blobs WHERE thread_id = 't1'").fetchall())
+    assert stored == referenced
+
+    messages = _count(saver, "messages")
+    saver.prune(["t1", "t2"], strategy="keep_latest")
+    # The newest checkpoint references every message of its thread.
+    assert _count(saver, "messages") == messages
+    assert len(list(saver.list(config))) == 1
+    assert len(list(saver.list({"configurable": {"thread_id": "t2"}}))) == 1
+    saver.close()
+
+
+def test_flushes_defer_pruning_to_the_timer(tmp_path, monkeypatch):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), max_age=0, keep_last=1)
+    graph = _graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(3):
+        graph.invoke({"messages": [HumanMessage(f"question {i}")]}, config)
+
+    saver.flush()
+    assert len(list(saver.list(config))) > 1
+    monkeypatch.setattr(sqlite_saver, "_PRUNE_EVERY", 0.0)
+    saver.flush()
+    assert len(list(saver.list(config))) == 1
+    assert len(saver.get_tuple(config).checkpoint["channel_values"]["messages"]) == 6
+    saver.close()
+
+
+def test_each_message_is_serialized_once_unless_replaced(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), max_age=0)
+    serialized = []
+    dumps_typed = saver.serde.dumps_typed
+
+    def counting_dumps_typed(value):
+        if isinstance(value, BaseMessage):
+            serialized.append(value.content)
+        return dumps_typed(value)
+
+    saver.serde.dumps_typed = counting_dumps_typed
+    graph = _graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(3):
+        graph.invoke({"messages": [HumanMessage(f"question {i}")]}, config)
+    assert sorted(serialized) == sorted(["question 0", "reply 1", "question 1", "reply 3", "question 2", "reply 5"])
+
+    # Replacing a message under its id stores the new version.
+    last = graph.get_state(config).values["messages"][-1]
+    graph.update_state(config, {"messages": [AIMessage("edited", id=last.id)]})
+    assert "edited" in serialized
+    assert saver.get_tuple(config).checkpoint["channel_values"]["messages"][-1].content == "edited"
+    saver.close()
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+pytest.importorskip("pymilvus")
+
+from milvus.connection import ConnectionManager  # noqa: E402
+
+
+def test_equivalent_local_paths_share_one_connection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = ConnectionManager()
+    try:
+        first = manager.acquire("numpy://store")
+        second = manager.acquire("numpy://./store")
+        assert first == second
+        assert len(manager._pools) == 1
+        assert ConnectionManager._key("data/milvus_demo.db", {}) == ConnectionManager._key("./data/milvus_demo.db", {})
+    finally:
+        manager.close_all()
+
+
+def test_health_check_runs_off_the_request_path(tmp_path):
+    manager = ConnectionManager(health_interval=0.0)
+    try:
+        key = manager.acquire(f"numpy://{tmp_path}")
+        pool = manager._pools[key]
+        client = pool.clients[0]
+
+        def unhealthy():
+            time.sleep(0.3)
+            raise RuntimeError("connection lost")
+
+        client.list_collections = unhealthy
+        started = time.monotonic()
+        assert manager.get(key) is client
+        assert time.monotonic() - started < 0.1
+
+        deadline = time.monotonic() + 5
+        while pool.checking and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.clients[0] is not client
+    finally:
+        manager.close_all()
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("langgraph")
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage  # noqa: E402
+
+from react_agent import context  # noqa: E402
+from react_agent.state import State  # noqa: E402
+
+
+def _turn(n, payload_words=0):
+    call = {"name": "milvus_search", "args": {"query": f"q{n}"}, "id": f"call{n}"}
+    return [
+        HumanMessage(f"question {n}", id=f"h{n}"),
+        AIMessage("", tool_calls=[call], id=f"a{n}"),
+        ToolMessage(" ".join(["result"] * payload_words), tool_call_id=f"call{n}", name="milvus_search", id=f"t{n}"),
+        AIMessage(f"answer {n}", id=f"r{n}"),
+    ]
+
+
+def _run(messages, summary_result="summary of old turns", **configurable):
+    async def summarize(previous, removed, configuration):
+        if isinstance(summary_result, Exception):
+            raise summary_result
+        return summary_result
+
+    state = State(messages=messages)
+    config = {"configurable": configurable}
+    original = context.summarize
+    context.summarize = summarize
+    try:
+        return asyncio.run(context.manage_context(state, config))
+    finally:
+        context.summarize = original
+
+
+def test_stale_tool_results_are_collapsed_but_the_current_turn_is_not():
+    messages = _turn(1, payload_words=300) + [HumanMessage("question 2", id="h2")]
+    current = _turn(2, payload_words=300)[1:3]
+    result = _run(messages + current, max_context_tokens=100_000, stale_tool_result_tokens=50)
+
+    (collapsed,) = result["messages"]
+    assert collapsed.id == "t1" and collapsed.additional_kwargs["collapsed"]
+    assert "collapsed" in collapsed.content and len(collapsed.content) < 200
+    assert "summary" not in result
+    # Every message was counted once; t1 is counted in its collapsed form.
+    assert set(result["token_counts"]) == {m.id for m in messages + current}
+    assert result["token_counts"]["t1"] < result["token_counts"]["t2"]
+
+
+def test_over_budget_folds_old_turns_into_the_summary():
+    messages = _turn(1, 400) + _turn(2, 400) + _turn(3, 10) + [HumanMessage("question 4", id="h4")]
+    result = _run(messages, max_context_tokens=600, stale_tool_result_tokens=100_000)
+
+    removed = {m.id for m in result["messages"] if isinstance(m, RemoveMessage)}
+    assert removed == {m.id for m in _turn(1) + _turn(2)}
+    assert result["summary"] == "summary of old turns"
+    assert all(result["token_counts"][i] is None for i in removed)
+    # Turn boundaries: the kept messages start with a user message.
+    kept = [m for m in messages if m.id not in removed]
+    assert isinstance(kept[0], HumanMessage) and kept[-1].id == "h4"
+
+
+def test_failed_summary_still_drops_old_turns(caplog):
+    messages = _turn(1, 400) + _turn(2, 10) + [HumanMessage("question 3", id="h3")]
+    result = _run(messages, summary_result=RuntimeError("provider down"), max_context_tokens=300,
+                  stale_tool_result_tokens=100_000)
+
+    assert {m.id for m in result["messages"]} == {m.id for m in _turn(1)}
+    assert result["summary"] == ""
+    assert "Conversation summary failed" in caplog.text
+
+
+def test_one_long_turn_collapses_all_but_the_latest_step():
+    messages = [HumanMessage("question 1", id="h1")]
+    for step in range(6):
+        call = {"name": "milvus_search", "args": {"query": f"q{step}"}, "id": f"call{step}"}
+        messages += [
+            AIMessage("", tool_calls=[call], id=f"a{step}"),
+            ToolMessage(" ".join(["result"] * 300), tool_call_id=f"call{step}", name="milvus_search", id=f"t{step}"),
+        ]
+    result = _run(messages, max_context_tokens=100_000, stale_tool_result_tokens=50)
+
+    assert {m.id for m in result["messages"]} == {f"t{step}" for step in range(5)}
+    assert all(m.additional_kwargs["collapsed"] for m in result["messages"])
+    assert result["token_counts"]["t0"] < result["token_counts"]["t5"]
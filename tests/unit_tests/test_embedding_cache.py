@@ -0,0 +1,84 @@
+from milvus import embedding_cache
+from milvus.embedding_cache import EmbeddingCache
+
+# 4 float32 components: 16 bytes per row on disk.
+VECTORS = {text: [float(i)] * 4 for i, text in enumerate(["a", "b", "c", "d"])}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _put(cache, *texts):
+    cache.put_many("m", texts, [VECTORS[t] for t in texts])
+
+
+def _on_disk(cache):
+    return {key for (key,) in cache._conn.execute("SELECT key FROM embeddings")}
+
+
+def _last_access(cache, text):
+    key = embedding_cache.cache_key("m", text)
+    return cache._conn.execute("SELECT last_access FROM embeddings WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_are_copies(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), memory_items=1)
+    _put(cache, "a", "b")
+    # "b" is served from memory, "a" from disk (and then remembered).
+    for _ in range(2):
+        hits = cache.get_many("m", ["a", "b", "a"])
+        for vector in hits:
+            vector[0] = -1.0
+    assert cache.get_many("m", ["a", "b"]) == [VECTORS["a"], VECTORS["b"]]
+    cache.close()
+
+
+def test_memory_tier_keeps_the_most_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), memory_items=2)
+    _put(cache, "a", "b")
+    cache.get_many("m", ["a"])
+    _put(cache, "c")
+    assert set(cache._memory) == {embedding_cache.cache_key("m", t) for t in ("a", "c")}
+    # Evicted from memory only: still answered from disk.
+    assert cache.get_many("m", ["b"]) == [VECTORS["b"]]
+    assert cache.stats.disk_hits == 1
+    cache.close()
+
+
+def test_disk_access_times_are_written_in_batches(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(embedding_cache.time, "time", clock)
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), memory_items=1, touch_batch=2)
+    _put(cache, "a", "b", "c")
+
+    clock.now = 10.0
+    cache.get_many("m", ["a"])
+    assert _last_access(cache, "a") == 0.0
+    clock.now = 11.0
+    cache.get_many("m", ["b"])
+    assert (_last_access(cache, "a"), _last_access(cache, "b")) == (10.0, 11.0)
+    cache.close()
+
+
+def test_disk_tier_evicts_the_least_recently_read(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(embedding_cache.time, "time", clock)
+    # Room for three rows; an overflow evicts down to 90% of the budget, i.e. two rows.
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), memory_items=1, max_bytes=48, touch_batch=100)
+    _put(cache, "a", "b", "c")
+    clock.now = 10.0
+    # Read from disk; the access time is still pending when "d" arrives.
+    cache.get_many("m", ["a"])
+    clock.now = 20.0
+    _put(cache, "d")
+
+    assert _on_disk(cache) == {embedding_cache.cache_key("m", t) for t in ("a", "d")}
+    assert cache.stats.evictions == 2
+    assert cache.info()["disk_bytes"] == 32
+    assert cache.get_many("m", ["b", "c"]) == [None, None]
+    cache.close()
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from milvus.filter_expr import Column, filter_mask, parse_filter
+from milvus.numpy_store import NumpyVectorClient
+
+ESCAPE = 'x == 1) or (tenant != ""'
+
+
+@pytest.mark.parametrize("expr", [
+    ESCAPE,
+    ") or (tenant != \"\"",
+    "(x == 1",
+    "x == 1 or",
+    "x = 1",
+    "x == 1; drop",
+])
+def test_parse_filter_rejects_unbalanced_or_unknown_syntax(expr):
+    with pytest.raises(ValueError):
+        parse_filter(expr)
+
+
+def test_parse_filter_evaluates_comparisons():
+    entity = {"tenant": "a", "source": "docs/intro.md", "created_at": 150}
+    assert parse_filter('tenant == "a" and created_at >= 100')(entity)
+    assert parse_filter("100 <= created_at < 200")(entity)
+    assert not parse_filter("created_at > 150 or not (tenant in ['a', 'b'])")(entity)
+    assert parse_filter('source like "docs/%"')(entity)
+    assert parse_filter('tenant not in ["b"] && !(created_at < 0)')(entity)
+    assert not parse_filter("missing == 1")(entity)
+
+
+MASK_EXPRS = [
+    'tenant == "a"',
+    'tenant != "a" or created_at >= 5',
+    "100 <= created_at < 200",
+    "not (tenant in ['a', 'b'])",
+    'tenant not in ["b"] && !(created_at < 3)',
+    'source like "docs/%"',
+    "tenant == 5",
+    "tenant != 5",
+    'created_at == "x"',
+    "source > 'docs/b'",
+]
+
+
+@pytest.mark.parametrize("expr", MASK_EXPRS)
+def test_filter_mask_matches_the_row_predicate(expr):
+    rng = np.random.default_rng(0)
+    entities = []
+    for i in range(60):
+        entity = {"source": f"{rng.choice(['docs', 'blog'])}/{rng.choice(['a', 'b', 'c'])}.md",
+                  "tenant": rng.choice(["a", "b", "c"]).item(), "created_at": int(rng.integers(0, 300))}
+        # Missing fields and values of the wrong type.
+        if i % 7 == 0:
+            del entity[rng.choice(["source", "tenant", "created_at"]).item()]
+        if i % 11 == 0:
+            entity["created_at"] = "yesterday"
+        entities.append(entity)
+    kinds = {"source": str, "tenant": str, "created_at": float}
+    half = {name: Column.build([e.get(name) for e in entities[:30]], kind) for name, kind in kinds.items()}
+    columns = {name: half[name].extend([e.get(name) for e in entities[30:]], kind) for name, kind in kinds.items()}
+
+    expected = [parse_filter(expr)(entity) for entity in entities]
+    assert filter_mask(expr, columns, len(entities)).tolist() == expected
+    assert filter_mask(expr + " and other == 1", columns, len(entities)) is None
+    with pytest.raises(ValueError):
+        filter_mask(expr + " and (other == 1", columns, len(entities))
+
+
+def test_build_filter_rejects_the_tenant_escape():
+    pytest.importorskip("pymilvus")
+    from milvus.retrieval import build_filter
+
+    with pytest.raises(ValueError):
+        build_filter(ESCAPE, tenant="a")
+    assert build_filter('source == "x" or created_at > 5', tenant="a") == \
+        '(source == "x" or created_at > 5) and tenant == "a"'
+
+
+def test_numpy_search_only_returns_the_filtered_tenant(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(40, 8)).astype(np.float32)
+    client = NumpyVectorClient(str(tmp_path))
+    client.create_collection("c", dimension=8)
+    client.insert("c", [
+        {"my_id": i, "my_vector": v.tolist(), "my_content": f"doc {i}", "tenant": "a" if i % 2 else "b",
+         "created_at": i}
+        for i, v in enumerate(vectors)
+    ])
+
+    hits = client.search("c", [vectors[4]], limit=5, filter='(created_at < 30) and tenant == "a"')[0]
+    assert len(hits) == 5
+    assert all(hit["id"] % 2 == 1 and hit["id"] < 30 for hit in hits)
+
+    with pytest.raises(ValueError):
+        client.search("c", [vectors[4]], limit=5, filter='tenant = "a"')
+
+
+def test_numpy_search_filters_on_other_fields_and_new_rows(tmp_path):
+    vectors = np.eye(4, dtype=np.float32)
+    client = NumpyVectorClient(str(tmp_path))
+    client.create_collection("c", dimension=4)
+    client.insert("c", [
+        {"my_id": i, "my_vector": v.tolist(), "tenant": "a", "lang": "en"} for i, v in enumerate(vectors)
+    ])
+    assert len(client.search("c", [vectors[0]], limit=4, filter='tenant == "b"')[0]) == 0
+
+    # Rows appended after the columns were cached are filtered too.
+    client.insert("c", [{"my_id": 9, "my_vector": vectors[0].tolist(), "tenant": "b", "lang": "de"}])
+    assert [hit["id"] for hit in client.search("c", [vectors[0]], limit=4, filter='tenant == "b"')[0]] == [9]
+    # A field without a column is evaluated row by row.
+    assert [hit["id"] for hit in client.search("c", [vectors[0]], limit=4, filter='lang == "de"')[0]] == [9]
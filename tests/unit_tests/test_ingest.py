@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+pytest.importorskip("pymilvus")
+
+from milvus.ingest import Checkpoint, Manifest, job_fingerprint, sync_chunks  # noqa: E402
+from milvus.numpy_store import NumpyVectorClient  # noqa: E402
+
+
+def _write(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_checkpoint_is_invalidated_when_a_file_changes(tmp_path):
+    doc = tmp_path / "doc.txt"
+    _write(doc, "first version", 1_700_000_000)
+    checkpoint_path = str(tmp_path / "ingest.checkpoint.json")
+    job = job_fingerprint([str(doc)], "collection_test", 1000, 100)
+    Checkpoint(checkpoint_path, job).advance(3)
+
+    # Same files, same content: the job resumes after the committed chunks.
+    assert Checkpoint(checkpoint_path, job_fingerprint([str(doc)], "collection_test", 1000, 100)).committed == 3
+
+    _write(doc, "second, longer version", 1_700_000_100)
+    changed = job_fingerprint([str(doc)], "collection_test", 1000, 100)
+    assert changed != job
+    with pytest.raises(ValueError, match="different ingest job"):
+        Checkpoint(checkpoint_path, changed)
+
+
+def test_fingerprint_depends_on_job_settings(tmp_path):
+    doc = tmp_path / "doc.txt"
+    _write(doc, "text", 1_700_000_000)
+    base = job_fingerprint([str(doc)], "collection_test", 1000, 100)
+    assert base == job_fingerprint([str(doc)], "collection_test", 1000, 100)
+    assert base != job_fingerprint([str(doc)], "other", 1000, 100)
+    assert base != job_fingerprint([str(doc)], "collection_test", 500, 100)
+    assert base != job_fingerprint([str(doc)], "collection_test", 1000, 100, tenant="acme")
+
+
+class _Embedder:
+    """Deterministic 4-dim vectors, so sync runs without Ollama."""
+
+    async def aembed_documents(self, texts):
+        return [[float(len(text)), 1.0, float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+
+
+def _sync(paths, client, manifest):
+    return asyncio.run(sync_chunks(paths, "c", client, manifest, chunk_size=50, overlap=0, embedder=_Embedder()))
+
+
+def test_incremental_sync_keeps_ids_when_a_record_is_inserted(tmp_path):
+    docs = tmp_path / "docs.jsonl"
+    records = [{"content": f"record number {i}"} for i in range(3)]
+    _write(docs, "\n".join(json.dumps(r) for r in records), 1_700_000_000)
+    client = NumpyVectorClient(str(tmp_path / "store"))
+    client.create_collection("c", dimension=4)
+    manifest = Manifest(str(tmp_path / "manifest.json"), "job")
+
+    first = _sync([str(docs)], client, manifest)
+    assert first.chunks_embedded == 3
+    ids = set(manifest.ids(str(docs)))
+
+    # A record inserted at the top shifts every line number but no chunk id.
+    records.insert(0, {"content": "a brand new record"})
+    _write(docs, "\n".join(json.dumps(r) for r in records), 1_700_000_100)
+    second = _sync([str(docs)], client, manifest)
+    assert (second.chunks_embedded, second.chunks_unchanged, second.chunks_deleted) == (1, 3, 0)
+    assert ids < set(manifest.ids(str(docs)))
+    assert client.describe_collection("c")["num_entities"] == 4
+
+    # Unchanged size and mtime: the file is skipped without re-chunking.
+    assert _sync([str(docs)], client, manifest).files_skipped == 1
@@ -0,0 +1,103 @@
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_core")
+
+# The RAG agent's package (rag) is only importable once src/rag_agent is installed; load it by path.
+_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "src", "rag_agent", "src", "matrix_store.py",
+)
+_spec = importlib.util.spec_from_file_location("rag_matrix_store", _PATH)
+matrix_store = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(matrix_store)
+
+
+class _Embeddings:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def _expected_top_k(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return [str(i) for i in np.argsort(-scores)[:k]]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_top_k_matches_exact_cosine_ranking(dtype):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    store = matrix_store.MatrixVectorStore(_Embeddings({}), dtype=dtype)
+    store.add_vectors(vectors, [f"doc {i}" for i in range(300)], ids=[str(i) for i in range(300)])
+
+    query = rng.normal(size=16).astype(np.float32)
+    hits = store.similarity_search_with_score_by_vector(query.tolist(), k=5)
+    expected = _expected_top_k(vectors, query, 5)
+    if dtype == "float32":
+        assert [doc.id for doc, _ in hits] == expected
+    else:
+        # float16 rows can swap near-ties; the set of winners stays the same.
+        assert len(set(doc.id for doc, _ in hits) & set(expected)) >= 4
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+
+def test_deleted_replaced_and_filtered_rows():
+    vectors = np.eye(4, dtype=np.float32)
+    store = matrix_store.MatrixVectorStore(_Embeddings({"q": [1.0, 0.1, 0.05, 0.0]}))
+    store.add_vectors(vectors, ["a", "b", "c", "d"], [{"n": i} for i in range(4)], ids=["a", "b", "c", "d"])
+
+    assert [doc.id for doc in store.similarity_search("q", k=2)] == ["a", "b"]
+    store.delete(["a"])
+    assert [doc.id for doc in store.similarity_search("q", k=2)] == ["b", "c"]
+    assert [doc.id for doc in store.similarity_search("q", k=1, filter=lambda d: d.metadata["n"] > 1)] == ["c"]
+
+    # Re-adding an id replaces its row instead of returning it twice.
+    store.add_vectors([[1.0, 0.0, 0.0, 0.0]], ["b again"], ids=["b"])
+    hits = store.similarity_search("q", k=4)
+    assert [doc.id for doc in hits].count("b") == 1
+    assert hits[0].page_content == "b again"
+    assert len(store) == 3
+
+
+class _Index:
+    """Stands in for ``CorpusIndex``: chunks plus a read-only embeddings memmap."""
+
+    def __init__(self, path, vectors):
+        vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors.astype(np.float32).tofile(path)
+        self.embeddings = np.memmap(path, dtype=np.float32, mode="r", shape=vectors.shape)
+        self.chunks = [{"id": str(i), "text": f"doc {i}", "metadata": {"n": i}} for i in range(len(vectors))]
+        self.manifest = {"normalized": True}
+
+
+def test_corpus_index_memmap_is_searched_in_place(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    index = _Index(str(tmp_path / "embeddings.f32"), vectors)
+    store = matrix_store.MatrixVectorStore.from_corpus_index(index, _Embeddings({}))
+    assert store._matrix is index.embeddings
+
+    query = rng.normal(size=8).astype(np.float32)
+    hits = store.similarity_search_with_score_by_vector(query.tolist(), k=3)
+    assert [doc.id for doc, _ in hits] == _expected_top_k(vectors, query, 3)
+
+    store.delete([hits[0][0].id])
+    assert store._matrix is index.embeddings
+    assert hits[0][0].id not in [doc.id for doc, _ in store.similarity_search_with_score_by_vector(query, k=3)]
+
+    # The first add copies the rows; the mapped file is never written.
+    store.add_vectors([query], ["query"], ids=["q"])
+    assert store._matrix is not index.embeddings
+    assert store.similarity_search_by_vector(query.tolist(), k=1)[0].id == "q"
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    assert np.allclose(np.fromfile(tmp_path / "embeddings.f32", dtype=np.float32).reshape(50, 8), normalized)
@@ -0,0 +1,113 @@
+import threading
+
+import numpy as np
+
+from milvus.numpy_store import NumpyCollection, NumpyVectorClient
+
+
+def _rows(vectors, start=0):
+    return [
+        {"my_id": start + i, "my_vector": v.tolist(), "my_content": f"doc {start + i}", "tenant": "a" if i % 2 else "b"}
+        for i, v in enumerate(vectors)
+    ]
+
+
+def _expected_top_k(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+def test_exact_search_returns_the_top_k_by_cosine(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    collection = NumpyCollection.create(str(tmp_path / "c"), dim=16)
+    collection.insert(_rows(vectors))
+
+    query = rng.normal(size=16).astype(np.float32)
+    hits = collection.search([query], limit=5)[0]
+    assert [hit["id"] for hit in hits] == _expected_top_k(vectors, query, 5)
+    assert [hit["distance"] for hit in hits] == sorted((hit["distance"] for hit in hits), reverse=True)
+    assert hits[0]["entity"]["my_content"] == f"doc {hits[0]['id']}"
+
+
+def test_deleted_rows_are_not_returned(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    collection = NumpyCollection.create(str(tmp_path / "c"), dim=8)
+    collection.insert(_rows(vectors))
+    best = collection.search([vectors[7]], limit=1)[0][0]["id"]
+    assert best == 7
+
+    collection.delete([7])
+    assert 7 not in [hit["id"] for hit in collection.search([vectors[7]], limit=10)[0]]
+    assert collection.num_entities == 49
+
+
+def test_int8_quantized_search_matches_exact_top_k(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(300, 32)).astype(np.float32)
+    collection = NumpyCollection.create(str(tmp_path / "c"), dim=32, quantization="int8")
+    collection.insert(_rows(vectors))
+    query = rng.normal(size=32).astype(np.float32)
+    hits = collection.search([query], limit=5, refine_k=4)[0]
+    assert [hit["id"] for hit in hits] == _expected_top_k(vectors, query, 5)
+
+
+def test_search_is_consistent_while_another_thread_inserts(tmp_path):
+    rng = np.random.default_rng(3)
+    collection = NumpyCollection.create(str(tmp_path / "c"), dim=8)
+    collection.insert(_rows(rng.normal(size=(10, 8)).astype(np.float32)))
+    errors = []
+
+    def writer():
+        for batch in range(30):
+            collection.insert(_rows(rng.normal(size=(20, 8)).astype(np.float32), start=1000 + batch * 20))
+
+    def reader():
+        try:
+            for _ in range(200):
+                assert collection.search([np.ones(8, dtype=np.float32)], limit=3)[0]
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert collection.num_entities == 610
+
+
+def test_client_describes_collections_like_milvus(tmp_path):
+    client = NumpyVectorClient(str(tmp_path))
+    client.create_collection("docs", dimension=4)
+    description = client.describe_collection("docs")
+    assert {field["name"] for field in description["fields"]} >= {"my_id", "my_vector", "my_content"}
+    assert description["fields"][1]["params"]["dim"] == 4
+
+
+def test_insert_after_a_crashed_insert_keeps_rows_aligned(tmp_path):
+    rng = np.random.default_rng(4)
+    vectors = rng.normal(size=(6, 8)).astype(np.float32)
+    path = str(tmp_path / "c")
+    collection = NumpyCollection.create(path, dim=8, quantization="int8")
+    collection.insert(_rows(vectors[:3]))
+
+    def crash_mid_insert():
+        # Every file but ids.i64 got its row appended.
+        for name, size in [("vectors.f32", 32), ("offsets.i64", 8), ("entities.bin", 17), ("codes.i8", 8),
+                           ("scales.f32", 4)]:
+            with open(f"{path}/{name}", "ab") as f:
+                f.write(b"\x01" * size)
+
+    crash_mid_insert()
+    reopened = NumpyCollection(path)
+    reopened.insert(_rows(vectors[3:5], start=3))
+    # The next insert cleans up even without reopening.
+    crash_mid_insert()
+    collection.insert(_rows(vectors[5:], start=5))
+    for row in range(6):
+        hit = reopened.search([vectors[row]], limit=1)[0][0]
+        assert hit["id"] == row and hit["entity"]["my_content"] == f"doc {row}"
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from milvus.numpy_store import NumpyCollection
+from milvus.quantization import (
+    binary_encode,
+    binary_scores,
+    code_bytes,
+    int8_encode,
+    int8_scores,
+)
+
+K = 10
+
+
+@pytest.fixture(scope="module")
+def data():
+    # Clustered vectors, queried with noisy copies of some of them.
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(32, 64))
+    vectors = (centers[rng.integers(32, size=2000)] + rng.normal(scale=0.7, size=(2000, 64))).astype(np.float32)
+    queries = (vectors[rng.choice(2000, 50)] + rng.normal(scale=0.3, size=(50, 64))).astype(np.float32)
+    return vectors, queries
+
+
+def _unit(matrix):
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _recall(collection, vectors, queries, **kwargs):
+    truth = np.argsort(-(_unit(queries) @ _unit(vectors).T), axis=1)[:, :K]
+    results = collection.search(queries, limit=K, **kwargs)
+    return np.mean([len({hit["id"] for hit in hits} & set(expected)) / K for hits, expected in zip(results, truth)])
+
+
+def _collection(tmp_path, vectors, quantization):
+    collection = NumpyCollection.create(str(tmp_path / "c"), dim=vectors.shape[1], quantization=quantization)
+    collection.insert([{"my_id": i, "my_vector": v.tolist(), "my_content": ""} for i, v in enumerate(vectors)])
+    return collection
+
+
+def test_int8_codes_are_within_half_a_step(data):
+    vectors, queries = data
+    codes, scales = int8_encode(vectors)
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    assert np.all(np.abs(codes * scales[:, None] - vectors) <= scales[:, None] / 2 + 1e-6)
+    exact = queries @ vectors.T
+    assert np.abs(int8_scores(codes, scales, queries) - exact).max() < 0.01 * np.abs(exact).max()
+
+
+@pytest.mark.parametrize("dim", [64, 20])
+def test_binary_scores_are_negated_hamming_distances(dim):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(30, dim)).astype(np.float32)
+    queries = rng.normal(size=(5, dim)).astype(np.float32)
+    codes = binary_encode(vectors)
+    assert codes.shape == (30, code_bytes(dim, "binary"))
+    hamming = ((queries[:, None, :] > 0) != (vectors[None, :, :] > 0)).sum(axis=2)
+    np.testing.assert_array_equal(binary_scores(codes, queries), -hamming)
+
+
+@pytest.mark.parametrize("quantization, refine_k, min_recall", [
+    (None, 1, 1.0),
+    ("int8", 4, 0.98),
+    ("binary", 10, 0.95),
+])
+@pytest.mark.parametrize("ivf", [False, True])
+def test_recall_against_exact_search(tmp_path, data, quantization, refine_k, min_recall, ivf):
+    vectors, queries = data
+    collection = _collection(tmp_path, vectors, quantization)
+    nprobe = None
+    if ivf:
+        collection.build_ivf(nlist=32)
+        nprobe = 8
+    assert _recall(collection, vectors, queries, nprobe=nprobe, refine_k=refine_k) >= min_recall
+
+
+def test_float_reranking_recovers_what_binary_codes_miss(tmp_path, data):
+    vectors, queries = data
+    collection = _collection(tmp_path, vectors, "binary")
+    # refine_k=1 keeps only the top-k by Hamming distance.
+    assert _recall(collection, vectors, queries, refine_k=1) < 0.6
+    assert _recall(collection, vectors, queries, refine_k=10) >= 0.95
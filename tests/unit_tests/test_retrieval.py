@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymilvus")
+
+from milvus.retrieval import ahybrid_search  # noqa: E402
+
+
+class _Searcher:
+    """Serves ten ranked rows, honouring ``limit`` and the ``offset`` search param."""
+
+    def __init__(self):
+        self.limits = []
+
+    async def search_text(self, query, collection_name, limit, output_fields, search_params, filter=""):
+        self.limits.append(limit)
+        offset = search_params.get("offset", 0)
+        return [
+            {"id": i, "distance": 1.0 - i / 10, "entity": {"my_id": i, "my_content": f"doc {i}"}}
+            for i in range(offset, min(offset + limit, 10))
+        ]
+
+
+class _Lexical:
+    def search(self, query, limit, tenant=None):
+        return []
+
+
+def _search(searcher, **kwargs):
+    return asyncio.run(ahybrid_search(searcher, _Lexical(), "q", "c", limit=3, dense_limit=2, **kwargs))
+
+
+def test_filtered_search_returns_the_full_limit():
+    searcher = _Searcher()
+    result = _search(searcher, filter='source like "docs/%"', tenant="a")
+    assert [hit.id for hit in result.hits] == [0, 1, 2]
+    assert result.fusion == "dense"
+
+
+def test_offset_pages_do_not_skip_rows():
+    searcher = _Searcher()
+    pages = [[hit.id for hit in _search(searcher, offset=offset).hits] for offset in (0, 3, 6)]
+    # The first page is hybrid and keeps the small dense top-k; later pages are dense only.
+    assert searcher.limits == [2, 3, 3]
+    assert pages[1:] == [[3, 4, 5], [6, 7, 8]]
@@ -0,0 +1,120 @@
+import asyncio
+import dataclasses
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("langgraph")
+
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from llm.router import ProviderRouter  # noqa: E402
+
+
+class _Registry:
+    """Hands out one fake runnable per provider instead of real chat models."""
+
+    def __init__(self, runnables):
+        self.runnables = runnables
+
+    def get(self, provider, model, *args):
+        return self.runnables[provider]
+
+
+class _Stream(RunnableLambda):
+    def __init__(self, chunks, fail_after=None, delay=0.0):
+        super().__init__(lambda x: x)
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.delay = delay
+
+    async def astream(self, input, config=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("connection reset")
+            yield chunk
+
+    def stream(self, input, config=None, **kwargs):
+        yield from self.chunks
+
+
+def _model(runnables, threshold=1):
+    router = ProviderRouter(registry=_Registry(runnables))
+    for provider in runnables:
+        router.state(provider).breaker.failure_threshold = threshold
+    return router, router.chat_model("deepseek-chat", fallbacks=["qwen:qwen-plus"])
+
+
+async def _collect(stream, limit=None):
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        if limit is not None and len(chunks) == limit:
+            break
+    return chunks
+
+
+def test_stream_failing_after_the_first_chunk_trips_the_breaker():
+    router, model = _model({"deepseek": _Stream(["a", "b", "c"], fail_after=1), "qwen": _Stream(["q"])})
+    with pytest.raises(RuntimeError, match="connection reset"):
+        asyncio.run(_collect(model.astream("hi")))
+    assert router.state("deepseek").breaker.state == "open"
+    # With the circuit open, the next stream goes straight to the fallback.
+    assert asyncio.run(_collect(model.astream("hi"))) == ["q"]
+
+
+def test_cancelled_stream_releases_the_half_open_trial():
+    router, model = _model({"deepseek": _Stream(["a"], delay=10.0), "qwen": _Stream(["q"])})
+    breaker = router.state("deepseek").breaker
+    breaker.reset_timeout = 0.0
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+
+    async def cancel_before_the_first_chunk():
+        task = asyncio.ensure_future(_collect(model.astream("hi")))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_before_the_first_chunk())
+    # No outcome was recorded, but the trial slot is free for the next request.
+    assert breaker.allow()
+
+
+class _Slow(RunnableLambda):
+    def __init__(self, answer, delay):
+        super().__init__(lambda x: x)
+        self.answer = answer
+        self.delay = delay
+
+    def invoke(self, input, config=None, **kwargs):
+        time.sleep(self.delay)
+        return self.answer
+
+    def stream(self, input, config=None, **kwargs):
+        time.sleep(self.delay)
+        yield self.answer
+
+
+@pytest.mark.parametrize("method", ["invoke", "stream"])
+def test_sync_call_falls_back_on_the_provider_timeout(method):
+    router, model = _model({"deepseek": _Slow("slow", delay=2.0), "qwen": _Slow("fast", delay=0.0)}, threshold=5)
+    state = router.state("deepseek")
+    state.settings = dataclasses.replace(state.settings, timeout=0.1)
+
+    started = time.monotonic()
+    result = model.invoke("hi") if method == "invoke" else list(model.stream("hi"))
+    assert result == ("fast" if method == "invoke" else ["fast"])
+    assert time.monotonic() - started < 1.0
+
+
+def test_streams_do_not_lower_the_hedge_delay():
+    router, model = _model({"deepseek": _Stream(["a", "b"]), "qwen": _Stream(["q"])})
+    state = router.state("deepseek")
+    for _ in range(4):
+        assert asyncio.run(_collect(model.astream("hi"))) == ["a", "b"]
+        assert list(model.stream("hi")) == ["a", "b"]
+    assert len(state.latency) == 0
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("langgraph")
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from react_agent.state import State  # noqa: E402
+from react_agent.tool_runner import make_tool_runner  # noqa: E402
+
+cancelled = []
+
+
+async def slow_search(query: str) -> str:
+    """Search that takes far longer than its deadline."""
+    try:
+        await asyncio.sleep(5)
+    except asyncio.CancelledError:
+        cancelled.append(query)
+        raise
+    return "too late"
+
+
+async def multiply(a: int, b: int) -> int:
+    """Multiply two numbers."""
+    return a * b
+
+
+def _call(name, args, call_id):
+    return {"name": name, "args": args, "id": call_id, "type": "tool_call"}
+
+
+def test_timed_out_call_reports_an_error_and_the_others_still_answer():
+    run_tools = make_tool_runner([slow_search, multiply])
+    message = AIMessage("", tool_calls=[
+        _call("slow_search", {"query": "reward hacking"}, "c1"),
+        _call("multiply", {"a": 6, "b": 7}, "c2"),
+    ])
+    state = State(messages=[HumanMessage("hi"), message])
+    config = {"configurable": {"tool_timeout": 5.0, "tool_timeouts": {"slow_search": 0.05}}}
+
+    started = time.monotonic()
+    result = asyncio.run(run_tools(state, config))
+    assert time.monotonic() - started < 2
+
+    timeout, product = result["messages"]
+    assert (timeout.tool_call_id, timeout.status) == ("c1", "error")
+    assert "did not finish within 0.05s" in timeout.content
+    assert (product.tool_call_id, product.content) == ("c2", "42")
+    assert [t["status"] for t in result["tool_timings"]] == ["timeout", "success"]
+    # The async tool's coroutine was cancelled, not left running.
+    assert cancelled == ["reward hacking"]